@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS carga_incremental (
+    alvo VARCHAR(255) NOT NULL,
+    hash BIGINT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Hashes das linhas da última carga incremental de cada tabela ou partição (scripts/database/incremental.py)
+CREATE INDEX IF NOT EXISTS idx_carga_incremental_alvo ON carga_incremental (alvo, hash);
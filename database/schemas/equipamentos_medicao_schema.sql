@@ -1,3 +1,5 @@
+CREATE EXTENSION IF NOT EXISTS postgis;
+
 CREATE TABLE IF NOT EXISTS equipamentos_medicao_velocidade (
     _id INTEGER PRIMARY KEY,
     equipamento VARCHAR(255),
@@ -7,4 +9,9 @@ CREATE TABLE IF NOT EXISTS equipamentos_medicao_velocidade (
     latitude DECIMAL(10, 8),
     longitude DECIMAL(11, 8),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+-- Ponto PostGIS calculado pelo banco a partir de latitude/longitude em cada INSERT/COPY
+ALTER TABLE equipamentos_medicao_velocidade ADD COLUMN IF NOT EXISTS geom geometry(Point, 4326)
+    GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)) STORED;
+CREATE INDEX IF NOT EXISTS idx_equipamentos_medicao_velocidade_geom ON equipamentos_medicao_velocidade USING GIST (geom);
\ No newline at end of file
@@ -0,0 +1,18 @@
+CREATE TABLE IF NOT EXISTS etl_metricas (
+    execucao VARCHAR(50) NOT NULL,
+    script VARCHAR(50) NOT NULL,
+    tabela VARCHAR(100) NOT NULL,
+    etapa VARCHAR(50) NOT NULL,
+    inicio TIMESTAMPTZ NOT NULL,
+    segundos DOUBLE PRECISION,
+    linhas BIGINT,
+    linhas_por_segundo DOUBLE PRECISION,
+    bytes_escritos BIGINT,
+    pico_rss_mb DOUBLE PRECISION,
+    ok BOOLEAN,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Etapas medidas pelo ETL (scripts/database/instrumentation.py --exportar), para os painéis de desempenho do Grafana
+CREATE UNIQUE INDEX IF NOT EXISTS idx_etl_metricas_etapa ON etl_metricas (execucao, script, tabela, etapa, inicio);
+CREATE INDEX IF NOT EXISTS idx_etl_metricas_inicio ON etl_metricas (inicio);
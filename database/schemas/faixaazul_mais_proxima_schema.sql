@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS faixaazul_mais_proxima (
+    conjunto VARCHAR(50),
+    ponto_id VARCHAR(255),
+    faixa_nome VARCHAR(255),
+    distancia_m DECIMAL(10, 2),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Trecho da Faixa Azul mais próximo de cada ponto, calculado por scripts/database/spatial_join.py
+CREATE INDEX IF NOT EXISTS idx_faixaazul_mais_proxima_ponto ON faixaazul_mais_proxima (conjunto, ponto_id);
@@ -0,0 +1,11 @@
+CREATE TABLE IF NOT EXISTS faixaazul_proximidade (
+    faixa_nome VARCHAR(255),
+    conjunto VARCHAR(50),
+    ponto_id VARCHAR(255),
+    distancia_m DECIMAL(10, 2),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Ligações calculadas por scripts/database/spatial_join.py (pontos a até --raio metros de cada trecho).
+-- faixa_nome é a chave natural de faixaazul (name)
+CREATE INDEX IF NOT EXISTS idx_faixaazul_proximidade_faixa ON faixaazul_proximidade (faixa_nome, conjunto);
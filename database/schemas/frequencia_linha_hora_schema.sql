@@ -0,0 +1,13 @@
+CREATE TABLE IF NOT EXISTS frequencia_linha_hora (
+    data DATE,
+    route_id VARCHAR(255),
+    direction_id INTEGER,
+    hora INTEGER,
+    viagens INTEGER,
+    headway_medio_min DECIMAL(8, 1),
+    headway_max_min DECIMAL(8, 1),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Viagens e headways por hora de cada linha e sentido (scripts/database/gtfs_headways.py)
+CREATE INDEX IF NOT EXISTS idx_frequencia_linha_hora_linha ON frequencia_linha_hora (data, route_id, direction_id);
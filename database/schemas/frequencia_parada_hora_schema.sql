@@ -0,0 +1,14 @@
+CREATE TABLE IF NOT EXISTS frequencia_parada_hora (
+    data DATE,
+    route_id VARCHAR(255),
+    direction_id INTEGER,
+    stop_id VARCHAR(255),
+    hora INTEGER,
+    viagens INTEGER,
+    headway_medio_min DECIMAL(8, 1),
+    headway_max_min DECIMAL(8, 1),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Viagens e headways por hora de cada linha e sentido em cada parada (scripts/database/gtfs_headways.py)
+CREATE INDEX IF NOT EXISTS idx_frequencia_parada_hora_parada ON frequencia_parada_hora (data, stop_id);
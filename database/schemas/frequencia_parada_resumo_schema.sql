@@ -0,0 +1,15 @@
+CREATE TABLE IF NOT EXISTS frequencia_parada_resumo (
+    data DATE,
+    route_id VARCHAR(255),
+    direction_id INTEGER,
+    stop_id VARCHAR(255),
+    viagens INTEGER,
+    primeira_partida VARCHAR(8),
+    ultima_partida VARCHAR(8),
+    operacao_horas DECIMAL(6, 2),
+    headway_medio_min DECIMAL(8, 1),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Período de operação e headway médio de cada linha e sentido em cada parada (scripts/database/gtfs_headways.py)
+CREATE INDEX IF NOT EXISTS idx_frequencia_parada_resumo_parada ON frequencia_parada_resumo (data, stop_id);
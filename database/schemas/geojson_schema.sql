@@ -2,31 +2,17 @@
 CREATE EXTENSION IF NOT EXISTS postgis;
 
 -- 2) Tabela da Faixa Azul
-DROP TABLE IF EXISTS faixaazul;
-
-CREATE TABLE faixaazul (
+CREATE TABLE IF NOT EXISTS faixaazul (
   id   SERIAL PRIMARY KEY,
   name TEXT,
   tipo TEXT,
   geom geometry(LineString, 4326)  -- CRS84 ~ EPSG:4326
 );
 
--- 3) 
-DO $$
-DECLARE
-  fc jsonb;
-BEGIN
-  -- Lê o arquivo GeoJSON que você copiou para /tmp
-  fc := pg_read_file('/tmp/faixaazul_clean.geojson')::jsonb;
+-- 3) Chave natural usada no upsert: os dados são carregados por
+--    scripts/database/geojson_loader.py (COPY + INSERT ... ON CONFLICT (name)),
+--    que mantém o id das features já existentes
+CREATE UNIQUE INDEX IF NOT EXISTS faixaazul_name_key ON faixaazul (name);
 
-  -- Insere cada feature na tabela faixaazul
-  INSERT INTO faixaazul (name, tipo, geom)
-  SELECT
-    feat->'properties'->>'Name' AS name,
-    feat->'properties'->>'Tipo' AS tipo,
-    ST_SetSRID(
-      ST_GeomFromGeoJSON(feat->>'geometry'),
-      4326
-    ) AS geom
-  FROM jsonb_array_elements(fc->'features') AS feat;
-END$$;
+-- 4) Índice espacial
+CREATE INDEX IF NOT EXISTS idx_faixaazul_geom ON faixaazul USING GIST (geom);
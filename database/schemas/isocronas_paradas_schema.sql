@@ -0,0 +1,14 @@
+CREATE TABLE IF NOT EXISTS isocronas_paradas (
+    conjunto VARCHAR(50),
+    ponto_id VARCHAR(255),
+    data DATE,
+    partida VARCHAR(8),
+    minutos_limite DECIMAL(6, 1),
+    stop_id VARCHAR(255),
+    minutos DECIMAL(6, 1),
+    veiculos INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Paradas alcançadas de transporte público a partir de cada ponto, calculadas por scripts/database/gtfs_raptor.py
+CREATE INDEX IF NOT EXISTS idx_isocronas_paradas_ponto ON isocronas_paradas (conjunto, ponto_id);
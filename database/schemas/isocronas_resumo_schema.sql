@@ -0,0 +1,15 @@
+CREATE TABLE IF NOT EXISTS isocronas_resumo (
+    conjunto VARCHAR(50),
+    ponto_id VARCHAR(255),
+    data DATE,
+    partida VARCHAR(8),
+    minutos_limite DECIMAL(6, 1),
+    paradas_acesso INTEGER,
+    paradas_alcancadas INTEGER,
+    distancia_max_m DECIMAL(10, 2),
+    area_km2 DECIMAL(10, 3),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Resumo das isócronas de cada ponto (scripts/database/gtfs_raptor.py)
+CREATE INDEX IF NOT EXISTS idx_isocronas_resumo_ponto ON isocronas_resumo (conjunto, ponto_id);
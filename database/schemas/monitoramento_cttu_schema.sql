@@ -1,7 +1,14 @@
+CREATE EXTENSION IF NOT EXISTS postgis;
+
 CREATE TABLE IF NOT EXISTS monitoramento_cttu (
     nome VARCHAR(255),
     endereco VARCHAR(255),
     longitude DECIMAL(11, 8),
     latitude DECIMAL(10, 8),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+-- Ponto PostGIS calculado pelo banco a partir de latitude/longitude em cada INSERT/COPY
+ALTER TABLE monitoramento_cttu ADD COLUMN IF NOT EXISTS geom geometry(Point, 4326)
+    GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)) STORED;
+CREATE INDEX IF NOT EXISTS idx_monitoramento_cttu_geom ON monitoramento_cttu USING GIST (geom);
\ No newline at end of file
@@ -0,0 +1,29 @@
+CREATE TABLE IF NOT EXISTS relatorio_fluxo (
+    ano INTEGER,
+    mes INTEGER,
+    equipamento VARCHAR(255),
+    faixa VARCHAR(255),
+    data DATE,
+    hora INTEGER,
+    minutos_intervalo VARCHAR(255),
+    qtd_0a10km INTEGER,
+    qtd_11a20km INTEGER,
+    qtd_21a30km INTEGER,
+    qtd_31a40km INTEGER,
+    qtd_41a50km INTEGER,
+    qtd_51a60km INTEGER,
+    qtd_61a70km INTEGER,
+    qtd_71a80km INTEGER,
+    qtd_81a90km INTEGER,
+    qtd_91a100km INTEGER,
+    qtd_acimade100km INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (data);
+
+-- Uma partição por mês, criada pelo gerador de SQL / carga via COPY a partir do
+-- nome do arquivo (relatorio_fluxo_<mes>_<ano>_clean.csv). Linhas sem data ou fora
+-- dos meses conhecidos ficam na partição padrão; quando o mês delas ganha partição,
+-- são movidas da padrão para ela.
+CREATE TABLE IF NOT EXISTS relatorio_fluxo_padrao PARTITION OF relatorio_fluxo DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_relatorio_fluxo_data_hora ON relatorio_fluxo (data, hora);
\ No newline at end of file
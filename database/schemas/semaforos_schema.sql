@@ -1,3 +1,5 @@
+CREATE EXTENSION IF NOT EXISTS postgis;
+
 CREATE TABLE IF NOT EXISTS semaforos (
     _id INTEGER PRIMARY KEY,
     semaforo INTEGER,
@@ -10,4 +12,9 @@ CREATE TABLE IF NOT EXISTS semaforos (
     funcionamento VARCHAR(255),
     id_semaforo INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+-- Ponto PostGIS calculado pelo banco a partir de latitude/longitude em cada INSERT/COPY
+ALTER TABLE semaforos ADD COLUMN IF NOT EXISTS geom geometry(Point, 4326)
+    GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)) STORED;
+CREATE INDEX IF NOT EXISTS idx_semaforos_geom ON semaforos USING GIST (geom);
\ No newline at end of file
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Benchmark do ETL com dados sintéticos.
+
+Gera entradas sintéticas (dados_sinteticos.py) na escala pedida e mede tempo e pico
+de memória (tracemalloc) de cada etapa:
+- clean_gtfs.py: read_csv_safe e a limpeza de cada tabela, e a limpeza particionada
+  de stop_times;
+- generate_sql_inserts.py: carga do CSV, renderização por célula (escape_sql_value)
+  e coluna a coluna, generate_sql_inserts_content e a gravação do arquivo completo
+  (modo padrão e streaming);
+- leitura da camada processada em CSV e em Parquet.
+
+O resultado é gravado em JSON (data/analysis/benchmarks/ por padrão) e pode ser
+comparado com o relatório de outro commit:
+
+    python scripts/benchmarks/benchmark_etl.py --escala media
+    python scripts/benchmarks/benchmark_etl.py --escala media --comparar data/analysis/benchmarks/<base>.json
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database"))
+
+import clean_gtfs  # noqa: E402
+from generate_sql_inserts import (  # noqa: E402
+    detect_project_root,
+    find_matching_schema,
+    generate_sql_inserts_content,
+    load_table_dataframe,
+    process_csv_file,
+    render_sql_rows,
+    render_sql_rows_per_cell,
+)
+from processed_io import read_processed, save_processed  # noqa: E402
+from dados_sinteticos import gerar_feed_gtfs, gerar_fluxo_veiculos_hora, gerar_relatorio_fluxo  # noqa: E402
+
+# Versão do formato do relatório JSON
+REPORT_VERSION = 1
+
+# Parâmetros de cada escala
+ESCALAS = {
+    'pequena': {'sensores': 10, 'dias': 7, 'equipamentos': 10, 'viagens': 500, 'paradas': 300,
+                'paradas_por_viagem': 30},
+    'media': {'sensores': 50, 'dias': 30, 'equipamentos': 50, 'viagens': 5000, 'paradas': 1500,
+              'paradas_por_viagem': 30},
+    'grande': {'sensores': 200, 'dias': 31, 'equipamentos': 200, 'viagens': 30000, 'paradas': 6000,
+               'paradas_por_viagem': 40},
+}
+
+
+class Benchmark:
+    """Executa as etapas e acumula os resultados"""
+
+    def __init__(self, repeticoes: int = 1, medir_memoria: bool = True):
+        self.repeticoes = repeticoes
+        self.medir_memoria = medir_memoria
+        self.etapas: List[Dict] = []
+
+    def medir(self, etapa: str, func: Callable, *args, linhas: Optional[int] = None, **kwargs):
+        """
+        Mede o melhor tempo entre as repetições e, numa execução à parte sob
+        tracemalloc, o pico de memória alocada. Retorna o resultado da função
+        """
+        tempos = []
+        for _ in range(self.repeticoes):
+            with contextlib.redirect_stdout(io.StringIO()):
+                inicio = time.perf_counter()
+                resultado = func(*args, **kwargs)
+                tempos.append(time.perf_counter() - inicio)
+
+        pico_mb = None
+        if self.medir_memoria:
+            tracemalloc.start()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    func(*args, **kwargs)
+                _, pico = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            pico_mb = round(pico / 2 ** 20, 2)
+
+        segundos = min(tempos)
+        registro = {'etapa': etapa, 'segundos': round(segundos, 4), 'pico_memoria_mb': pico_mb, 'linhas': linhas}
+        if linhas and segundos > 0:
+            registro['linhas_por_segundo'] = round(linhas / segundos)
+        self.etapas.append(registro)
+
+        memoria = f", pico {pico_mb} MB" if pico_mb is not None else ""
+        print(f"  [OK] {etapa}: {segundos:.3f}s{memoria}")
+        return resultado
+
+
+def benchmark_gtfs(bench: Benchmark, workdir: str, params: Dict, jobs: int):
+    """Etapas de clean_gtfs.py sobre um feed sintético"""
+    raw_dir = os.path.join(workdir, "gtfs_raw")
+    linhas = gerar_feed_gtfs(raw_dir, num_viagens=params['viagens'], num_paradas=params['paradas'],
+                             paradas_por_viagem=params['paradas_por_viagem'])
+    print(f"[INFO] Feed GTFS sintético: {linhas['stop_times']} stop_times, {linhas['shapes']} pontos de shape")
+
+    for tabela, limpar in clean_gtfs.CLEANERS.items():
+        df = bench.medir(f"gtfs.read_csv_safe.{tabela}", clean_gtfs.read_csv_safe, tabela, raw_dir,
+                         linhas=linhas[tabela])
+        bench.medir(f"gtfs.clean.{tabela}", limpar, df, linhas=linhas[tabela])
+
+    # A limpeza particionada grava em clean_gtfs.PROCESSED_DIR
+    processed_dir = os.path.join(workdir, "gtfs_processed")
+    os.makedirs(processed_dir, exist_ok=True)
+    original_dir = clean_gtfs.PROCESSED_DIR
+    clean_gtfs.PROCESSED_DIR = processed_dir
+    try:
+        bench.medir(f"gtfs.clean_partitioned_table.stop_times.jobs{jobs}", clean_gtfs.clean_partitioned_table,
+                    'stop_times', os.path.join(raw_dir, "stop_times.txt"), "stop_times_clean.csv", jobs,
+                    linhas=linhas['stop_times'])
+    finally:
+        clean_gtfs.PROCESSED_DIR = original_dir
+
+
+def benchmark_sql(bench: Benchmark, workdir: str, params: Dict, schemas_dir: str):
+    """Etapas de generate_sql_inserts.py sobre relatórios sintéticos já processados"""
+    processed_dir = os.path.join(workdir, "processed")
+    complete_dir = os.path.join(workdir, "sql_complete")
+    os.makedirs(processed_dir, exist_ok=True)
+    os.makedirs(complete_dir, exist_ok=True)
+
+    tabelas = {
+        'relatorio_fluxo_agosto_2025_clean.csv': gerar_relatorio_fluxo(params['sensores'], params['dias']),
+        'fluxo_veiculos_hora_clean.csv': gerar_fluxo_veiculos_hora(params['equipamentos'], params['dias']),
+    }
+
+    for filename, df in tabelas.items():
+        nome = filename.replace("_clean.csv", "")
+        csv_path = os.path.join(processed_dir, filename)
+        schema_path = find_matching_schema(filename, schemas_dir)
+        linhas = len(df)
+        print(f"[INFO] {filename}: {linhas} registros sintéticos")
+        df.to_csv(csv_path, index=False)
+
+        _, loaded, schema, _ = bench.medir(f"sql.load_table_dataframe.{nome}", load_table_dataframe,
+                                           csv_path, schema_path, linhas=linhas)
+        bench.medir(f"sql.escape_sql_value.{nome}", render_sql_rows_per_cell, loaded, schema, linhas=linhas)
+        bench.medir(f"sql.render_sql_rows.{nome}", render_sql_rows, loaded, schema, linhas=linhas)
+        bench.medir(f"sql.generate_sql_inserts_content.{nome}", generate_sql_inserts_content,
+                    csv_path, schema_path, linhas=linhas)
+        bench.medir(f"sql.process_csv_file.{nome}", process_csv_file, csv_path, schema_path, complete_dir,
+                    linhas=linhas)
+        bench.medir(f"sql.process_csv_file_streaming.{nome}", process_csv_file, csv_path, schema_path,
+                    complete_dir, streaming=True, linhas=linhas)
+
+        # Camada processada: CSV x Parquet
+        parquet_path = save_processed(loaded, csv_path, 'parquet', schema.column_types)[0]
+        bench.medir(f"processado.read_processed_csv.{nome}", read_processed, csv_path, linhas=linhas)
+        bench.medir(f"processado.read_processed_parquet.{nome}", read_processed, parquet_path, linhas=linhas)
+
+
+def git_commit(project_root: str) -> Optional[str]:
+    """Commit atual do repositório (None fora de um repositório git)"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except Exception:
+        return None
+
+
+def comparar(atual: Dict, base: Dict, limite: float):
+    """Imprime a variação de cada etapa em relação a um relatório anterior"""
+    base_etapas = {e['etapa']: e for e in base.get('etapas', [])}
+    print(f"\n=== COMPARAÇÃO COM {base.get('commit') or 'relatório base'} ===")
+    if base.get('parametros') != atual.get('parametros'):
+        print("[AVISO] Parâmetros diferentes entre os relatórios; a comparação pode não ser válida")
+
+    pioras = 0
+    for etapa in atual['etapas']:
+        anterior = base_etapas.get(etapa['etapa'])
+        if not anterior or not anterior['segundos']:
+            continue
+        variacao = (etapa['segundos'] - anterior['segundos']) / anterior['segundos'] * 100
+        tag = "[AVISO]" if variacao > limite else "[OK]"
+        if variacao > limite:
+            pioras += 1
+        memoria = ""
+        if etapa.get('pico_memoria_mb') is not None and anterior.get('pico_memoria_mb'):
+            memoria = f", memória {anterior['pico_memoria_mb']} -> {etapa['pico_memoria_mb']} MB"
+        print(f"{tag} {etapa['etapa']}: {anterior['segundos']:.3f}s -> {etapa['segundos']:.3f}s "
+              f"({variacao:+.1f}%){memoria}")
+
+    if pioras:
+        print(f"\n[AVISO] {pioras} etapas ficaram mais de {limite:.0f}% mais lentas")
+    else:
+        print(f"\n[SUCESSO] Nenhuma etapa ficou mais de {limite:.0f}% mais lenta")
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Benchmark do ETL com dados sintéticos")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default='pequena',
+                        help="Tamanho dos dados sintéticos (padrão: pequena)")
+    parser.add_argument("--sensores", type=int, help="Sensores do relatorio_fluxo (sobrescreve a escala)")
+    parser.add_argument("--dias", type=int, help="Dias de dados (sobrescreve a escala)")
+    parser.add_argument("--equipamentos", type=int, help="Equipamentos do fluxo_veiculos_hora")
+    parser.add_argument("--viagens", type=int, help="Viagens do feed GTFS")
+    parser.add_argument("--paradas", type=int, help="Paradas do feed GTFS")
+    parser.add_argument("--paradas-por-viagem", type=int, help="Paradas por viagem do feed GTFS")
+    parser.add_argument("--etapas", choices=['todas', 'gtfs', 'sql'], default='todas',
+                        help="Grupo de etapas a medir (padrão: todas)")
+    parser.add_argument("--jobs", type=int, default=1, help="Processos na limpeza particionada (padrão: 1)")
+    parser.add_argument("--repeticoes", type=int, default=1, help="Execuções por etapa; vale o melhor tempo")
+    parser.add_argument("--sem-memoria", action="store_true", help="Não mede o pico de memória (mais rápido)")
+    parser.add_argument("--saida", help="Arquivo JSON do relatório (padrão: data/analysis/benchmarks/)")
+    parser.add_argument("--comparar", help="Relatório JSON anterior para comparar")
+    parser.add_argument("--limite", type=float, default=10.0,
+                        help="Piora percentual a partir da qual a comparação avisa (padrão: 10)")
+    args = parser.parse_args()
+
+    print("=== BENCHMARK DO ETL (DADOS SINTÉTICOS) ===\n")
+
+    project_root = detect_project_root()
+    schemas_dir = os.path.join(project_root, "database", "schemas")
+
+    params = dict(ESCALAS[args.escala])
+    for key in params:
+        value = getattr(args, key)
+        if value is not None:
+            params[key] = value
+    print(f"[INFO] Escala: {args.escala} {params}")
+
+    bench = Benchmark(repeticoes=args.repeticoes, medir_memoria=not args.sem_memoria)
+    workdir = tempfile.mkdtemp(prefix="benchmark_etl_")
+    inicio = time.perf_counter()
+    try:
+        if args.etapas in ('todas', 'gtfs'):
+            print("\n--- clean_gtfs.py ---")
+            benchmark_gtfs(bench, workdir, params, args.jobs)
+        if args.etapas in ('todas', 'sql'):
+            print("\n--- generate_sql_inserts.py ---")
+            benchmark_sql(bench, workdir, params, schemas_dir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    relatorio = {
+        'versao': REPORT_VERSION,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(project_root),
+        'escala': args.escala,
+        'parametros': params,
+        'ambiente': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'duracao_total_segundos': round(time.perf_counter() - inicio, 2),
+        'etapas': bench.etapas,
+    }
+
+    saida = args.saida
+    if not saida:
+        bench_dir = os.path.join(project_root, "data", "analysis", "benchmarks")
+        os.makedirs(bench_dir, exist_ok=True)
+        sufixo = relatorio['commit'] or datetime.now().strftime('%Y%m%d_%H%M%S')
+        saida = os.path.join(bench_dir, f"benchmark_{args.escala}_{sufixo}.json")
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+
+    print("\n=== RESUMO ===")
+    print(f"[SUCESSO] Etapas medidas: {len(bench.etapas)} em {relatorio['duracao_total_segundos']}s")
+    print(f"[INFO] Relatório salvo em: {saida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            comparar(relatorio, json.load(f), args.limite)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Geradores de dados sintéticos para os benchmarks do ETL.
+
+Produzem entradas no mesmo formato dos arquivos reais, em escala configurável:
+- relatorio_fluxo_*: relatórios de 15 minutos (sensores x faixas x dias x 96 intervalos);
+- fluxo_veiculos_hora: contagens horárias por equipamento e faixa de velocidade;
+- feed GTFS bruto (.txt) com rotas, viagens, paradas, horários e shapes.
+
+Os dados incluem as sujeiras que a limpeza trata (espaços, horários incompletos,
+duplicatas, valores ausentes), para que o custo medido seja realista.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+# Faixas de velocidade do relatorio_fluxo (mesmas colunas dos schemas)
+FAIXAS_VELOCIDADE = ['0a10km', '11a20km', '21a30km', '31a40km', '41a50km', '51a60km',
+                     '61a70km', '71a80km', '81a90km', '91a100km', 'acimade100km']
+
+# Faixas do fluxo_veiculos_hora (nomes como no CSV processado, com hífen)
+FAIXAS_FLUXO_HORA = ['000-009', '010-019', '020-029', '030-039', '040-049', '050-059',
+                     '060-069', '070-079', '080-089', '090-099', '100-200']
+
+LOGRADOUROS = [
+    "AVENIDA BOA VIAGEM - ENTRE OS NRS. 6114 E 5888 - SENTIDO CENTRO",
+    "AVENIDA CAXANGÁ - PRÓXIMO AO NR. 2200 - SENTIDO SUBÚRBIO",
+    "AVENIDA AGAMENON MAGALHÃES - ENTRE AS RUAS JOÃO FERNANDES VIEIRA E DO PRÍNCIPE",
+    "RUA REAL DA TORRE - EM FRENTE AO NR. 1100 - SENTIDO MADALENA",
+    "AVENIDA NORTE MIGUEL ARRAES DE ALENCAR - PRÓXIMO AO VIADUTO",
+]
+
+
+def gerar_relatorio_fluxo(num_sensores: int, num_dias: int, ano: int = 2025, mes: int = 8,
+                          faixas_por_sensor: int = 2, seed: int = 0) -> pd.DataFrame:
+    """Relatório de fluxo de 15 minutos como o CSV processado relatorio_fluxo_<mes>_2025_clean.csv"""
+    rng = np.random.default_rng(seed)
+    sensores = np.array([f"FS-{i:03d}" for i in range(num_sensores)])
+    intervalos = np.array(['00-15', '15-30', '30-45', '45-60'])
+    datas = pd.date_range(f"{ano}-{mes:02d}-01", periods=num_dias).strftime('%Y-%m-%d').to_numpy()
+
+    # produto cartesiano sensor x faixa x dia x hora x intervalo
+    grid = np.stack(np.meshgrid(np.arange(num_sensores), np.arange(1, faixas_por_sensor + 1),
+                                np.arange(num_dias), np.arange(24), np.arange(4), indexing='ij'),
+                    axis=-1).reshape(-1, 5)
+    n = len(grid)
+    df = pd.DataFrame({
+        'ano': ano,
+        'mes': mes,
+        'equipamento': sensores[grid[:, 0]],
+        'faixa': grid[:, 1].astype(str),
+        'data': datas[grid[:, 2]],
+        'hora': grid[:, 3],
+        'minutos_intervalo': intervalos[grid[:, 4]],
+    })
+    for faixa in FAIXAS_VELOCIDADE:
+        valores = rng.poisson(12, n).astype(float)
+        valores[rng.random(n) < 0.02] = np.nan
+        df[f'qtd_{faixa}'] = valores
+    return df
+
+
+def gerar_fluxo_veiculos_hora(num_equipamentos: int, num_dias: int, seed: int = 0) -> pd.DataFrame:
+    """Contagens horárias por equipamento como o CSV processado fluxo_veiculos_hora_clean.csv"""
+    rng = np.random.default_rng(seed)
+    equipamentos = np.array([f"CTTU-{4000 + i} ({i % 9}CG) do equipamento D{i:02d}CG000"
+                             for i in range(num_equipamentos)])
+    logradouros = np.array(LOGRADOUROS)[np.arange(num_equipamentos) % len(LOGRADOUROS)]
+
+    grid = np.stack(np.meshgrid(np.arange(num_equipamentos), np.arange(num_dias), np.arange(24),
+                                indexing='ij'), axis=-1).reshape(-1, 3)
+    n = len(grid)
+    inicio = pd.Timestamp('1900-01-01') + pd.to_timedelta(grid[:, 1] * 24 + grid[:, 2], unit='h')
+    df = pd.DataFrame({
+        'equipamento': equipamentos[grid[:, 0]],
+        'logradouro': logradouros[grid[:, 0]],
+        'horainicio': inicio.strftime('%Y-%m-%d %H:%M:%S'),
+        'horafinal': (inicio + pd.Timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    total = np.zeros(n, dtype=np.int64)
+    for faixa in FAIXAS_FLUXO_HORA:
+        quant = rng.poisson(300, n)
+        total += quant
+        df[f'quant{faixa}'] = quant
+        df[f'porcentagem{faixa}'] = np.round(rng.random(n) * 25, 2)
+    df['quanttotal'] = total
+    df['porcentagemtotal'] = np.round(rng.random(n) * 5, 2)
+    return df
+
+
+def _horario_gtfs(segundos: np.ndarray, rng) -> np.ndarray:
+    """Horários HH:MM:SS (horas >= 24 permitidas), com alguns no formato curto H:M"""
+    hh, resto = np.divmod(segundos, 3600)
+    mm, ss = np.divmod(resto, 60)
+    completo = pd.Series(hh).astype(str).str.zfill(2) + ':' + pd.Series(mm).astype(str).str.zfill(2) \
+        + ':' + pd.Series(ss).astype(str).str.zfill(2)
+    curto = pd.Series(hh).astype(str) + ':' + pd.Series(mm).astype(str)
+    return np.where(rng.random(len(segundos)) < 0.05, curto, completo)
+
+
+def gerar_feed_gtfs(diretorio: str, num_rotas: int = 50, num_viagens: int = 2000, num_paradas: int = 1500,
+                    paradas_por_viagem: int = 30, pontos_por_shape: int = 200, seed: int = 0) -> dict:
+    """
+    Grava um feed GTFS bruto (.txt) em diretorio. Retorna o número de linhas de cada arquivo
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(diretorio, exist_ok=True)
+    tabelas = {}
+
+    tabelas['agency'] = pd.DataFrame({
+        'agency_id': ['1'], 'agency_name': ['Grande Recife Consórcio de Transporte'],
+        'agency_url': ['https://www.granderecife.pe.gov.br'], 'agency_timezone': ['America/Recife'],
+        'agency_lang': ['pt'], 'agency_phone': ['8131829000'],
+    })
+    servicos = ['DU', 'SAB', 'DOM']
+    tabelas['calendar'] = pd.DataFrame({
+        'service_id': servicos,
+        'monday': [1, 0, 0], 'tuesday': [1, 0, 0], 'wednesday': [1, 0, 0], 'thursday': [1, 0, 0],
+        'friday': [1, 0, 0], 'saturday': [0, 1, 0], 'sunday': [0, 0, 1],
+        'start_date': [20250101] * 3, 'end_date': [20251231] * 3,
+    })
+    tabelas['calendar_dates'] = pd.DataFrame({
+        'service_id': ['DU', 'DOM'], 'date': [20250421, 20250421], 'exception_type': [2, 1],
+    })
+
+    rotas = np.array([f"{100 + i}" for i in range(num_rotas)])
+    tabelas['routes'] = pd.DataFrame({
+        'route_id': rotas, 'agency_id': '1', 'route_short_name': rotas,
+        'route_long_name': [f"TI {i} / Centro" for i in range(num_rotas)],
+        'route_type': 3,
+    })
+
+    tabelas['stops'] = pd.DataFrame({
+        'stop_id': [f"{i}" for i in range(num_paradas)],
+        'stop_name': [f" Parada {i} " for i in range(num_paradas)],
+        'stop_lat': -8.05 + rng.normal(0, 0.05, num_paradas),
+        'stop_lon': -34.90 + rng.normal(0, 0.05, num_paradas),
+        'location_type': 0,
+    })
+
+    # um shape por rota e sentido
+    shape_ids = [f"{rota}_{sentido}" for rota in rotas for sentido in (0, 1)]
+    n_pontos = len(shape_ids) * pontos_por_shape
+    tabelas['shapes'] = pd.DataFrame({
+        'shape_id': np.repeat(shape_ids, pontos_por_shape),
+        'shape_pt_lat': -8.05 + np.cumsum(rng.normal(0, 0.0005, n_pontos)),
+        'shape_pt_lon': -34.90 + np.cumsum(rng.normal(0, 0.0005, n_pontos)),
+        'shape_pt_sequence': np.tile(np.arange(1, pontos_por_shape + 1), len(shape_ids)),
+    })
+
+    rota_viagem = rng.integers(0, num_rotas, num_viagens)
+    sentido = rng.integers(0, 2, num_viagens)
+    viagens = np.array([f"{rotas[r]}-{i}" for i, r in enumerate(rota_viagem)])
+    tabelas['trips'] = pd.DataFrame({
+        'route_id': rotas[rota_viagem],
+        'service_id': np.array(servicos)[rng.integers(0, 3, num_viagens)],
+        'trip_id': viagens,
+        'trip_headsign': [f"Terminal {r % 7}" for r in rota_viagem],
+        'direction_id': sentido,
+        'shape_id': [f"{rotas[r]}_{s}" for r, s in zip(rota_viagem, sentido)],
+    })
+
+    # horários: partida entre 4h e 23h, paradas a cada 1-3 minutos
+    n_horarios = num_viagens * paradas_por_viagem
+    partida = np.repeat(rng.integers(4 * 3600, 23 * 3600, num_viagens), paradas_por_viagem)
+    deslocamento = rng.integers(60, 180, n_horarios).reshape(num_viagens, paradas_por_viagem).cumsum(axis=1).ravel()
+    chegada = partida + deslocamento
+    tabelas['stop_times'] = pd.DataFrame({
+        'trip_id': np.repeat(viagens, paradas_por_viagem),
+        'arrival_time': _horario_gtfs(chegada, rng),
+        'departure_time': _horario_gtfs(chegada + 20, rng),
+        'stop_id': rng.integers(0, num_paradas, n_horarios).astype(str),
+        'stop_sequence': np.tile(np.arange(1, paradas_por_viagem + 1), num_viagens),
+    })
+    # ~1% de linhas duplicadas, como em feeds reais exportados mais de uma vez
+    duplicadas = tabelas['stop_times'].sample(frac=0.01, random_state=seed)
+    tabelas['stop_times'] = pd.concat([tabelas['stop_times'], duplicadas]).sort_index(kind='stable')
+
+    tabelas['fare_attributes'] = pd.DataFrame({
+        'fare_id': ['A', 'B'], 'price': [4.30, 5.95], 'currency_type': ['BRL', 'BRL'],
+        'payment_method': [0, 0], 'transfers': [0, 1], 'agency_id': ['1', '1'],
+    })
+    tabelas['fare_rules'] = pd.DataFrame({
+        'fare_id': np.where(np.arange(num_rotas) % 3 == 0, 'B', 'A'), 'route_id': rotas,
+    })
+    tabelas['feed_info'] = pd.DataFrame({
+        'feed_publisher_name': ['Grande Recife'], 'feed_publisher_url': ['https://www.granderecife.pe.gov.br'],
+        'feed_lang': ['pt'], 'feed_start_date': [20250101], 'feed_end_date': [20251231], 'feed_version': ['2025.1'],
+    })
+
+    linhas = {}
+    for nome, df in tabelas.items():
+        df.to_csv(os.path.join(diretorio, f"{nome}.txt"), index=False)
+        linhas[nome] = len(df)
+    return linhas
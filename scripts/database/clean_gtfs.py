@@ -1,8 +1,20 @@
 #!/usr/bin/env python3
 import os
+import csv
+import heapq
+import pickle
+import shutil
+import argparse
+import tempfile
 import pandas as pd
 import numpy as np
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+from processed_io import OUTPUT_FORMATS, PARQUET_SUFFIX, resolve_csv_dtypes, with_suffix, save_processed, csv_to_parquet
+from manifest import MANIFEST_FILENAME, load_manifest, save_manifest, is_up_to_date, record_output, get_output_info
+from instrumentation import METRICS_FILE, configure, file_bytes, peak_rss_mb, reset_peak_rss, stage
+from gtfs_shapes import fill_shape_distances
 
 # ---------- Paths ----------
 # Detectar diretório raiz do projeto
@@ -18,34 +30,63 @@ if not os.path.exists(os.path.join(project_root, "README.md")):
 
 RAW_DIR = os.path.join(project_root, "data", "raw", "gtfs")
 PROCESSED_DIR = os.path.join(project_root, "data", "processed", "gtfs")
-os.makedirs(PROCESSED_DIR, exist_ok=True)
 
-print(f"[INFO] Base: {BASE_DIR}")
-print(f"[INFO] Raw GTFS: {RAW_DIR}")
-print(f"[INFO] Processed GTFS: {PROCESSED_DIR}")
+# Versão da limpeza: incrementar quando alguma regra mudar, para que o
+# manifesto force a limpeza de todas as tabelas
+CLEANER_VERSION = "3"
+
+# Tabelas grandes limpas em partições e a coluna usada no hash. Todas as linhas de
+# um mesmo trip_id/shape_id caem na mesma partição, então a deduplicação por
+# partição é equivalente à deduplicação da tabela inteira
+PARTITIONED_TABLES = {
+    'stop_times': 'trip_id',
+    'shapes': 'shape_id',
+}
+
+# Linhas lidas por bloco do arquivo bruto
+CHUNK_ROWS = 500000
+
+# Tamanho aproximado (em bytes do arquivo bruto) de cada partição
+PARTITION_BYTES = 64 * 1024 * 1024
+
+# Colunas texto viram category quando a fração de valores distintos não passa deste limite
+CATEGORY_MAX_RATIO = 0.5
+
+# Coluna auxiliar com a posição original da linha, usada para manter a ordem na saída
+ROW_COLUMN = '__linha'
 
 # ---------- Helpers ----------
 
-def read_csv_safe(base_name: str, base_dir: str, **kwargs) -> pd.DataFrame:
+def find_input_file(base_name: str, base_dir: str) -> Optional[str]:
     """
-    Tenta ler arquivo CSV/GTFS com extensões .txt ou .csv
+    Localiza o arquivo GTFS bruto com extensão .txt ou .csv
     """
     # Tentar .txt primeiro (formato padrão GTFS), depois .csv
     for ext in ['.txt', '.csv']:
         path = os.path.join(base_dir, base_name + ext)
         if os.path.exists(path):
-            try:
-                df = pd.read_csv(path, **kwargs)
-                print(f"[OK] Carregado: {os.path.basename(path)} ({df.shape[0]} linhas, {df.shape[1]} colunas)")
-                return df
-            except Exception as e:
-                print(f"[ERRO] Falha ao carregar {path}: {e}")
-                return None
-    
-    print(f"[AVISO] Arquivo não encontrado: {base_name}.txt ou {base_name}.csv em {base_dir}")
+            return path
     return None
 
 
+def read_csv_safe(base_name: str, base_dir: str, **kwargs) -> pd.DataFrame:
+    """
+    Tenta ler arquivo CSV/GTFS com extensões .txt ou .csv
+    """
+    path = find_input_file(base_name, base_dir)
+    if path is None:
+        print(f"[AVISO] Arquivo não encontrado: {base_name}.txt ou {base_name}.csv em {base_dir}")
+        return None
+
+    try:
+        df = pd.read_csv(path, **kwargs)
+        print(f"[OK] Carregado: {os.path.basename(path)} ({df.shape[0]} linhas, {df.shape[1]} colunas)")
+        return df
+    except Exception as e:
+        print(f"[ERRO] Falha ao carregar {path}: {e}")
+        return None
+
+
 def to_int_series(s: pd.Series) -> pd.Series:
     return pd.to_numeric(s, errors='coerce').astype('Int64')
 
@@ -55,7 +96,20 @@ def to_float_series(s: pd.Series) -> pd.Series:
 
 
 def strip_series(s: pd.Series) -> pd.Series:
-    return s.astype(str).str.strip()
+    """
+    Converte para texto sem espaços nas pontas (valores nulos viram 'nan', como em
+    astype(str)). O texto é tratado uma vez por valor distinto; colunas repetitivas
+    (route_id, service_id, trip_id em stop_times...) saem como category, e
+    deduplicações passam a comparar os códigos inteiros
+    """
+    codes, uniques = pd.factorize(s, use_na_sentinel=False)
+    stripped = pd.Series(uniques).astype(str).str.strip()
+    # valores diferentes podem ficar iguais após o strip (' T1' e 'T1')
+    stripped_codes, categories = pd.factorize(stripped)
+    values = pd.Categorical.from_codes(stripped_codes[codes], categories=categories)
+    if not len(s) or len(categories) > CATEGORY_MAX_RATIO * len(s):
+        return pd.Series(values, index=s.index).astype(categories.dtype)
+    return pd.Series(values, index=s.index)
 
 
 def normalize_time_hhmmss(x: str) -> str:
@@ -96,50 +150,98 @@ def normalize_time_hhmmss(x: str) -> str:
         return None
 
 
-def save_df(df: pd.DataFrame, name: str):
+# Formatos tratados de forma vetorizada; o resto cai em normalize_time_hhmmss
+TIME_COLON_PATTERN = r'^([0-9]{1,9}):([0-9]{1,9})(?::([0-9]{1,9}))?$'
+TIME_DIGITS_PATTERN = r'^[0-9]{1,15}$'
+TIME_NORMALIZED_PATTERN = r'^([0-9]{1,9}):([0-9]{1,9}):([0-9]{1,9})$'
+
+
+def _format_hhmmss(hh: pd.Series, mm: pd.Series, ss: pd.Series) -> pd.Series:
+    """Monta HH:MM:SS a partir de colunas inteiras não negativas (horas >= 24 preservadas)"""
+    return (hh.astype(str).str.zfill(2) + ':' + mm.astype(str).str.zfill(2) + ':'
+            + ss.astype(str).str.zfill(2))
+
+
+def _normalize_time_values(values: pd.Series) -> pd.Series:
+    """
+    Normaliza valores distintos (não nulos, já como texto sem espaços nas pontas).
+    HH:MM:SS, HH:MM e sequências só de dígitos são resolvidos com regex e aritmética
+    inteira; valores fora desses formatos usam normalize_time_hhmmss (mesmo resultado)
+    """
+    result = pd.Series(None, index=values.index, dtype=object)
+
+    # HH:MM:SS ou HH:MM
+    parts = values.str.extract(TIME_COLON_PATTERN)
+    colon = parts[0].notna()
+    if colon.any():
+        p = parts[colon]
+        result[colon] = _format_hhmmss(p[0].astype(np.int64), p[1].astype(np.int64),
+                                       p[2].fillna('0').astype(np.int64))
+
+    # Só dígitos: HHMMSS (5+ dígitos) ou HMM/MM (2-3 dígitos); 1 ou 4 dígitos são inválidos
+    digits = ~colon & values.str.fullmatch(TIME_DIGITS_PATTERN)
+    if digits.any():
+        number = values[digits].astype(np.int64)
+        length = values[digits].str.len()
+        long_form = number[length >= 5]
+        short_form = number[length.between(2, 3)]
+        result[long_form.index] = _format_hhmmss(long_form // 10000, long_form // 100 % 100, long_form % 100)
+        result[short_form.index] = _format_hhmmss(short_form // 100, short_form % 100, short_form * 0)
+
+    # Demais casos (espaços internos, separadores estranhos, vazios...)
+    others = ~(colon | digits)
+    if others.any():
+        result[others] = values[others].map(normalize_time_hhmmss)
+    return result
+
+
+def normalize_time_column(s: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Versão vetorizada de normalize_time_hhmmss para uma coluna inteira. Retorna os
+    horários HH:MM:SS e os segundos desde o início do dia de serviço (Int64).
+    Horários se repetem muito no GTFS: cada valor distinto é normalizado uma única vez
+    """
+    codes, uniques = pd.factorize(s)
+    if len(uniques) == 0:
+        return (pd.Series(None, index=s.index, dtype=object),
+                pd.Series(pd.NA, index=s.index, dtype='Int64'))
+
+    distinct = _normalize_time_values(pd.Series(uniques, dtype=object).astype(str).str.strip())
+    parts = distinct.str.extract(TIME_NORMALIZED_PATTERN).astype(float)
+    seconds = parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+    # código -1 = valor nulo
+    missing = codes < 0
+    codes = np.where(missing, 0, codes)
+    times = distinct.to_numpy()[codes]
+    times[missing] = None
+    total = seconds.to_numpy()[codes]
+    total[missing] = np.nan
+    return (pd.Series(times, index=s.index, dtype=object),
+            pd.Series(total, index=s.index).astype('Int64'))
+
+
+def save_df(df: pd.DataFrame, name: str, formato: str = 'csv'):
     if df is None:
         print(f"[AVISO] {name} está vazio, não será salvo.")
         return
     out = os.path.join(PROCESSED_DIR, name)
-    df.to_csv(out, index=False, encoding='utf-8')
-    print(f"[OK] Salvo: {name} ({df.shape[0]} linhas)")
-
-# ---------- Load raw GTFS ----------
-files = {
-    'agency': 'agency',
-    'calendar': 'calendar',
-    'calendar_dates': 'calendar_dates',
-    'fare_attributes': 'fare_attributes',
-    'fare_rules': 'fare_rules',
-    'feed_info': 'feed_info',
-    'routes': 'routes',
-    'shapes': 'shapes',
-    'stop_times': 'stop_times',
-    'stops': 'stops',
-    'trips': 'trips',
-}
+    for path in save_processed(df, out, formato):
+        print(f"[OK] Salvo: {os.path.basename(path)} ({df.shape[0]} linhas)")
 
-raw: Dict[str, pd.DataFrame] = {}
-for key, base_name in files.items():
-    raw[key] = read_csv_safe(base_name, RAW_DIR)
 
-print("\n=== LIMPEZA E PADRONIZAÇÃO GTFS ===")
+# ---------- Limpeza por tabela ----------
+# Cada função recebe o DataFrame bruto (não vazio) e retorna o DataFrame limpo
 
-# ---------- agency ----------
-agency = raw.get('agency')
-if agency is not None and not agency.empty:
+def clean_agency(agency: pd.DataFrame) -> pd.DataFrame:
     agency = agency.copy()
     for col in ['agency_id','agency_name','agency_url','agency_timezone','agency_lang','agency_phone','agency_fare_url','agency_email']:
         if col in agency.columns:
             agency[col] = agency[col].astype(str).str.strip()
-    agency = agency.drop_duplicates(subset=['agency_id'])
-    print(f"[OK] agency limpo: {agency.shape}")
-else:
-    agency = None
-
-# ---------- calendar ----------
-calendar = raw.get('calendar')
-if calendar is not None and not calendar.empty:
+    return agency.drop_duplicates(subset=['agency_id'])
+
+
+def clean_calendar(calendar: pd.DataFrame) -> pd.DataFrame:
     calendar = calendar.copy()
     # coagir dias para 0/1
     for col in ['monday','tuesday','wednesday','thursday','friday','saturday','sunday']:
@@ -150,42 +252,30 @@ if calendar is not None and not calendar.empty:
         if col in calendar.columns:
             calendar[col] = pd.to_datetime(calendar[col].astype(str), format='%Y%m%d', errors='coerce').dt.date
     calendar['service_id'] = strip_series(calendar['service_id'])
-    calendar = calendar.drop_duplicates(subset=['service_id'])
-    print(f"[OK] calendar limpo: {calendar.shape}")
-else:
-    calendar = None
-
-# ---------- calendar_dates ----------
-calendar_dates = raw.get('calendar_dates')
-if calendar_dates is not None and not calendar_dates.empty:
+    return calendar.drop_duplicates(subset=['service_id'])
+
+
+def clean_calendar_dates(calendar_dates: pd.DataFrame) -> pd.DataFrame:
     calendar_dates = calendar_dates.copy()
     calendar_dates['service_id'] = strip_series(calendar_dates['service_id'])
     if 'exception_type' in calendar_dates.columns:
         calendar_dates['exception_type'] = to_int_series(calendar_dates['exception_type']).fillna(0)
     if 'date' in calendar_dates.columns:
         calendar_dates['date'] = pd.to_datetime(calendar_dates['date'].astype(str), format='%Y%m%d', errors='coerce').dt.date
-    calendar_dates = calendar_dates.drop_duplicates(subset=['service_id','date'])
-    print(f"[OK] calendar_dates limpo: {calendar_dates.shape}")
-else:
-    calendar_dates = None
-
-# ---------- routes ----------
-routes = raw.get('routes')
-if routes is not None and not routes.empty:
+    return calendar_dates.drop_duplicates(subset=['service_id','date'])
+
+
+def clean_routes(routes: pd.DataFrame) -> pd.DataFrame:
     routes = routes.copy()
     for col in ['route_id','agency_id','route_short_name','route_long_name','route_url']:
         if col in routes.columns:
             routes[col] = strip_series(routes[col])
     if 'route_type' in routes.columns:
         routes['route_type'] = to_int_series(routes['route_type'])
-    routes = routes.drop_duplicates(subset=['route_id'])
-    print(f"[OK] routes limpo: {routes.shape}")
-else:
-    routes = None
-
-# ---------- shapes ----------
-shapes = raw.get('shapes')
-if shapes is not None and not shapes.empty:
+    return routes.drop_duplicates(subset=['route_id'])
+
+
+def clean_shapes(shapes: pd.DataFrame) -> pd.DataFrame:
     shapes = shapes.copy()
     shapes['shape_id'] = strip_series(shapes['shape_id'])
     for col in ['shape_pt_lat','shape_pt_lon']:
@@ -197,13 +287,13 @@ if shapes is not None and not shapes.empty:
         shapes['shape_dist_traveled'] = to_float_series(shapes['shape_dist_traveled'])
     # remover duplicatas por par chave
     shapes = shapes.drop_duplicates(subset=['shape_id','shape_pt_sequence'])
-    print(f"[OK] shapes limpo: {shapes.shape}")
-else:
-    shapes = None
+    # distância acumulada (metros) nos traçados que o feed deixou sem shape_dist_traveled
+    if {'shape_pt_lat','shape_pt_lon','shape_pt_sequence'} <= set(shapes.columns):
+        shapes = fill_shape_distances(shapes)
+    return shapes
 
-# ---------- stops ----------
-stops = raw.get('stops')
-if stops is not None and not stops.empty:
+
+def clean_stops(stops: pd.DataFrame) -> pd.DataFrame:
     stops = stops.copy()
     stops['stop_id'] = strip_series(stops['stop_id'])
     for col in ['stop_name','stop_url']:
@@ -214,48 +304,37 @@ if stops is not None and not stops.empty:
             stops[col] = to_float_series(stops[col])
     if 'location_type' in stops.columns:
         stops['location_type'] = to_int_series(stops['location_type']).fillna(0)
-    stops = stops.drop_duplicates(subset=['stop_id'])
-    print(f"[OK] stops limpo: {stops.shape}")
-else:
-    stops = None
-
-# ---------- trips ----------
-trips = raw.get('trips')
-if trips is not None and not trips.empty:
+    return stops.drop_duplicates(subset=['stop_id'])
+
+
+def clean_trips(trips: pd.DataFrame) -> pd.DataFrame:
     trips = trips.copy()
     for col in ['route_id','service_id','trip_id','trip_headsign','shape_id']:
         if col in trips.columns:
             trips[col] = strip_series(trips[col])
     if 'direction_id' in trips.columns:
         trips['direction_id'] = to_int_series(trips['direction_id']).fillna(0)
-    trips = trips.drop_duplicates(subset=['trip_id'])
-    print(f"[OK] trips limpo: {trips.shape}")
-else:
-    trips = None
-
-# ---------- stop_times ----------
-stop_times = raw.get('stop_times')
-if stop_times is not None and not stop_times.empty:
+    return trips.drop_duplicates(subset=['trip_id'])
+
+
+def clean_stop_times(stop_times: pd.DataFrame) -> pd.DataFrame:
     stop_times = stop_times.copy()
     for col in ['trip_id','stop_id']:
         if col in stop_times.columns:
             stop_times[col] = strip_series(stop_times[col])
     for tcol in ['arrival_time','departure_time']:
         if tcol in stop_times.columns:
-            stop_times[tcol] = stop_times[tcol].apply(normalize_time_hhmmss)
+            # segundos desde o início do dia de serviço (horas >= 24 continuam crescentes)
+            stop_times[tcol], stop_times[f'{tcol}_seconds'] = normalize_time_column(stop_times[tcol])
     if 'stop_sequence' in stop_times.columns:
         stop_times['stop_sequence'] = to_int_series(stop_times['stop_sequence'])
     # remover registros sem trip_id ou stop_id
     stop_times = stop_times[stop_times['trip_id'].notna() & stop_times['stop_id'].notna()]
     # remover duplicatas
-    stop_times = stop_times.drop_duplicates(subset=['trip_id','stop_sequence'])
-    print(f"[OK] stop_times limpo: {stop_times.shape}")
-else:
-    stop_times = None
-
-# ---------- fare_attributes ----------
-fare_attributes = raw.get('fare_attributes')
-if fare_attributes is not None and not fare_attributes.empty:
+    return stop_times.drop_duplicates(subset=['trip_id','stop_sequence'])
+
+
+def clean_fare_attributes(fare_attributes: pd.DataFrame) -> pd.DataFrame:
     fare_attributes = fare_attributes.copy()
     for col in ['fare_id','currency_type','agency_id']:
         if col in fare_attributes.columns:
@@ -265,26 +344,18 @@ if fare_attributes is not None and not fare_attributes.empty:
     for col in ['payment_method','transfers']:
         if col in fare_attributes.columns:
             fare_attributes[col] = to_int_series(fare_attributes[col])
-    fare_attributes = fare_attributes.drop_duplicates(subset=['fare_id'])
-    print(f"[OK] fare_attributes limpo: {fare_attributes.shape}")
-else:
-    fare_attributes = None
-
-# ---------- fare_rules ----------
-fare_rules = raw.get('fare_rules')
-if fare_rules is not None and not fare_rules.empty:
+    return fare_attributes.drop_duplicates(subset=['fare_id'])
+
+
+def clean_fare_rules(fare_rules: pd.DataFrame) -> pd.DataFrame:
     fare_rules = fare_rules.copy()
     for col in ['fare_id','route_id']:
         if col in fare_rules.columns:
             fare_rules[col] = strip_series(fare_rules[col])
-    fare_rules = fare_rules.drop_duplicates(subset=['fare_id','route_id'])
-    print(f"[OK] fare_rules limpo: {fare_rules.shape}")
-else:
-    fare_rules = None
-
-# ---------- feed_info ----------
-feed_info = raw.get('feed_info')
-if feed_info is not None and not feed_info.empty:
+    return fare_rules.drop_duplicates(subset=['fare_id','route_id'])
+
+
+def clean_feed_info(feed_info: pd.DataFrame) -> pd.DataFrame:
     feed_info = feed_info.copy()
     for col in ['feed_publisher_name','feed_publisher_url','feed_lang','feed_version','feed_contact_email','feed_contact_url']:
         if col in feed_info.columns:
@@ -292,39 +363,271 @@ if feed_info is not None and not feed_info.empty:
     for col in ['feed_start_date','feed_end_date']:
         if col in feed_info.columns:
             feed_info[col] = pd.to_datetime(feed_info[col].astype(str), format='%Y%m%d', errors='coerce').dt.date
-    print(f"[OK] feed_info limpo: {feed_info.shape}")
-else:
-    feed_info = None
-
-# ---------- Save processed ----------
-save_df(agency, 'agency_clean.csv')
-save_df(calendar, 'calendar_clean.csv')
-save_df(calendar_dates, 'calendar_dates_clean.csv')
-save_df(fare_attributes, 'fare_attributes_clean.csv')
-save_df(fare_rules, 'fare_rules_clean.csv')
-save_df(feed_info, 'feed_info_clean.csv')
-save_df(routes, 'routes_clean.csv')
-save_df(shapes, 'shapes_clean.csv')
-save_df(stop_times, 'stop_times_clean.csv')
-save_df(stops, 'stops_clean.csv')
-save_df(trips, 'trips_clean.csv')
-
-# ---------- Quick summary ----------
-print("\n=== RESUMO ===")
-for name, df in {
-    'agency': agency,
-    'calendar': calendar,
-    'calendar_dates': calendar_dates,
-    'fare_attributes': fare_attributes,
-    'fare_rules': fare_rules,
-    'feed_info': feed_info,
-    'routes': routes,
-    'shapes': shapes,
-    'stop_times': stop_times,
-    'stops': stops,
-    'trips': trips,
-}.items():
-    if df is not None:
-        print(f"[OK] {name}: {df.shape[0]} linhas")
+    return feed_info
+
+
+# Tabelas GTFS (nome do arquivo bruto sem extensão) e sua função de limpeza
+CLEANERS = {
+    'agency': clean_agency,
+    'calendar': clean_calendar,
+    'calendar_dates': clean_calendar_dates,
+    'fare_attributes': clean_fare_attributes,
+    'fare_rules': clean_fare_rules,
+    'feed_info': clean_feed_info,
+    'routes': clean_routes,
+    'shapes': clean_shapes,
+    'stop_times': clean_stop_times,
+    'stops': clean_stops,
+    'trips': clean_trips,
+}
+
+
+# ---------- Limpeza particionada (stop_times, shapes) ----------
+
+def partition_raw_file(raw_path: str, key_col: str, num_partitions: int, temp_dir: str,
+                       chunk_rows: int) -> Tuple[int, List[str]]:
+    """
+    Lê o arquivo bruto em blocos e distribui as linhas em partições pelo hash da chave.
+    Os dtypes são resolvidos antes sobre o arquivo inteiro, para que cada bloco tenha
+    os mesmos tipos de um pd.read_csv completo. Retorna (num_linhas, arquivos das partições)
+    """
+    _, dtypes = resolve_csv_dtypes(raw_path, chunk_rows)
+    part_paths = [os.path.join(temp_dir, f"parte_{idx:04d}.pkl") for idx in range(num_partitions)]
+    part_files = [open(path, 'wb') for path in part_paths]
+    num_rows = 0
+    try:
+        for chunk in pd.read_csv(raw_path, chunksize=chunk_rows, dtype=dtypes):
+            chunk.insert(0, ROW_COLUMN, np.arange(num_rows, num_rows + len(chunk), dtype=np.int64))
+            num_rows += len(chunk)
+            keys = pd.util.hash_array(strip_series(chunk[key_col]).to_numpy(dtype=object))
+            buckets = keys % np.uint64(num_partitions)
+            for idx, part in chunk.groupby(buckets, sort=False):
+                pickle.dump(part, part_files[idx], protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        for f in part_files:
+            f.close()
+    return num_rows, part_paths
+
+
+def clean_partition(job: Tuple[str, str, str]) -> Tuple[Optional[str], int, Dict[str, object], int, Optional[float]]:
+    """
+    Limpa uma partição (executado nos processos do pool) e grava o resultado em CSV
+    com a coluna de posição original. Retorna (arquivo limpo, num_linhas, dtypes, pid,
+    pico de RSS do processo em MB), para a métrica da etapa de limpeza
+    """
+    name, part_path, out_path = job
+    blocks = []
+    with open(part_path, 'rb') as f:
+        while True:
+            try:
+                blocks.append(pickle.load(f))
+            except EOFError:
+                break
+    os.remove(part_path)
+
+    if not blocks:
+        return None, 0, {}, os.getpid(), peak_rss_mb()
+
+    df = CLEANERS[name](pd.concat(blocks))
+    df.to_csv(out_path, index=False, encoding='utf-8')
+    return out_path, len(df), dict(df.drop(columns=[ROW_COLUMN]).dtypes.items()), os.getpid(), peak_rss_mb()
+
+
+def merge_partitions(part_paths: List[str], output_path: str) -> int:
+    """
+    Intercala as partições limpas pela posição original das linhas, gravando o CSV
+    final em streaming na mesma ordem que a limpeza da tabela inteira produziria
+    """
+    readers = []
+    files = [open(path, 'r', encoding='utf-8', newline='') for path in part_paths]
+    try:
+        header = None
+        for f in files:
+            reader = csv.reader(f)
+            header = next(reader)
+            readers.append(reader)
+
+        num_rows = 0
+        with open(output_path, 'w', encoding='utf-8', newline='') as out:
+            writer = csv.writer(out, lineterminator='\n')
+            writer.writerow(header[1:])
+            for row in heapq.merge(*readers, key=lambda row: int(row[0])):
+                writer.writerow(row[1:])
+                num_rows += 1
+        return num_rows
+    finally:
+        for f in files:
+            f.close()
+
+
+def clean_partitioned_table(name: str, raw_path: str, output_name: str, jobs: int = 1,
+                            chunk_rows: int = CHUNK_ROWS, formato: str = 'csv') -> Optional[int]:
+    """
+    Limpa uma tabela grande sem carregá-la inteira: particiona por hash da chave,
+    limpa as partições (em paralelo com jobs > 1) e intercala o resultado em
+    streaming. Retorna o número de linhas salvas
+    """
+    key_col = PARTITIONED_TABLES[name]
+    num_partitions = max(jobs, os.path.getsize(raw_path) // PARTITION_BYTES + 1)
+    output_path = os.path.join(PROCESSED_DIR, output_name)
+    temp_dir = tempfile.mkdtemp(prefix=f"{name}_", dir=PROCESSED_DIR)
+
+    try:
+        try:
+            with stage(name, 'leitura') as metric:
+                num_rows, part_paths = partition_raw_file(raw_path, key_col, num_partitions, temp_dir, chunk_rows)
+                metric['linhas'] = num_rows
+        except Exception as e:
+            print(f"[ERRO] Falha ao carregar {raw_path}: {e}")
+            return None
+        if num_rows == 0:
+            print(f"[AVISO] {output_name} está vazio, não será salvo.")
+            return None
+        print(f"[OK] Carregado: {os.path.basename(raw_path)} ({num_rows} linhas em {num_partitions} partições)")
+
+        part_jobs = [(name, path, path.replace('.pkl', '_clean.csv')) for path in part_paths]
+        with stage(name, 'limpeza') as metric:
+            if jobs > 1:
+                print(f"[INFO] Limpando partições com {jobs} processos")
+                # Cada processo começa com o pico de RSS zerado: o pico medido é o da limpeza
+                with ProcessPoolExecutor(max_workers=jobs, initializer=reset_peak_rss) as pool:
+                    results = list(pool.map(clean_partition, part_jobs))
+                # Os processos rodam ao mesmo tempo: soma do maior pico de cada um
+                worker_peaks = {}
+                for _, _, _, pid, peak in results:
+                    if peak is not None:
+                        worker_peaks[pid] = max(peak, worker_peaks.get(pid, 0.0))
+                if worker_peaks:
+                    metric['pico_rss_mb'] = sum(worker_peaks.values())
+            else:
+                results = [clean_partition(job) for job in part_jobs]
+            metric['linhas'] = sum(rows for _, rows, _, _, _ in results)
+
+        cleaned_paths = [path for path, _, _, _, _ in results if path]
+        # dtypes da limpeza (Int64 etc.), preservados na conversão para Parquet
+        dtypes = next(dtypes for path, _, dtypes, _, _ in results if path)
+        temp_output = os.path.join(temp_dir, output_name)
+        with stage(name, 'escrita') as metric:
+            saved_rows = merge_partitions(cleaned_paths, temp_output)
+            print(f"[OK] {name} limpo: {saved_rows} linhas")
+
+            # Parquet convertido do CSV final em blocos, sem carregar a tabela
+            saved_paths = []
+            for suffix in reversed(OUTPUT_FORMATS[formato]):
+                path = with_suffix(output_path, suffix)
+                if suffix == PARQUET_SUFFIX:
+                    temp_parquet = with_suffix(temp_output, PARQUET_SUFFIX)
+                    csv_to_parquet(temp_output, temp_parquet, chunk_rows, dtypes)
+                    os.replace(temp_parquet, path)
+                else:
+                    os.replace(temp_output, path)
+                saved_paths.append(path)
+                print(f"[OK] Salvo: {os.path.basename(path)} ({saved_rows} linhas)")
+            metric['linhas'] = saved_rows
+            metric['bytes_escritos'] = file_bytes(*saved_paths)
+        return saved_rows
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def process_table(name: str, manifest: Dict, force: bool = False, jobs: int = 1,
+                  chunk_rows: int = CHUNK_ROWS, formato: str = 'csv') -> Optional[int]:
+    """
+    Carrega, limpa e salva uma tabela GTFS. Se o manifesto indicar que o arquivo bruto
+    não mudou desde a última limpeza, reaproveita a saída existente.
+    Retorna o número de linhas salvas (ou None se a tabela não estiver disponível)
+    """
+    output_name = f"{name}_clean.csv"
+    output_path = os.path.join(PROCESSED_DIR, output_name)
+    output_paths = [with_suffix(output_path, suffix) for suffix in OUTPUT_FORMATS[formato]]
+    raw_path = find_input_file(name, RAW_DIR)
+
+    if not force and raw_path and all(is_up_to_date(manifest, path, [raw_path], CLEANER_VERSION)
+                                      for path in output_paths):
+        rows = get_output_info(manifest, output_paths[0]).get('linhas')
+        print(f"[OK] Sem alterações: {os.path.basename(raw_path)} ({output_name} mantido)")
+        return rows
+
+    if name in PARTITIONED_TABLES and raw_path:
+        rows = clean_partitioned_table(name, raw_path, output_name, jobs, chunk_rows, formato)
+        if rows is not None:
+            for path in output_paths:
+                record_output(manifest, path, [raw_path], CLEANER_VERSION, linhas=int(rows))
+        return rows
+
+    with stage(name, 'leitura') as metric:
+        df = read_csv_safe(name, RAW_DIR)
+        metric['linhas'] = len(df) if df is not None else 0
+    if df is not None and not df.empty:
+        with stage(name, 'limpeza') as metric:
+            df = CLEANERS[name](df)
+            metric['linhas'] = len(df)
+        print(f"[OK] {name} limpo: {df.shape}")
     else:
-        print(f"[--] {name}: não disponível")
+        df = None
+
+    if df is None:
+        save_df(df, output_name, formato)
+        return None
+
+    with stage(name, 'escrita') as metric:
+        save_df(df, output_name, formato)
+        metric['linhas'] = len(df)
+        metric['bytes_escritos'] = file_bytes(*output_paths)
+
+    for path in output_paths:
+        record_output(manifest, path, [raw_path], CLEANER_VERSION, linhas=int(df.shape[0]))
+    return df.shape[0]
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Limpa e padroniza os arquivos GTFS brutos")
+    parser.add_argument("--forcar", action="store_true",
+                        help="Limpa todas as tabelas, ignorando o manifesto de alterações")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Processos usados na limpeza particionada de stop_times e shapes (padrão: 1)")
+    parser.add_argument("--linhas-por-bloco", type=int, default=CHUNK_ROWS,
+                        help=f"Linhas lidas por bloco dos arquivos grandes (padrão: {CHUNK_ROWS})")
+    parser.add_argument("--formato", choices=sorted(OUTPUT_FORMATS), default='csv',
+                        help="Formato dos arquivos limpos: csv, parquet ou ambos (padrão: csv)")
+    parser.add_argument("--metricas", nargs="?", const=METRICS_FILE, metavar="ARQUIVO",
+                        help=f"Grava tempo, linhas/s, bytes e pico de memória de cada etapa em JSON lines "
+                             f"(padrão: {METRICS_FILE})")
+    args = parser.parse_args()
+
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    # Caminho relativo à raiz do projeto; os processos do pool herdam a configuração
+    metrics_path = os.path.join(project_root, args.metricas) if args.metricas else None
+    if metrics_path:
+        configure(metrics_path, "clean_gtfs")
+
+    print(f"[INFO] Base: {BASE_DIR}")
+    print(f"[INFO] Raw GTFS: {RAW_DIR}")
+    print(f"[INFO] Processed GTFS: {PROCESSED_DIR}")
+    if metrics_path:
+        print(f"[INFO] Métricas das etapas: {metrics_path}")
+
+    # Manifesto com os hashes dos arquivos brutos de cada tabela limpa
+    manifest_path = os.path.join(PROCESSED_DIR, MANIFEST_FILENAME)
+    manifest = load_manifest(manifest_path)
+
+    print("\n=== LIMPEZA E PADRONIZAÇÃO GTFS ===")
+
+    rows: Dict[str, Optional[int]] = {}
+    for name in CLEANERS:
+        print(f"\n--- {name} ---")
+        rows[name] = process_table(name, manifest, args.forcar, args.jobs, args.linhas_por_bloco, args.formato)
+        save_manifest(manifest_path, manifest)
+
+    # ---------- Quick summary ----------
+    print("\n=== RESUMO ===")
+    for name, count in rows.items():
+        if count is not None:
+            print(f"[OK] {name}: {count} linhas")
+        else:
+            print(f"[--] {name}: não disponível")
+
+
+if __name__ == "__main__":
+    main()
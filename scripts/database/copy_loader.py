@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Script para carregar os CSVs processados diretamente no PostgreSQL via COPY FROM STDIN.
+
+Alternativa ao generate_sql_inserts.py + psql: os DataFrames limpos são enviados
+direto ao banco, sem gerar os arquivos *_complete.sql e sem o custo do servidor
+interpretar milhões de INSERTs. Usa os mesmos schemas (schema_model.py) e as
+mesmas regras de nomes de tabelas do gerador de SQL.
+
+Funciona tanto para CSVs normais quanto para GTFS, e lê também os arquivos
+processados em Parquet (processed_io.py).
+"""
+
+import os
+import io
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+from dotenv import load_dotenv
+
+from generate_sql_inserts import (
+    detect_project_root,
+    find_matching_schema,
+    load_table_dataframe,
+    gtfs_schema_sql,
+    monthly_partition,
+    monthly_report_bounds,
+)
+from deferred_ddl import (
+    KIND_FOREIGN_KEY,
+    apply_deferred,
+    drop_foreign_keys_sql,
+    gtfs_deferred_ddl,
+    ordered_ddl,
+    print_validation_report,
+    split_deferred_ddl,
+)
+from incremental import (
+    changed_rows,
+    ensure_key_index,
+    load_state,
+    natural_key,
+    row_hashes,
+    save_state,
+    staging_sql,
+    state_schema_path,
+    upsert_sql,
+)
+from processed_io import csv_filename, list_processed_files
+from rollups import rollup_refresh_sql
+
+
+# Quantidade de linhas enviadas por chamada de COPY
+COPY_CHUNK_ROWS = 100000
+
+# Tabelas GTFS referenciadas por chaves estrangeiras (deferred_ddl.py): carregadas
+# antes das que as referenciam, para que uma carga incremental não viole as chaves
+GTFS_LOAD_FIRST = ['routes', 'stops', 'trips']
+
+
+def connection_params(project_root: str) -> Dict[str, str]:
+    """Parâmetros de conexão (psycopg2.connect / pool) a partir das variáveis do .env"""
+    load_dotenv(os.path.join(project_root, ".env"))
+
+    database_url = os.getenv("DATABASE_URL")
+    if database_url:
+        return {'dsn': database_url}
+
+    return {
+        'host': os.getenv("DB_HOST", "localhost"),
+        'port': os.getenv("DB_PORT", "5432"),
+        'dbname': os.getenv("POSTGRES_DB", "urbanflow"),
+        'user': os.getenv("POSTGRES_USER", "postgres"),
+        'password': os.getenv("POSTGRES_PASSWORD", "postgres"),
+    }
+
+
+def get_connection(project_root: str):
+    """Abre conexão com o PostgreSQL usando as variáveis do .env"""
+    return psycopg2.connect(**connection_params(project_root))
+
+
+def prepare_copy_frame(df: pd.DataFrame, column_types: Dict[str, str]) -> pd.DataFrame:
+    """Ajusta os valores do DataFrame para o formato texto aceito pelo COPY"""
+    df = df.copy()
+    for col in df.columns:
+        col_type = column_types.get(col)
+        # O INSERT aceita 5.0 em coluna INTEGER (cast implícito), o COPY não
+        if col_type == 'INTEGER' and pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].round().astype('Int64')
+        elif col_type == 'BOOLEAN' and pd.api.types.is_bool_dtype(df[col]):
+            df[col] = df[col].map({True: 't', False: 'f'})
+    return df
+
+
+def copy_dataframe(cursor, df: pd.DataFrame, table_name: str, column_types: Dict[str, str],
+                   chunk_rows: int = COPY_CHUNK_ROWS) -> int:
+    """Envia o DataFrame para a tabela via COPY FROM STDIN em blocos. Retorna o número de registros"""
+    columns_str = ", ".join([f'"{col}"' for col in df.columns])
+    copy_sql = f"COPY {table_name} ({columns_str}) FROM STDIN WITH (FORMAT csv)"
+
+    df = prepare_copy_frame(df, column_types)
+    total_chunks = (len(df) + chunk_rows - 1) // chunk_rows
+
+    for chunk_idx in range(total_chunks):
+        chunk = df.iloc[chunk_idx * chunk_rows:(chunk_idx + 1) * chunk_rows]
+        buffer = io.StringIO()
+        chunk.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
+        print(f"  [PROGRESSO] Bloco {chunk_idx + 1}/{total_chunks} ({len(chunk)} registros)")
+
+    return len(df)
+
+
+def load_csv_with_copy(conn, csv_path: str, schema_path: Optional[str], gtfs: bool = False,
+                       truncate: bool = False, incremental: bool = False, force: bool = False,
+                       project_root: Optional[str] = None, refresh_rollups: bool = True,
+                       deferred_ddl: Optional[List[str]] = None) -> Tuple[Optional[str], int]:
+    """
+    Carrega um CSV processado na sua tabela via COPY. Retorna (table_name, num_records).
+    No modo incremental, só as linhas novas ou alteradas desde a última carga são
+    enviadas e aplicadas com upsert pela chave natural (incremental.py).
+    Com deferred_ddl, os índices do schema não são criados: os comandos são
+    acrescentados à lista para serem executados depois da carga (setup_database.py)
+    """
+    try:
+        table_name, df, schema, schema_content = load_table_dataframe(csv_path, schema_path)
+        if df is None:
+            return None, 0
+
+        if schema_path:
+            with open(schema_path, 'r', encoding='utf-8') as f:
+                schema_content = f.read()
+
+        if gtfs:
+            schema_content = gtfs_schema_sql(schema)
+            table_name = f"gtfs_{table_name}"
+
+        # Relatório mensal: cria a partição do mês; o COPY na tabela particionada
+        # encaminha cada linha para a partição da sua data
+        partition = monthly_partition(csv_path, table_name) if schema_path else None
+        if partition:
+            schema_content += "\n\n" + partition[1]
+        if deferred_ddl is not None:
+            schema_content, deferred = split_deferred_ddl(schema_content)
+            deferred_ddl.extend(deferred)
+
+        # GTFS não tem schema em arquivo: os tipos vêm do schema inferido
+        column_types = schema.column_types
+
+        target = partition[0] if partition else table_name
+        keys = natural_key(table_name, list(df.columns)) if incremental else None
+        if incremental and not keys:
+            print(f"[AVISO] {table_name} não tem chave natural declarada em incremental.py, pulando...")
+            return None, 0
+
+        if keys:
+            # Estado da última carga registrado neste banco (incremental.py)
+            with open(state_schema_path(project_root or detect_project_root()), 'r', encoding='utf-8') as f:
+                state_schema = f.read()
+            hashes = row_hashes(df)
+            with conn.cursor() as cursor:
+                cursor.execute(state_schema)
+                stored = load_state(cursor, target)
+            previous = np.empty(0, dtype=np.uint64) if force or truncate else stored
+            delta = changed_rows(df, hashes, previous, keys)
+            print(f"[INFO] Linhas novas ou alteradas: {len(delta)} de {len(df)}")
+            if delta.empty and not truncate:
+                with conn.cursor() as cursor:
+                    save_state(cursor, target, stored, hashes)
+                conn.commit()
+                print(f"[OK] {target} já está atualizada")
+                return table_name, 0
+
+        with conn.cursor() as cursor:
+            cursor.execute(schema_content)
+            if truncate:
+                # Nos relatórios mensais, esvazia só a partição do mês
+                cursor.execute(f"TRUNCATE TABLE {target}")
+            if keys:
+                staging = f"{table_name}_delta"
+                ensure_key_index(cursor, table_name, keys)
+                cursor.execute(staging_sql(table_name, staging, list(delta.columns)))
+                num_records = copy_dataframe(cursor, delta, staging, column_types)
+                cursor.execute(upsert_sql(table_name, staging, list(delta.columns), keys))
+                save_state(cursor, target, stored, hashes)
+            else:
+                num_records = copy_dataframe(cursor, df, table_name, column_types)
+
+            # Agregados do dashboard, na mesma transação da carga (só o mês carregado)
+            rollup_sql = None
+            if refresh_rollups and not gtfs:
+                rollup_sql = rollup_refresh_sql(table_name, monthly_report_bounds(csv_path))
+            if rollup_sql:
+                cursor.execute(rollup_sql)
+                print(f"[OK] Agregados do dashboard atualizados a partir de {table_name}")
+        conn.commit()
+
+        target = f"{table_name} (partição {partition[0]})" if partition else table_name
+        print(f"[SUCESSO] Tabela carregada via COPY: {target} ({num_records} registros)")
+        return table_name, num_records
+
+    except Exception as e:
+        conn.rollback()
+        print(f"[ERRO] Erro ao carregar {csv_path}: {e}")
+        return None, 0
+
+
+def gtfs_load_position(filename: str) -> Tuple[int, str]:
+    """Ordem de carga de um arquivo GTFS: as tabelas referenciadas primeiro"""
+    base = csv_filename(filename).replace("_clean.csv", "")
+    if base in GTFS_LOAD_FIRST:
+        return GTFS_LOAD_FIRST.index(base), filename
+    return len(GTFS_LOAD_FIRST), filename
+
+
+def list_load_jobs(project_root: str) -> List[Tuple[str, Optional[str], bool]]:
+    """Lista os arquivos processados (CSV ou Parquet) a carregar como (csv_path, schema_path, gtfs)"""
+    processed_dir = os.path.join(project_root, "data", "processed")
+    schemas_dir = os.path.join(project_root, "database", "schemas")
+    jobs = []
+
+    if os.path.exists(processed_dir):
+        for csv_file in list_processed_files(processed_dir):
+            schema_path = find_matching_schema(csv_filename(csv_file), schemas_dir)
+            if not schema_path:
+                print(f"[AVISO] Schema não encontrado para {csv_file}, pulando...")
+                continue
+            jobs.append((os.path.join(processed_dir, csv_file), schema_path, False))
+
+    gtfs_locations = [
+        os.path.join(processed_dir, "gtfs"),
+        os.path.join(project_root, "scripts", "database", "processed"),
+    ]
+    for gtfs_dir in gtfs_locations:
+        if os.path.exists(gtfs_dir):
+            for gtfs_file in sorted(list_processed_files(gtfs_dir), key=gtfs_load_position):
+                jobs.append((os.path.join(gtfs_dir, gtfs_file), None, True))
+
+    return jobs
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Carrega os CSVs processados no PostgreSQL via COPY")
+    parser.add_argument("--truncar", action="store_true",
+                        help="Esvazia cada tabela antes de carregar (recarga completa)")
+    parser.add_argument("--tabelas", nargs="*",
+                        help="Carrega apenas os arquivos cujo nome contém algum destes termos")
+    parser.add_argument("--adiar-indices", action="store_true",
+                        help="Cria tabelas sem chaves e índices e os cria (com validação) só depois de carregar tudo")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Envia só as linhas novas ou alteradas desde a última carga, com upsert pela chave natural")
+    parser.add_argument("--forcar", action="store_true",
+                        help="No modo incremental, envia todas as linhas, ignorando o estado da última carga")
+    args = parser.parse_args()
+
+    print("=== CARGA DIRETA VIA COPY NO POSTGRESQL ===\n")
+
+    project_root = detect_project_root()
+    print(f"[INFO] Diretório do projeto: {project_root}\n")
+
+    jobs = list_load_jobs(project_root)
+    if args.tabelas:
+        jobs = [job for job in jobs if any(t in os.path.basename(job[0]) for t in args.tabelas)]
+
+    if not jobs:
+        print("[AVISO] Nenhum CSV processado encontrado para carregar")
+        return
+
+    try:
+        conn = get_connection(project_root)
+    except Exception as e:
+        print(f"[ERRO] Não foi possível conectar ao PostgreSQL: {e}")
+        return
+
+    if args.adiar_indices and args.incremental:
+        print("[AVISO] O modo incremental precisa do índice da chave natural: --adiar-indices ignorado")
+        args.adiar_indices = False
+    deferred_ddl = [] if args.adiar_indices else None
+
+    success = 0
+    errors = 0
+    total_records = 0
+    loaded = set()
+    # Sem as chaves estrangeiras do GTFS durante a carga (o TRUNCATE de uma tabela
+    # referenciada falharia); são recriadas e validadas no fim
+    rebuild_foreign_keys = args.truncar or args.adiar_indices
+    try:
+        if rebuild_foreign_keys:
+            with conn.cursor() as cursor:
+                cursor.execute(drop_foreign_keys_sql())
+            conn.commit()
+
+        for csv_path, schema_path, gtfs in jobs:
+            print(f"\n--- Carregando: {os.path.basename(csv_path)} ---")
+            table_name, num_records = load_csv_with_copy(conn, csv_path, schema_path, gtfs, args.truncar,
+                                                         args.incremental, args.forcar, project_root,
+                                                         deferred_ddl=deferred_ddl)
+            if table_name:
+                success += 1
+                total_records += num_records
+                loaded.add(table_name)
+            else:
+                errors += 1
+
+        # Chaves e índices adiados: primárias, índices e estrangeiras, nesta ordem
+        if rebuild_foreign_keys:
+            items = [item for item in gtfs_deferred_ddl() if item['tipo'] == KIND_FOREIGN_KEY]
+            if deferred_ddl is not None:
+                items = deferred_ddl + gtfs_deferred_ddl(loaded) + items
+            validation = [(item, apply_deferred(conn, item)) for stage in ordered_ddl(items) for item in stage]
+            errors += print_validation_report(validation)
+    finally:
+        conn.close()
+
+    # Resumo final
+    print("\n=== RESUMO ===")
+    print(f"[SUCESSO] Tabelas carregadas: {success} ({total_records} registros)")
+    print(f"[ERRO] Erros: {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+DDL adiado para depois da carga em massa: índices, chaves primárias e estrangeiras.
+
+Um índice ou chave existente é atualizado a cada linha inserida. Criado depois da
+carga, ele é construído de uma vez, ordenando os dados já gravados. split_deferred_ddl
+tira de um schema os CREATE INDEX e as PRIMARY KEY (na coluna ou da tabela), que
+setup_database.py e copy_loader.py --adiar-indices criam só no fim da carga, junto
+com as chaves estrangeiras do GTFS (trips -> routes, stop_times -> trips/stops).
+
+Antes de criar cada chave, os dados são validados (chaves nulas ou duplicadas,
+referências sem correspondente). Uma chave inválida não é criada e aparece no
+relatório de validação, em vez de derrubar a carga inteira.
+"""
+
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Tipos de comando adiado, na ordem em que são executados
+KIND_PRIMARY_KEY = 'chave_primaria'
+KIND_INDEX = 'indice'
+KIND_FOREIGN_KEY = 'chave_estrangeira'
+KIND_ORDER = [KIND_PRIMARY_KEY, KIND_INDEX, KIND_FOREIGN_KEY]
+
+# Resultado de cada comando
+STATUS_CREATED = 'criada'
+STATUS_EXISTS = 'já existia'
+STATUS_INVALID = 'inválida'
+STATUS_MISSING = 'tabela ausente'
+STATUS_ERROR = 'erro'
+
+# CREATE [UNIQUE] INDEX ... ; (pode ocupar várias linhas)
+INDEX_STATEMENT = re.compile(r'^[ \t]*CREATE\s+(?:UNIQUE\s+)?INDEX\b[^;]*;[ \t]*\n?', re.IGNORECASE | re.MULTILINE)
+INDEX_TABLE = re.compile(r'\bON\s+(\w+)', re.IGNORECASE)
+CREATE_TABLE = re.compile(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\(', re.IGNORECASE)
+# PRIMARY KEY da tabela: "    PRIMARY KEY (a, b),"
+TABLE_PRIMARY_KEY = re.compile(r'^[ \t]*PRIMARY\s+KEY\s*\(([^)]*)\)\s*,?[ \t]*\n', re.IGNORECASE | re.MULTILINE)
+# PRIMARY KEY na coluna: "    _id INTEGER PRIMARY KEY,"
+COLUMN_PRIMARY_KEY = re.compile(r'^([ \t]*(\w+)\s+[^,\n]*?)\s+PRIMARY\s+KEY', re.IGNORECASE | re.MULTILINE)
+
+# Chaves estrangeiras do GTFS: (tabela, colunas, tabela referenciada, colunas referenciadas)
+GTFS_FOREIGN_KEYS = [
+    ('gtfs_trips', ['route_id'], 'gtfs_routes', ['route_id']),
+    ('gtfs_stop_times', ['trip_id'], 'gtfs_trips', ['trip_id']),
+    ('gtfs_stop_times', ['stop_id'], 'gtfs_stops', ['stop_id']),
+]
+
+# Índices secundários do GTFS (colunas das chaves estrangeiras que não começam a chave primária)
+GTFS_INDEXES = [
+    ('gtfs_trips', ['route_id']),
+    ('gtfs_stop_times', ['stop_id']),
+]
+
+
+def _item(kind: str, table: str, sql: str, columns: Optional[List[str]] = None,
+          reference: Optional[Tuple[str, List[str]]] = None) -> Dict:
+    return {'tipo': kind, 'tabela': table, 'sql': sql, 'colunas': columns or [], 'referencia': reference}
+
+
+def primary_key_item(table: str, columns: List[str]) -> Dict:
+    sql = f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({', '.join(columns)})"
+    return _item(KIND_PRIMARY_KEY, table, sql, columns)
+
+
+def foreign_key_name(table: str, columns: List[str]) -> str:
+    return f"fk_{table}_{'_'.join(columns)}"
+
+
+def foreign_key_item(table: str, columns: List[str], ref_table: str, ref_columns: List[str]) -> Dict:
+    name = foreign_key_name(table, columns)
+    sql = (f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({', '.join(columns)}) "
+           f"REFERENCES {ref_table} ({', '.join(ref_columns)})")
+    return _item(KIND_FOREIGN_KEY, table, sql, columns, (ref_table, ref_columns))
+
+
+def index_item(table: str, columns: List[str]) -> Dict:
+    sql = f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(columns)} ON {table} ({', '.join(columns)})"
+    return _item(KIND_INDEX, table, sql, columns)
+
+
+def split_deferred_ddl(schema_content: str) -> Tuple[str, List[Dict]]:
+    """Retorna (schema sem índices e PRIMARY KEY, comandos adiados)"""
+    deferred = []
+    match = CREATE_TABLE.search(schema_content)
+    if match:
+        table = match.group(1)
+        table_key = TABLE_PRIMARY_KEY.search(schema_content)
+        if table_key:
+            columns = [col.strip() for col in table_key.group(1).split(',')]
+            schema_content = TABLE_PRIMARY_KEY.sub('', schema_content, count=1)
+        else:
+            column_key = COLUMN_PRIMARY_KEY.search(schema_content)
+            columns = [column_key.group(2)] if column_key else []
+            schema_content = COLUMN_PRIMARY_KEY.sub(r'\1', schema_content, count=1)
+        if columns:
+            deferred.append(primary_key_item(table, columns))
+
+    for statement in INDEX_STATEMENT.findall(schema_content):
+        statement = statement.strip()
+        table_match = INDEX_TABLE.search(statement)
+        deferred.append(_item(KIND_INDEX, table_match.group(1) if table_match else '', statement))
+    return INDEX_STATEMENT.sub('', schema_content), deferred
+
+
+def gtfs_deferred_ddl(tables: Optional[Iterable[str]] = None) -> List[Dict]:
+    """Chaves estrangeiras e índices secundários do GTFS para as tabelas carregadas (ou todas)"""
+    tables = set(tables) if tables is not None else None
+    items = [index_item(table, columns) for table, columns in GTFS_INDEXES if tables is None or table in tables]
+    items += [foreign_key_item(*fk) for fk in GTFS_FOREIGN_KEYS if tables is None or fk[0] in tables]
+    return items
+
+
+def drop_foreign_keys_sql() -> str:
+    """
+    Remove as chaves estrangeiras do GTFS antes de uma carga em massa: com elas, o
+    TRUNCATE das tabelas referenciadas falha e a ordem de carga das tabelas importaria.
+    São recriadas (e validadas) no fim da carga
+    """
+    return "\n".join(f"ALTER TABLE IF EXISTS {table} DROP CONSTRAINT IF EXISTS {foreign_key_name(table, columns)};"
+                     for table, columns, _, _ in GTFS_FOREIGN_KEYS)
+
+
+def ordered_ddl(items: Iterable[Dict]) -> List[List[Dict]]:
+    """Comandos sem repetição, agrupados em etapas: chaves primárias, índices, chaves estrangeiras"""
+    unique = list({item['sql']: item for item in items}.values())
+    return [[item for item in unique if item['tipo'] == kind] for kind in KIND_ORDER]
+
+
+def _exists(cursor, table: str) -> bool:
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    return cursor.fetchone()[0]
+
+
+def validate(cursor, item: Dict) -> Optional[str]:
+    """Problemas nos dados que impediriam a chave. None se os dados estão válidos"""
+    table, columns = item['tabela'], item['colunas']
+    if item['tipo'] == KIND_PRIMARY_KEY:
+        cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE " + " OR ".join(f"{c} IS NULL" for c in columns))
+        nulls = cursor.fetchone()[0]
+        cursor.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM {table} GROUP BY {', '.join(columns)} "
+                       f"HAVING COUNT(*) > 1) AS repetidas")
+        duplicates = cursor.fetchone()[0]
+        problems = []
+        if nulls:
+            problems.append(f"{nulls} linhas com chave nula")
+        if duplicates:
+            problems.append(f"{duplicates} chaves repetidas")
+        return ", ".join(problems) or None
+
+    if item['tipo'] == KIND_FOREIGN_KEY:
+        ref_table, ref_columns = item['referencia']
+        match = " AND ".join(f"r.{rc} = t.{c}" for c, rc in zip(columns, ref_columns))
+        not_null = " AND ".join(f"t.{c} IS NOT NULL" for c in columns)
+        cursor.execute(f"SELECT COUNT(*) FROM {table} t WHERE {not_null} "
+                       f"AND NOT EXISTS (SELECT 1 FROM {ref_table} r WHERE {match})")
+        orphans = cursor.fetchone()[0]
+        return f"{orphans} linhas sem correspondente em {ref_table}" if orphans else None
+    return None
+
+
+def _constraint_exists(cursor, item: Dict) -> bool:
+    """Chave primária (qualquer) ou estrangeira (pelo nome) já criada na tabela"""
+    if item['tipo'] == KIND_PRIMARY_KEY:
+        cursor.execute("SELECT 1 FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+                       (item['tabela'],))
+    else:
+        name = item['sql'].split(" ADD CONSTRAINT ")[1].split()[0]
+        cursor.execute("SELECT 1 FROM pg_constraint WHERE conrelid = %s::regclass AND conname = %s",
+                       (item['tabela'], name))
+    return cursor.fetchone() is not None
+
+
+def apply_deferred(conn, item: Dict) -> Tuple[str, str]:
+    """Valida e executa um comando adiado. Retorna (status, detalhe)"""
+    try:
+        with conn.cursor() as cursor:
+            tables = [item['tabela']] + ([item['referencia'][0]] if item['referencia'] else [])
+            missing = [table for table in tables if table and not _exists(cursor, table)]
+            if missing:
+                return STATUS_MISSING, ", ".join(missing)
+            if item['tipo'] != KIND_INDEX:
+                if _constraint_exists(cursor, item):
+                    return STATUS_EXISTS, ""
+                problem = validate(cursor, item)
+                if problem:
+                    return STATUS_INVALID, problem
+            cursor.execute(item['sql'])
+        conn.commit()
+        return STATUS_CREATED, ""
+    except Exception as e:
+        conn.rollback()
+        return STATUS_ERROR, str(e).strip()
+
+
+def deferred_task(item: Dict) -> Callable:
+    """Tarefa (função da conexão) para setup_database.run_parallel"""
+    return lambda conn: apply_deferred(conn, item)
+
+
+def describe(item: Dict) -> str:
+    """Descrição curta de um comando adiado para os relatórios"""
+    if item['tipo'] == KIND_INDEX:
+        return item['sql'].replace("CREATE INDEX IF NOT EXISTS ", "").replace("CREATE UNIQUE INDEX IF NOT EXISTS ", "")
+    if item['tipo'] == KIND_FOREIGN_KEY:
+        ref_table, ref_columns = item['referencia']
+        return f"{item['tabela']} ({', '.join(item['colunas'])}) -> {ref_table} ({', '.join(ref_columns)})"
+    return f"{item['tabela']} ({', '.join(item['colunas'])})"
+
+
+def print_validation_report(results: List[Tuple[Dict, Tuple[str, str]]]) -> int:
+    """Relatório de validação das chaves e índices. Retorna quantos não foram criados"""
+    print("\n=== VALIDAÇÃO DAS CHAVES E ÍNDICES ===")
+    failures = 0
+    for item, (status, detail) in results:
+        tag = "[OK]" if status in (STATUS_CREATED, STATUS_EXISTS) else "[ERRO]"
+        if status == STATUS_MISSING:
+            tag = "[AVISO]"
+        if tag == "[ERRO]":
+            failures += 1
+        kind = item['tipo'].replace('_', ' ')
+        suffix = f": {detail}" if detail else ""
+        print(f"{tag} {kind} {describe(item)} - {status}{suffix}")
+    return failures
@@ -6,11 +6,25 @@ Gera arquivos .sql para popular um banco de dados local PostgreSQL.
 Funciona tanto para CSVs normais quanto para GTFS.
 """
 
+import io
 import os
+import re
+import shutil
+import argparse
+import contextlib
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+from processed_io import (csv_filename, is_parquet, list_processed_files, read_processed, parquet_dtypes,
+                          resolve_csv_dtypes, iter_processed_chunks)
+from manifest import MANIFEST_FILENAME, load_manifest, save_manifest, is_up_to_date, record_output
+from rollups import rollup_refresh_sql
+from instrumentation import METRICS_FILE, configure, file_bytes, stage
+from schema_model import (RULE_PLAIN, RULE_TEXT_ID, SQL_INTEGER_LIMIT, TableSchema, encode_literal,
+                          load_schema)
 
 
 def detect_project_root() -> str:
@@ -77,74 +91,202 @@ def escape_sql_value(value: any, col_type: str = None, col_name: str = None) ->
     return f"'{value_str}'"
 
 
-def parse_schema_file(schema_path: str) -> Tuple[str, Dict[str, str]]:
-    """Lê um arquivo schema SQL e retorna nome da tabela e mapeamento de colunas para tipos"""
-    table_name = None
-    columns = {}
+# Versão do formato dos arquivos gerados: incrementar quando a saída mudar,
+# para que o manifesto force a regeneração de tudo
+GENERATOR_VERSION = "4"
+
+# Linhas lidas por bloco no modo streaming
+STREAMING_CHUNK_ROWS = 100000
+
+# Relatórios mensais de fluxo (relatorio_fluxo_<mes>_<ano>_clean.csv): todos vão para a
+# tabela relatorio_fluxo, particionada por data, cada arquivo na partição do seu mês
+MONTHLY_REPORT_PATTERN = re.compile(r'^relatorio_fluxo_([a-zç]+)_(\d{4})_clean\.csv$')
+MONTHLY_REPORT_SCHEMA = "relatorio_fluxo_schema.sql"
+MONTH_NUMBERS = {
+    'janeiro': 1, 'fevereiro': 2, 'marco': 3, 'março': 3, 'abril': 4, 'maio': 5, 'junho': 6,
+    'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12,
+}
+# Partição padrão da tabela particionada (linhas sem data ou de meses sem partição)
+DEFAULT_PARTITION_SUFFIX = "_padrao"
+
+
+def _quote_strings(values: np.ndarray) -> np.ndarray:
+    """Envolve strings em aspas simples, escapando aspas internas"""
+    escaped = pd.Series(values, dtype=object).str.replace("'", "''", regex=False)
+    return ("'" + escaped + "'").to_numpy(dtype=object, copy=True)
+
+
+def render_sql_column(series: pd.Series, rule: str) -> Optional[np.ndarray]:
+    """Renderiza uma coluna inteira como literais SQL. Retorna None se o tipo exigir o caminho por célula"""
+    n = len(series)
+    out = np.empty(n, dtype=object)
+    dtype = series.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Colunas em dicionário (Parquet): cada categoria texto é renderizada uma única vez
+        if pd.api.types.infer_dtype(dtype.categories, skipna=True) not in ('string', 'empty'):
+            return None
+        rendered = np.append(_quote_strings(dtype.categories.to_numpy(dtype=object)), "NULL")
+        return rendered[series.cat.codes.to_numpy()]
+
+    if pd.api.types.is_bool_dtype(dtype) and not pd.api.types.is_extension_array_dtype(dtype):
+        out[:] = np.where(series.to_numpy(), "TRUE", "FALSE")
+        return out
+
+    if dtype.kind in 'iuf':
+        if pd.api.types.is_extension_array_dtype(dtype):
+            # Int64/Float64 (lidos de Parquet): nulos são pd.NA, valores válidos mantêm o tipo
+            null_mask = series.isna().to_numpy()
+            values = series.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+        else:
+            values = series.to_numpy()
+            null_mask = np.isnan(values) if dtype.kind == 'f' else np.zeros(n, dtype=bool)
+        out[null_mask] = "NULL"
+        valid = ~null_mask
+        # str() de escalares Python, como escape_sql_value faz após value.item()
+        text = np.array(list(map(str, values[valid].tolist())), dtype=object)
+        if rule == RULE_PLAIN:
+            out[valid] = text
+        elif rule == RULE_TEXT_ID:
+            small = values[valid] < SQL_INTEGER_LIMIT
+            rendered = _quote_strings(text)
+            rendered[small] = text[small]
+            out[valid] = rendered
+        else:
+            out[valid] = _quote_strings(text)
+        return out
+
+    if pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty'):
+        null_mask = series.isna().to_numpy()
+        out[null_mask] = "NULL"
+        valid = ~null_mask
+        if valid.any():
+            out[valid] = _quote_strings(series.to_numpy(dtype=object)[valid])
+        return out
+
+    # Tipos mistos, datas etc.: usar o caminho por célula
+    return None
+
+
+def _iterrows_dtype(df: pd.DataFrame):
+    """Dtype das linhas produzidas por df.iterrows() (ex.: int64 + float64 viram float64)"""
+    dtypes = list(df.dtypes)
+    if dtypes and all(isinstance(d, np.dtype) and d.kind in 'iuf' for d in dtypes):
+        return np.result_type(*dtypes)
+    return None
+
+
+def render_sql_rows(df: pd.DataFrame, schema: TableSchema) -> List[str]:
+    """Gera as linhas '    (v1, v2, ...)' do VALUES coluna a coluna, equivalente a render_sql_rows_per_cell"""
+    if all(isinstance(d, np.dtype) and d.kind == 'b' for d in df.dtypes):
+        # Linhas só de booleanos viram np.bool_, que escape_sql_value trata como texto
+        return render_sql_rows_per_cell(df, schema)
     
-    try:
-        with open(schema_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Extrair nome da tabela
-        if "CREATE TABLE" in content:
-            # Procurar por CREATE TABLE IF NOT EXISTS table_name ou CREATE TABLE table_name
-            import re
-            match = re.search(r'CREATE TABLE (?:IF NOT EXISTS )?(\w+)', content, re.IGNORECASE)
-            if match:
-                table_name = match.group(1)
-        
-        # Extrair colunas e tipos
-        lines = content.split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith('--') or not line or line.startswith('CREATE') or line.startswith(')'):
-                continue
-            
-            # Remover vírgula final
-            if line.endswith(','):
-                line = line[:-1]
-            
-            # Parsear coluna e tipo (formato: "coluna TYPE" ou "coluna TYPE PRIMARY KEY")
-            parts = line.split()
-            if len(parts) >= 2:
-                col_name = parts[0].strip()
-                col_type = parts[1].strip().upper()
-                
-                # Remover PRIMARY KEY, SERIAL, etc. do tipo
-                if 'PRIMARY' in col_type:
-                    continue  # Pular colunas PRIMARY KEY (geralmente são auto-increment)
-                
-                # Normalizar tipos
-                if 'VARCHAR' in col_type or 'TEXT' in col_type:
-                    col_type = 'TEXT'
-                elif 'INTEGER' in col_type or 'INT' in col_type:
-                    col_type = 'INTEGER'
-                elif 'DECIMAL' in col_type or 'NUMERIC' in col_type or 'FLOAT' in col_type or 'REAL' in col_type:
-                    col_type = 'DECIMAL'
-                elif 'DATE' in col_type:
-                    col_type = 'DATE'
-                elif 'TIME' in col_type:
-                    col_type = 'TIME'
-                elif 'TIMESTAMP' in col_type:
-                    col_type = 'TIMESTAMP'
-                elif 'BOOLEAN' in col_type or 'BOOL' in col_type:
-                    col_type = 'BOOLEAN'
-                
-                columns[col_name] = col_type
+    common_dtype = _iterrows_dtype(df)
+
+    rendered_columns = []
+    for col in df.columns:
+        # Regra e tipo já decididos no modelo do schema
+        rule = schema.rule(col)
+        series = df[col]
+        if common_dtype is not None:
+            series = series.astype(common_dtype)
+        rendered = render_sql_column(series, rule)
+        if rendered is None:
+            col_type = schema.literal_type(col)
+            rendered = np.array([encode_literal(value, rule, col_type) for value in series.tolist()], dtype=object)
+        rendered_columns.append(rendered)
+
+    return [f"    ({', '.join(values)})" for values in zip(*rendered_columns)]
+
+
+def render_sql_rows_per_cell(df: pd.DataFrame, schema: TableSchema) -> List[str]:
+    """Gera as linhas do VALUES célula a célula com escape_sql_value (caminho original, usado como referência)"""
+    column_types = schema.literal_types
+    values_lines = []
+    for _, row in df.iterrows():
+        values = []
+        for col in df.columns:
+            value = row[col]
+            col_type = column_types.get(col, None)
+            values.append(escape_sql_value(value, col_type, col))
         
-        # Remover created_at se existir (será gerado automaticamente)
-        if 'created_at' in columns:
-            del columns['created_at']
-            
-    except Exception as e:
-        print(f"[ERRO] Erro ao ler schema {schema_path}: {e}")
-    
-    return table_name, columns
+        values_str = ", ".join(values)
+        values_lines.append(f"    ({values_str})")
+    return values_lines
+
+
+def parse_schema_file(schema_path: str) -> Tuple[str, Dict[str, str]]:
+    """Lê um arquivo schema SQL e retorna nome da tabela e mapeamento de colunas para tipos"""
+    schema = load_schema(schema_path)
+    if schema is None:
+        return None, {}
+    return schema.name, schema.column_types
+
+
+def parse_schema_content(content: str) -> Tuple[str, Dict[str, str]]:
+    """Interpreta um CREATE TABLE e retorna nome da tabela e mapeamento de colunas para tipos"""
+    schema = TableSchema.from_sql(content)
+    return schema.name, schema.column_types
+
+
+def monthly_report_period(filename: str) -> Optional[Tuple[int, int]]:
+    """(ano, mês) de um relatório mensal de fluxo pelo nome do arquivo, ou None se não for um"""
+    match = MONTHLY_REPORT_PATTERN.match(csv_filename(os.path.basename(filename)))
+    if not match or match.group(1) not in MONTH_NUMBERS:
+        return None
+    return int(match.group(2)), MONTH_NUMBERS[match.group(1)]
+
+
+def monthly_report_bounds(filename: str) -> Optional[Tuple[str, str]]:
+    """Intervalo [início, fim) de datas de um relatório mensal de fluxo, ou None se não for um"""
+    period = monthly_report_period(filename)
+    if not period:
+        return None
+    year, month = period
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year}-{month:02d}-01", f"{next_year}-{next_month:02d}-01"
+
+
+def monthly_partition(csv_path: str, table_name: str) -> Optional[Tuple[str, str]]:
+    """
+    Partição mensal de um relatório de fluxo na tabela particionada. Retorna
+    (nome da partição, DDL que cria a partição) ou None se não for um relatório mensal.
+
+    Linhas do mês que chegaram antes da partição (um relatório de outro mês com datas
+    deste) estão na partição padrão, e o PostgreSQL não cria a partição enquanto a
+    padrão tiver linhas no intervalo: elas são retiradas da padrão e reinseridas na
+    tabela depois de criar a partição, num único bloco (atômico também no psql)
+    """
+    bounds = monthly_report_bounds(csv_path)
+    if not bounds:
+        return None
+    start, end = bounds
+    partition = f"{table_name}_{start[:4]}_{start[5:7]}"
+    default = f"{table_name}{DEFAULT_PARTITION_SUFFIX}"
+    pending = f"{partition}_pendentes"
+    in_month = f"data >= '{start}' AND data < '{end}'"
+    ddl = (f"DO $$\n"
+           f"BEGIN\n"
+           f"    IF to_regclass('{partition}') IS NULL THEN\n"
+           f"        CREATE TEMP TABLE {pending} AS SELECT * FROM {default} WHERE {in_month};\n"
+           f"        DELETE FROM {default} WHERE {in_month};\n"
+           f"        CREATE TABLE {partition} PARTITION OF {table_name}\n"
+           f"            FOR VALUES FROM ('{start}') TO ('{end}');\n"
+           f"        INSERT INTO {table_name} SELECT * FROM {pending};\n"
+           f"        DROP TABLE {pending};\n"
+           f"    END IF;\n"
+           f"END $$;")
+    return partition, ddl
 
 
 def find_matching_schema(csv_filename: str, schemas_dir: str) -> Optional[str]:
     """Encontra o arquivo schema correspondente a um CSV"""
+    # Relatórios mensais: todos usam o schema da tabela particionada
+    if monthly_report_period(csv_filename):
+        schema_path = os.path.join(schemas_dir, MONTHLY_REPORT_SCHEMA)
+        return schema_path if os.path.exists(schema_path) else None
+    
     # Mapear nomes de CSV para nomes de schema
     csv_to_schema = {
         "semaforos_clean.csv": "semaforos_schema.sql",
@@ -152,14 +294,6 @@ def find_matching_schema(csv_filename: str, schemas_dir: str) -> Optional[str]:
         "fluxo_veiculos_hora_clean.csv": "fluxo_veiculos_hora_schema.sql",
         "fluxo_velocidade_15min_clean.csv": "fluxo_velocidade_15min_schema.sql",
         "monitoramento_cttu_clean.csv": "monitoramento_cttu_schema.sql",
-        "relatorio_fluxo_janeiro_2025_clean.csv": "relatorio_fluxo_janeiro_schema.sql",
-        "relatorio_fluxo_fevereiro_2025_clean.csv": "relatorio_fluxo_fevereiro_schema.sql",
-        "relatorio_fluxo_marco_2025_clean.csv": "relatorio_fluxo_marco_schema.sql",
-        "relatorio_fluxo_abril_2025_clean.csv": "relatorio_fluxo_abril_schema.sql",
-        "relatorio_fluxo_maio_2025_clean.csv": "relatorio_fluxo_maio_schema.sql",
-        "relatorio_fluxo_junho_2025_clean.csv": "relatorio_fluxo_junho_schema.sql",
-        "relatorio_fluxo_julho_2025_clean.csv": "relatorio_fluxo_julho_schema.sql",
-        "relatorio_fluxo_agosto_2025_clean.csv": "relatorio_fluxo_agosto_schema.sql",
     }
     
     # Tentar mapeamento direto
@@ -185,276 +319,548 @@ def find_matching_schema(csv_filename: str, schemas_dir: str) -> Optional[str]:
     return None
 
 
-def generate_sql_schema_from_df(df: pd.DataFrame, table_name: str, primary_key: Optional[str] = None) -> str:
-    """Gera schema SQL automaticamente baseado no DataFrame"""
-    if df is None or df.empty:
-        return ""
-    
-    schema_lines = [f"CREATE TABLE IF NOT EXISTS {table_name} ("]
-    
-    # Adicionar colunas
-    for i, (col, dtype) in enumerate(df.dtypes.items()):
-        # Converter tipos do pandas para SQL
-        if dtype == 'int64':
-            sql_type = "INTEGER"
-        elif dtype == 'float64':
-            sql_type = "DECIMAL(10, 2)"
-        elif dtype == 'object':
-            # Para strings, verificar tamanho máximo
-            try:
-                max_len = df[col].astype(str).str.len().max()
-                if pd.isna(max_len) or max_len > 255:
-                    sql_type = "TEXT"
-                else:
-                    sql_type = f"VARCHAR({max(255, int(max_len))})"
-            except:
-                sql_type = "TEXT"
-        elif 'datetime' in str(dtype):
-            sql_type = "TIMESTAMP"
-        else:
-            sql_type = "TEXT"
-        
-        # Correções específicas para tipos de dados GTFS
-        # Coordenadas com precisão correta
-        if col in ['stop_lat', 'stop_lon', 'shape_pt_lat', 'shape_pt_lon']:
-            sql_type = "DECIMAL(10, 8)"
-        
-        # Horários GTFS: usar VARCHAR porque GTFS permite horas >= 24 (ex: 24:00:05)
-        # No GTFS, horas >= 24 representam o dia seguinte
-        if col in ['arrival_time', 'departure_time']:
-            sql_type = "VARCHAR(10)"  # Formato HH:MM:SS ou HH:MM:SS para horas >= 24
-        
-        # Datas como DATE em vez de TIMESTAMP
-        if col in ['start_date', 'end_date', 'date']:
-            sql_type = "DATE"
-        
-        # Telefones, emails e URLs sempre como VARCHAR/TEXT (mesmo que sejam numéricos)
-        if 'phone' in col.lower() or 'email' in col.lower() or 'url' in col.lower():
-            sql_type = "VARCHAR(255)"
-        
-        # Adicionar PRIMARY KEY se especificado
-        if primary_key and col == primary_key:
-            sql_type += " PRIMARY KEY"
-        elif not primary_key:
-            # Para GTFS trips, a PRIMARY KEY é trip_id (não route_id que vem antes)
-            if 'trips' in table_name.lower() and col == 'trip_id':
-                sql_type += " PRIMARY KEY"
-            # Para outras tabelas GTFS, geralmente a primeira coluna é um ID
-            # MAS calendar_dates precisa de PRIMARY KEY composta (service_id, date)
-            elif i == 0 and 'id' in col.lower() and 'calendar_dates' not in table_name.lower() and 'trips' not in table_name.lower():
-                sql_type += " PRIMARY KEY"
-        
-        col_name = col.replace('-', '_')
-        schema_lines.append(f"    {col_name} {sql_type},")
-    
-    # Adicionar campo created_at
-    schema_lines.append("    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
-    
-    # PRIMARY KEY composta para tabelas GTFS específicas
-    # calendar_dates: (service_id, date) - mesmo service_id pode ter múltiplas datas
-    # fare_rules: (fare_id, route_id) - mesmo fare_id pode ter múltiplos route_id
-    # shapes: (shape_id, shape_pt_sequence) - mesmo shape_id tem múltiplos pontos
-    # stop_times: (trip_id, stop_sequence) - mesmo trip_id tem múltiplas paradas
-    # trips: PRIMARY KEY é trip_id (não route_id, que pode ter múltiplas viagens)
-    if 'trips' in table_name.lower():
-        # Remover PRIMARY KEY de route_id se existir (se foi colocado por engano)
-        new_schema_lines = []
-        for line in schema_lines:
-            if "route_id" in line and "PRIMARY KEY" in line:
-                new_line = line.replace(" PRIMARY KEY", "")
-                new_schema_lines.append(new_line)
-            else:
-                new_schema_lines.append(line)
-        schema_lines = new_schema_lines
-        
-        # Garantir que trip_id tem PRIMARY KEY (se não tiver, adicionar)
-        trip_id_has_pk = any("trip_id" in line and "PRIMARY KEY" in line for line in schema_lines)
-        if not trip_id_has_pk:
-            # Encontrar linha com trip_id e adicionar PRIMARY KEY
-            for i, line in enumerate(schema_lines):
-                if "trip_id" in line and "PRIMARY KEY" not in line:
-                    schema_lines[i] = line.replace("trip_id", "trip_id").replace("VARCHAR(255),", "VARCHAR(255) PRIMARY KEY,")
-                    break
-    
-    elif 'calendar_dates' in table_name.lower():
-        # Remover PRIMARY KEY de service_id se existir
-        new_schema_lines = []
-        for line in schema_lines:
-            if "service_id" in line and "PRIMARY KEY" in line:
-                new_line = line.replace(" PRIMARY KEY", "")
-                new_schema_lines.append(new_line)
-            else:
-                new_schema_lines.append(line)
-        schema_lines = new_schema_lines
-        
-        # Adicionar PRIMARY KEY composta antes do created_at
-        for i, line in enumerate(schema_lines):
-            if "created_at" in line:
-                schema_lines.insert(i, "    PRIMARY KEY (service_id, date),")
-                break
-    
-    elif 'fare_rules' in table_name.lower():
-        # Remover PRIMARY KEY de fare_id se existir
-        new_schema_lines = []
-        for line in schema_lines:
-            if "fare_id" in line and "PRIMARY KEY" in line:
-                new_line = line.replace(" PRIMARY KEY", "")
-                new_schema_lines.append(new_line)
-            else:
-                new_schema_lines.append(line)
-        schema_lines = new_schema_lines
-        
-        # Adicionar PRIMARY KEY composta antes do created_at
-        for i, line in enumerate(schema_lines):
-            if "created_at" in line:
-                schema_lines.insert(i, "    PRIMARY KEY (fare_id, route_id),")
-                break
-    
-    elif 'shapes' in table_name.lower():
-        # Remover PRIMARY KEY de shape_id se existir
-        new_schema_lines = []
-        for line in schema_lines:
-            if "shape_id" in line and "PRIMARY KEY" in line:
-                new_line = line.replace(" PRIMARY KEY", "")
-                new_schema_lines.append(new_line)
-            else:
-                new_schema_lines.append(line)
-        schema_lines = new_schema_lines
-        
-        # Adicionar PRIMARY KEY composta antes do created_at
-        for i, line in enumerate(schema_lines):
-            if "created_at" in line:
-                schema_lines.insert(i, "    PRIMARY KEY (shape_id, shape_pt_sequence),")
-                break
-    
-    elif 'stop_times' in table_name.lower():
-        # Remover PRIMARY KEY de trip_id se existir
-        new_schema_lines = []
-        for line in schema_lines:
-            if "trip_id" in line and "PRIMARY KEY" in line:
-                new_line = line.replace(" PRIMARY KEY", "")
-                new_schema_lines.append(new_line)
-            else:
-                new_schema_lines.append(line)
-        schema_lines = new_schema_lines
+def gtfs_schema_sql(schema: TableSchema) -> str:
+    """CREATE TABLE de uma tabela GTFS, com prefixo gtfs_ (e geometrias PostGIS de paradas e traçados)"""
+    gtfs_table_name = f"gtfs_{schema.name}"
+    schema_content = schema.renamed(gtfs_table_name).to_sql()
+    
+    # Paradas: ponto PostGIS com índice espacial
+    if schema.name.lower() == 'stops':
+        schema_content += "\n\n" + point_geometry_sql(gtfs_table_name, 'stop_lat', 'stop_lon')
+    
+    # Traçados (gtfs_shapes.py): LineString PostGIS a partir do WKT
+    if schema.name.lower() == 'shape_geometries':
+        schema_content += "\n\n" + line_geometry_sql(gtfs_table_name, 'geometria')
+    
+    return schema_content
+
+
+def point_geometry_sql(table_name: str, lat_col: str = 'latitude', lon_col: str = 'longitude') -> str:
+    """
+    Coluna geom geometry(Point, 4326) gerada pelo banco a partir de latitude/longitude
+    (preenchida em cada INSERT/COPY), com índice GiST
+    """
+    return (f"CREATE EXTENSION IF NOT EXISTS postgis;\n"
+            f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS geom geometry(Point, 4326)\n"
+            f"    GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint({lon_col}, {lat_col}), 4326)) STORED;\n"
+            f"CREATE INDEX IF NOT EXISTS idx_{table_name}_geom ON {table_name} USING GIST (geom);")
+
+
+def line_geometry_sql(table_name: str, wkt_col: str) -> str:
+    """Coluna geom geometry(LineString, 4326) gerada pelo banco a partir de um WKT, com índice GiST"""
+    return (f"CREATE EXTENSION IF NOT EXISTS postgis;\n"
+            f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS geom geometry(LineString, 4326)\n"
+            f"    GENERATED ALWAYS AS (ST_GeomFromText({wkt_col}, 4326)) STORED;\n"
+            f"CREATE INDEX IF NOT EXISTS idx_{table_name}_geom ON {table_name} USING GIST (geom);")
+
+
+def load_table_dataframe(csv_path: str, schema_path: Optional[str]) -> Tuple[Optional[str], Optional[pd.DataFrame], Optional[TableSchema], Optional[str]]:
+    """
+    Carrega um arquivo processado (CSV ou Parquet) e ajusta as colunas ao schema.
+    Retorna (table_name, df, schema, schema_content); schema_content só para os schemas inferidos (GTFS)
+    """
+    # Carregar CSV/Parquet
+    file_format = "Parquet" if is_parquet(csv_path) else "CSV"
+    print(f"[INFO] Carregando {file_format}: {os.path.basename(csv_path)}")
+    df = read_processed(csv_path)
+    print(f"[OK] {file_format} carregado: {df.shape[0]} registros, {df.shape[1]} colunas")
+    
+    # Ler schema se disponível (interpretado uma única vez por processo)
+    table_name = None
+    file_schema = None
+    
+    if schema_path and os.path.exists(schema_path):
+        print(f"[INFO] Lendo schema: {os.path.basename(schema_path)}")
+        file_schema = load_schema(schema_path)
+        table_name = file_schema.name if file_schema else None
+        if file_schema:
+            print(f"[OK] Schema lido: tabela '{table_name}', {len(file_schema.columns)} colunas")
+    else:
+        # Se não houver schema, usar nome do arquivo como tabela
+        table_name = csv_filename(os.path.basename(csv_path)).replace("_clean.csv", "").replace(".csv", "")
+        table_name = table_name.replace("-", "_")
+        print(f"[AVISO] Schema não encontrado, usando nome de tabela: {table_name}")
+    
+    if not table_name:
+        print(f"[ERRO] Não foi possível determinar o nome da tabela")
+        return None, None, None, None
+    
+    # Normalizar nomes de colunas (remover hífens, garantir compatibilidade)
+    df.columns = [col.replace('-', '_') for col in df.columns]
+    
+    # Gerar schema automaticamente se não houver schema_path
+    schema = file_schema or TableSchema(table_name, typed_literals=False)
+    schema_content = None
+    if not schema_path:
+        print(f"[INFO] Gerando schema automaticamente para {table_name}")
+        schema = TableSchema.from_dataframe(df, table_name) or schema
+        schema_content = schema.to_sql() if schema.columns else ""
+        print(f"[OK] Schema gerado automaticamente")
+    
+    # Remover colunas que não estão no schema (se schema existir)
+    column_types = file_schema.column_types if file_schema else {}
+    if column_types:
+        # Remover created_at se existir no DataFrame
+        if 'created_at' in df.columns:
+            df = df.drop('created_at', axis=1)
         
-        # Adicionar PRIMARY KEY composta antes do created_at
-        for i, line in enumerate(schema_lines):
-            if "created_at" in line:
-                schema_lines.insert(i, "    PRIMARY KEY (trip_id, stop_sequence),")
-                break
+        # Filtrar apenas colunas que existem no schema
+        valid_columns = [col for col in df.columns if col in column_types or col == 'id']
+        if valid_columns:
+            df = df[valid_columns]
     
-    schema_lines.append(");")
+    if df.empty:
+        print(f"[AVISO] DataFrame vazio após filtragem")
+        return None, None, None, None
     
-    return "\n".join(schema_lines)
+    return table_name, df, schema, schema_content
 
 
 def generate_sql_inserts_content(csv_path: str, schema_path: Optional[str], 
-                                  batch_size: int = 1000) -> Tuple[Optional[str], Optional[str], Optional[str], int]:
-    """Gera conteúdo SQL com INSERT statements a partir de um CSV. Retorna (table_name, insert_content, schema_content, num_records)"""
+                                  batch_size: int = 1000) -> Tuple[Optional[str], Optional[str], Optional[TableSchema], int]:
+    """Gera conteúdo SQL com INSERT statements a partir de um CSV. Retorna (table_name, insert_content, schema, num_records)"""
     try:
-        # Carregar CSV
-        print(f"[INFO] Carregando CSV: {os.path.basename(csv_path)}")
-        df = pd.read_csv(csv_path, encoding='utf-8')
-        print(f"[OK] CSV carregado: {df.shape[0]} registros, {df.shape[1]} colunas")
+        input_name = csv_filename(os.path.basename(csv_path)).replace("_clean.csv", "").replace(".csv", "")
+        with stage(input_name, 'leitura') as metric:
+            table_name, df, schema, _ = load_table_dataframe(csv_path, schema_path)
+            metric['tabela'] = table_name or input_name
+            metric['linhas'] = len(df) if df is not None else 0
+        if df is None:
+            return None, None, None, 0
+        
+        with stage(table_name, 'renderizacao') as metric:
+            # Gerar conteúdo INSERT
+            insert_lines = []
+            insert_lines.append(f"-- SQL gerado automaticamente a partir de {os.path.basename(csv_path)}")
+            insert_lines.append(f"-- Tabela: {table_name}")
+            insert_lines.append(f"-- Registros: {len(df)}")
+            insert_lines.append("--")
+            insert_lines.append("")
+            
+            # Renderizar todos os valores de uma vez (coluna a coluna)
+            rendered_rows = render_sql_rows(df, schema)
+            
+            # Gerar INSERT statements em batches
+            total_batches = (len(df) + batch_size - 1) // batch_size
+            columns_str = ", ".join([f'"{col}"' for col in df.columns])
+            
+            for batch_idx in range(total_batches):
+                start_idx = batch_idx * batch_size
+                end_idx = min(start_idx + batch_size, len(df))
+                
+                # Valores já renderizados coluna a coluna
+                values_lines = rendered_rows[start_idx:end_idx]
+                
+                # Adicionar INSERT statement
+                if values_lines:
+                    insert_lines.append(f"INSERT INTO {table_name} ({columns_str}) VALUES")
+                    insert_lines.append(",\n".join(values_lines))
+                    insert_lines.append(";")
+                    insert_lines.append("")
+                
+                if batch_idx % 10 == 0:
+                    print(f"  [PROGRESSO] Batch {batch_idx + 1}/{total_batches}")
+            
+            insert_content = "\n".join(insert_lines)
+            metric['linhas'] = len(df)
+        print(f"[OK] Conteúdo INSERT gerado: {len(df)} registros")
+        return table_name, insert_content, schema, len(df)
+        
+    except Exception as e:
+        print(f"[ERRO] Erro ao gerar SQL para {csv_path}: {e}")
+        import traceback
+        traceback.print_exc()
+        return None, None, None, 0
+
+
+def write_complete_header(f, table_name: str, schema_content: str):
+    """Escreve o cabeçalho e o schema de um arquivo *_complete.sql"""
+    f.write("-- ============================================\n")
+    f.write(f"-- SQL COMPLETO: {table_name}\n")
+    f.write("-- Este arquivo contém CREATE TABLE e INSERT statements\n")
+    f.write("-- ============================================\n\n")
+    
+    f.write("-- SCHEMA (CREATE TABLE)\n")
+    f.write("-- " + "="*50 + "\n")
+    f.write(schema_content)
+    f.write("\n\n")
+    
+    f.write("-- DADOS (INSERT statements)\n")
+    f.write("-- " + "="*50 + "\n")
+
+
+def write_rollup_section(f, csv_path: str, table_name: str):
+    """Anexa ao *_complete.sql a atualização dos agregados que dependem da tabela (se houver)"""
+    rollup_sql = rollup_refresh_sql(table_name, monthly_report_bounds(csv_path))
+    if not rollup_sql:
+        return
+    f.write("\n-- AGREGADOS DO DASHBOARD (rollups.py)\n")
+    f.write("-- " + "="*50 + "\n")
+    f.write(rollup_sql)
+    f.write("\n")
+
+
+def generate_complete_file_streaming(csv_path: str, schema_path: Optional[str], complete_dir: str,
+                                     gtfs: bool = False, batch_size: int = 1000,
+                                     chunk_rows: int = STREAMING_CHUNK_ROWS) -> Tuple[Optional[str], int]:
+    """
+    Gera o arquivo *_complete.sql lendo o CSV em blocos e gravando cada batch de INSERT
+    assim que é produzido, com memória limitada ao tamanho do bloco.
+    A saída é idêntica à de generate_sql_inserts_content. Retorna (complete_filename, num_records)
+    """
+    temp_path = None
+    try:
+        # Blocos com múltiplos de batch_size para manter os mesmos INSERTs do modo em memória
+        chunk_rows = max(batch_size, (chunk_rows // batch_size) * batch_size)
+        
+        print(f"[INFO] Lendo arquivo em blocos de {chunk_rows} linhas: {os.path.basename(csv_path)}")
+        if is_parquet(csv_path):
+            # Parquet já guarda os tipos: não é preciso percorrer o arquivo antes
+            num_records, dtypes = parquet_dtypes(csv_path)
+        else:
+            num_records, dtypes = resolve_csv_dtypes(csv_path, chunk_rows)
+        print(f"[OK] Arquivo analisado: {num_records} registros, {len(dtypes)} colunas")
         
-        # Ler schema se disponível
         table_name = None
         column_types = {}
-        
+        schema = None
         if schema_path and os.path.exists(schema_path):
             print(f"[INFO] Lendo schema: {os.path.basename(schema_path)}")
-            table_name, column_types = parse_schema_file(schema_path)
-            print(f"[OK] Schema lido: tabela '{table_name}', {len(column_types)} colunas")
+            schema = load_schema(schema_path)
+            if schema:
+                table_name, column_types = schema.name, schema.column_types
+                print(f"[OK] Schema lido: tabela '{table_name}', {len(column_types)} colunas")
         else:
-            # Se não houver schema, usar nome do arquivo como tabela
-            table_name = os.path.basename(csv_path).replace("_clean.csv", "").replace(".csv", "")
+            table_name = csv_filename(os.path.basename(csv_path)).replace("_clean.csv", "").replace(".csv", "")
             table_name = table_name.replace("-", "_")
             print(f"[AVISO] Schema não encontrado, usando nome de tabela: {table_name}")
         
         if not table_name:
             print(f"[ERRO] Não foi possível determinar o nome da tabela")
-            return None, None, None, 0
-        
-        # Normalizar nomes de colunas (remover hífens, garantir compatibilidade)
-        df.columns = [col.replace('-', '_') for col in df.columns]
+            return None, 0
+        # Sem schema em arquivo, os literais dependem só dos nomes das colunas (como no modo em memória)
+        schema = schema or TableSchema(table_name, typed_literals=False)
         
-        # Gerar schema automaticamente se não houver schema_path
-        schema_content = None
-        if not schema_path:
-            print(f"[INFO] Gerando schema automaticamente para {table_name}")
-            schema_content = generate_sql_schema_from_df(df, table_name)
-            print(f"[OK] Schema gerado automaticamente")
-        
-        # Remover colunas que não estão no schema (se schema existir)
+        # Mesmas colunas que load_table_dataframe manteria
+        columns = [col.replace('-', '_') for col in dtypes]
         if column_types:
-            # Remover created_at se existir no DataFrame
-            if 'created_at' in df.columns:
-                df = df.drop('created_at', axis=1)
-            
-            # Filtrar apenas colunas que existem no schema
-            valid_columns = [col for col in df.columns if col in column_types or col == 'id']
+            columns = [col for col in columns if col != 'created_at']
+            valid_columns = [col for col in columns if col in column_types or col == 'id']
             if valid_columns:
-                df = df[valid_columns]
+                columns = valid_columns
         
-        if df.empty:
+        if num_records == 0 or not columns:
             print(f"[AVISO] DataFrame vazio após filtragem")
-            return None, None, None, 0
+            return None, 0
         
-        # Gerar conteúdo INSERT
-        insert_lines = []
-        insert_lines.append(f"-- SQL gerado automaticamente a partir de {os.path.basename(csv_path)}")
-        insert_lines.append(f"-- Tabela: {table_name}")
-        insert_lines.append(f"-- Registros: {len(df)}")
-        insert_lines.append("--")
-        insert_lines.append("")
+        insert_table = f"gtfs_{table_name}" if gtfs else table_name
+        partition = monthly_partition(csv_path, table_name) if schema_path else None
+        output_name = partition[0] if partition else insert_table
+        columns_str = ", ".join([f'"{col}"' for col in columns])
+        total_batches = (num_records + batch_size - 1) // batch_size
+        text_columns = [col for col, dtype in dtypes.items()
+                        if not (isinstance(dtype, np.dtype) and dtype.kind in 'iufb')]
+        longest_values = {}
         
-        # Gerar INSERT statements em batches
-        total_batches = (len(df) + batch_size - 1) // batch_size
+        # Os INSERTs vão para um arquivo temporário; o schema automático só é conhecido no final
+        complete_filename = f"{output_name}_complete.sql"
+        complete_path = os.path.join(complete_dir, complete_filename)
+        temp_path = complete_path + ".tmp"
         
-        for batch_idx in range(total_batches):
-            start_idx = batch_idx * batch_size
-            end_idx = min(start_idx + batch_size, len(df))
-            batch_df = df.iloc[start_idx:end_idx]
-            
-            # Gerar INSERT statement
-            columns_str = ", ".join([f'"{col}"' for col in batch_df.columns])
-            
-            # Gerar valores para cada linha
-            values_lines = []
-            for _, row in batch_df.iterrows():
-                values = []
-                for col in batch_df.columns:
-                    value = row[col]
-                    col_type = column_types.get(col, None)
-                    values.append(escape_sql_value(value, col_type, col))
+        batch_idx = 0
+        with open(temp_path, 'w', encoding='utf-8') as tmp:
+            for chunk in iter_processed_chunks(csv_path, chunk_rows, dtypes):
+                # Guardar o valor mais longo de cada coluna texto para o schema automático
+                if not schema_path:
+                    for col in text_columns:
+                        lengths = chunk[col].astype(str).str.len()
+                        if lengths.notna().any():
+                            idx = lengths.idxmax()
+                            if col not in longest_values or lengths[idx] > longest_values[col][0]:
+                                longest_values[col] = (lengths[idx], chunk[col][idx])
                 
-                values_str = ", ".join(values)
-                values_lines.append(f"    ({values_str})")
-            
-            # Adicionar INSERT statement
-            if values_lines:
-                insert_lines.append(f"INSERT INTO {table_name} ({columns_str}) VALUES")
-                insert_lines.append(",\n".join(values_lines))
-                insert_lines.append(";")
-                insert_lines.append("")
-            
-            if batch_idx % 10 == 0:
-                print(f"  [PROGRESSO] Batch {batch_idx + 1}/{total_batches}")
+                chunk.columns = [col.replace('-', '_') for col in chunk.columns]
+                rendered_rows = render_sql_rows(chunk[columns], schema)
+                
+                for start_idx in range(0, len(rendered_rows), batch_size):
+                    values_lines = rendered_rows[start_idx:start_idx + batch_size]
+                    tmp.write(f"\nINSERT INTO {insert_table} ({columns_str}) VALUES\n")
+                    tmp.write(",\n".join(values_lines))
+                    tmp.write("\n;\n")
+                    
+                    if batch_idx % 10 == 0:
+                        print(f"  [PROGRESSO] Batch {batch_idx + 1}/{total_batches}")
+                    batch_idx += 1
         
-        insert_content = "\n".join(insert_lines)
-        print(f"[OK] Conteúdo INSERT gerado: {len(df)} registros")
-        return table_name, insert_content, schema_content, len(df)
+        if schema_path:
+            with open(schema_path, 'r', encoding='utf-8') as f:
+                schema_content = f.read()
+            if partition:
+                schema_content += "\n\n" + partition[1]
+        else:
+            # DataFrame de uma linha com os dtypes finais e os valores mais longos
+            profile_columns = {}
+            for col, dtype in dtypes.items():
+                if col in text_columns:
+                    value = longest_values.get(col, (None, np.nan))[1]
+                else:
+                    value = True if dtype.kind == 'b' else 0
+                profile_columns[col] = pd.Series([value], dtype=dtype)
+            profile = pd.DataFrame(profile_columns)
+            profile.columns = [col.replace('-', '_') for col in profile.columns]
+            print(f"[INFO] Gerando schema automaticamente para {table_name}")
+            inferred = TableSchema.from_dataframe(profile[columns], table_name)
+            schema_content = gtfs_schema_sql(inferred) if gtfs else inferred.to_sql()
+        
+        with open(complete_path, 'w', encoding='utf-8') as f, open(temp_path, 'r', encoding='utf-8') as tmp:
+            write_complete_header(f, output_name, schema_content)
+            f.write(f"-- SQL gerado automaticamente a partir de {os.path.basename(csv_path)}\n")
+            f.write(f"-- Tabela: {table_name}\n")
+            f.write(f"-- Registros: {num_records}\n")
+            f.write("--\n")
+            shutil.copyfileobj(tmp, f)
+            if schema_path:
+                write_rollup_section(f, csv_path, table_name)
+        
+        print(f"[OK] Conteúdo INSERT gerado: {num_records} registros")
+        return complete_filename, num_records
         
     except Exception as e:
         print(f"[ERRO] Erro ao gerar SQL para {csv_path}: {e}")
         import traceback
         traceback.print_exc()
-        return None, None, None, 0
+        return None, 0
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def record_streaming_metric(metric: Dict, complete_dir: str, complete_filename: Optional[str], num_records: int):
+    """Tabela, linhas e bytes da etapa streaming (leitura, renderização e escrita intercaladas)"""
+    if complete_filename:
+        metric['tabela'] = complete_filename.replace("_complete.sql", "")
+        metric['bytes_escritos'] = file_bytes(os.path.join(complete_dir, complete_filename))
+    metric['linhas'] = num_records
+
+
+def process_csv_file(csv_path: str, schema_path: str, complete_dir: str,
+                     streaming: bool = False, chunk_rows: int = STREAMING_CHUNK_ROWS) -> bool:
+    """Gera o arquivo *_complete.sql de um CSV normal. Retorna True em caso de sucesso"""
+    print(f"\n--- Processando: {os.path.basename(csv_path)} ---")
+    
+    if streaming:
+        with stage(os.path.basename(csv_path), 'streaming') as metric:
+            complete_filename, num_records = generate_complete_file_streaming(
+                csv_path, schema_path, complete_dir, chunk_rows=chunk_rows)
+            record_streaming_metric(metric, complete_dir, complete_filename, num_records)
+        if complete_filename:
+            print(f"[SUCESSO] Arquivo completo gerado: {complete_filename} ({num_records} registros)")
+            return True
+        return False
+    
+    # Gerar conteúdo INSERT
+    table_name, insert_content, schema, num_records = generate_sql_inserts_content(csv_path, schema_path)
+    
+    if not (table_name and insert_content):
+        return False
+    
+    # Ler schema do arquivo ou usar o gerado automaticamente
+    try:
+        if schema_path:
+            with open(schema_path, 'r', encoding='utf-8') as f:
+                schema_content = f.read()
+        else:
+            schema_content = schema.to_sql() if schema.columns else ""
+        
+        # Relatório mensal: os INSERTs vão para a tabela particionada, após criar a partição do mês
+        output_name = table_name
+        partition = monthly_partition(csv_path, table_name) if schema_path else None
+        if partition:
+            output_name = partition[0]
+            schema_content += "\n\n" + partition[1]
+        
+        # Gerar nome do arquivo completo
+        complete_filename = f"{output_name}_complete.sql"
+        complete_path = os.path.join(complete_dir, complete_filename)
+        
+        # Combinar em arquivo completo
+        with stage(output_name, 'escrita') as metric:
+            with open(complete_path, 'w', encoding='utf-8') as f:
+                write_complete_header(f, output_name, schema_content)
+                f.write(insert_content)
+                if schema_path:
+                    write_rollup_section(f, csv_path, table_name)
+            metric['linhas'] = num_records
+            metric['bytes_escritos'] = file_bytes(complete_path)
+        
+        print(f"[SUCESSO] Arquivo completo gerado: {complete_filename} ({num_records} registros)")
+        return True
+    except Exception as e:
+        print(f"[ERRO] Erro ao gerar arquivo completo: {e}")
+        return False
+
+
+def process_gtfs_file(gtfs_path: str, complete_dir: str,
+                      streaming: bool = False, chunk_rows: int = STREAMING_CHUNK_ROWS) -> bool:
+    """Gera o arquivo gtfs_*_complete.sql de um CSV GTFS. Retorna True em caso de sucesso"""
+    print(f"\n--- Processando GTFS: {os.path.basename(gtfs_path)} ---")
+    
+    if streaming:
+        with stage(os.path.basename(gtfs_path), 'streaming') as metric:
+            complete_filename, num_records = generate_complete_file_streaming(
+                gtfs_path, None, complete_dir, gtfs=True, chunk_rows=chunk_rows)
+            record_streaming_metric(metric, complete_dir, complete_filename, num_records)
+        if complete_filename:
+            print(f"[SUCESSO] Arquivo completo GTFS gerado: {complete_filename} ({num_records} registros)")
+            return True
+        return False
+    
+    # Gerar conteúdo INSERT e schema automaticamente para GTFS
+    table_name, insert_content, schema, num_records = generate_sql_inserts_content(gtfs_path, None)
+    
+    if not (table_name and insert_content and schema):
+        return False
+    
+    # Gerar nome do arquivo completo GTFS
+    gtfs_table_name = f"gtfs_{table_name}"
+    complete_filename = f"{gtfs_table_name}_complete.sql"
+    complete_path = os.path.join(complete_dir, complete_filename)
+    
+    schema_content_gtfs = gtfs_schema_sql(schema)
+    
+    # Ajustar os INSERTs para usar o nome da tabela com prefixo gtfs_
+    insert_content_gtfs = insert_content.replace(f"INSERT INTO {table_name}", f"INSERT INTO {gtfs_table_name}")
+    
+    # Gerar arquivo completo com CREATE TABLE + INSERT
+    with stage(gtfs_table_name, 'escrita') as metric:
+        with open(complete_path, 'w', encoding='utf-8') as f:
+            write_complete_header(f, gtfs_table_name, schema_content_gtfs)
+            f.write(insert_content_gtfs)
+        metric['linhas'] = num_records
+        metric['bytes_escritos'] = file_bytes(complete_path)
+    
+    print(f"[SUCESSO] Arquivo completo GTFS gerado: {complete_filename} ({num_records} registros)")
+    return True
+
+
+def run_file_job(job: Tuple) -> bool:
+    """Executa um job ('csv' ou 'gtfs', caminho, schema, ...) do plano de geração"""
+    kind, path, schema_path, complete_dir, streaming, chunk_rows = job
+    if kind == 'csv':
+        return process_csv_file(path, schema_path, complete_dir, streaming, chunk_rows)
+    return process_gtfs_file(path, complete_dir, streaming, chunk_rows)
+
+
+def run_file_job_captured(job: Tuple) -> Tuple[bool, str]:
+    """Executa um job num processo do pool, capturando a saída para imprimir na ordem dos arquivos"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            success = run_file_job(job)
+        except Exception as e:
+            print(f"[ERRO] Erro ao processar {job[1]}: {e}")
+            success = False
+    return success, output.getvalue()
+
+
+def complete_filename_for(kind: str, path: str, schema_path: Optional[str]) -> Optional[str]:
+    """Nome do arquivo *_complete.sql que um job vai gerar (None se não for possível saber antes)"""
+    if kind == 'csv':
+        table_name, _ = parse_schema_file(schema_path)
+        if not table_name:
+            return None
+        partition = monthly_partition(path, table_name)
+        return f"{partition[0] if partition else table_name}_complete.sql"
+    table_name = csv_filename(os.path.basename(path)).replace("_clean.csv", "").replace(".csv", "").replace("-", "_")
+    return f"gtfs_{table_name}_complete.sql"
+
+
+def job_inputs(job: Tuple) -> List[str]:
+    """Arquivos de entrada de um job (CSV e schema, se houver)"""
+    _, path, schema_path = job[:3]
+    return [path, schema_path] if schema_path else [path]
+
+
+def plan_job(plan: List, manifest: Optional[Dict], job: Tuple):
+    """Adiciona o job ao plano, ou um item 'skip' se a saída já está atualizada no manifesto"""
+    kind, path, schema_path, complete_dir = job[:4]
+    if manifest is not None:
+        filename = complete_filename_for(kind, path, schema_path)
+        if filename and is_up_to_date(manifest, os.path.join(complete_dir, filename), job_inputs(job), GENERATOR_VERSION):
+            plan.append(('skip', (kind, os.path.basename(path), filename)))
+            return
+    plan.append(('job', job))
+
+
+def build_generation_plan(project_root: str, processed_dir: str, schemas_dir: str, complete_dir: str,
+                          streaming: bool, chunk_rows: int, manifest: Optional[Dict] = None) -> List[Tuple[str, object]]:
+    """
+    Monta o plano de geração na ordem da saída: itens ('msg', texto) com as mensagens
+    de descoberta, ('job', job) para cada arquivo a processar e ('skip', ...) para
+    arquivos sem alterações desde a última geração (se houver manifesto)
+    """
+    plan = []
+    
+    # Encontrar todos os arquivos processados (CSV ou Parquet)
+    csv_files = list_processed_files(processed_dir)
+    
+    if not csv_files:
+        plan.append(('msg', f"[AVISO] Nenhum arquivo processado encontrado em {processed_dir}"))
+    else:
+        plan.append(('msg', f"[INFO] Encontrados {len(csv_files)} arquivos processados\n"))
+        
+        for csv_file in csv_files:
+            # Encontrar schema correspondente
+            schema_path = find_matching_schema(csv_filename(csv_file), schemas_dir)
+            
+            if not schema_path:
+                plan.append(('msg', f"[AVISO] Schema não encontrado para {csv_file}, pulando..."))
+                continue
+            
+            plan_job(plan, manifest, ('csv', os.path.join(processed_dir, csv_file), schema_path,
+                                      complete_dir, streaming, chunk_rows))
+    
+    # Verificar se há arquivos GTFS processados
+    plan.append(('msg', "\n=== VERIFICANDO ARQUIVOS GTFS ===\n"))
+    
+    # Verificar múltiplos locais possíveis para GTFS
+    gtfs_locations = [
+        os.path.join(processed_dir, "gtfs"),
+        os.path.join(project_root, "scripts", "database", "processed"),
+    ]
+    
+    for gtfs_dir in gtfs_locations:
+        if os.path.exists(gtfs_dir):
+            plan.append(('msg', f"[INFO] Diretório GTFS encontrado: {gtfs_dir}"))
+            gtfs_files = list_processed_files(gtfs_dir)
+            
+            if gtfs_files:
+                plan.append(('msg', f"[INFO] Encontrados {len(gtfs_files)} arquivos GTFS processados\n"))
+                for gtfs_file in gtfs_files:
+                    plan_job(plan, manifest, ('gtfs', os.path.join(gtfs_dir, gtfs_file), None,
+                                              complete_dir, streaming, chunk_rows))
+            else:
+                plan.append(('msg', f"[AVISO] Nenhum arquivo GTFS processado encontrado em {gtfs_dir}"))
+    
+    return plan
 
 
 def main():
     """Função principal"""
+    parser = argparse.ArgumentParser(description="Gera arquivos SQL completos (CREATE TABLE + INSERT) a partir dos CSVs processados")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Lê os CSVs em blocos e grava cada batch de INSERT assim que é gerado (memória constante)")
+    parser.add_argument("--linhas-por-bloco", type=int, default=STREAMING_CHUNK_ROWS,
+                        help=f"Linhas lidas por bloco no modo streaming (padrão: {STREAMING_CHUNK_ROWS})")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Número de processos para gerar arquivos em paralelo (padrão: 1)")
+    parser.add_argument("--forcar", action="store_true",
+                        help="Regenera todos os arquivos, ignorando o manifesto de alterações")
+    parser.add_argument("--metricas", nargs="?", const=METRICS_FILE, metavar="ARQUIVO",
+                        help=f"Grava tempo, linhas/s, bytes e pico de memória de cada etapa em JSON lines "
+                             f"(padrão: {METRICS_FILE})")
+    args = parser.parse_args()
+    
     print("=== GERADOR DE ARQUIVOS SQL COMPLETOS PARA POPULAÇÃO DO BANCO ===\n")
     
     # Detectar diretórios
@@ -471,196 +877,84 @@ def main():
     print(f"[INFO] Diretório de schemas: {schemas_dir}")
     print(f"[INFO] Diretório de saída SQL: {complete_dir}\n")
     
+    if args.metricas:
+        # Caminho relativo à raiz do projeto; os processos do pool herdam a configuração
+        metrics_path = os.path.join(project_root, args.metricas)
+        configure(metrics_path, "generate_sql_inserts")
+        print(f"[INFO] Métricas das etapas: {metrics_path}\n")
+    
     # Verificar se os diretórios existem
     if not os.path.exists(processed_dir):
         print(f"[ERRO] Diretório de dados processados não encontrado: {processed_dir}")
         return
     
-    # Encontrar todos os CSVs processados
-    csv_files = [f for f in os.listdir(processed_dir) if f.endswith('.csv') and 'clean' in f]
+    # Manifesto com os hashes das entradas de cada arquivo gerado
+    manifest_path = os.path.join(complete_dir, MANIFEST_FILENAME)
+    manifest = load_manifest(manifest_path)
     
-    csv_success = 0
-    csv_errors = 0
+    plan = build_generation_plan(project_root, processed_dir, schemas_dir, complete_dir,
+                                 args.streaming, args.linhas_por_bloco,
+                                 None if args.forcar else manifest)
+    jobs = [item for kind, item in plan if kind == 'job']
     
-    if not csv_files:
-        print(f"[AVISO] Nenhum CSV processado encontrado em {processed_dir}")
-    else:
-        print(f"[INFO] Encontrados {len(csv_files)} arquivos CSV processados\n")
-        
-        # Processar cada CSV e gerar arquivo completo
-        for csv_file in sorted(csv_files):
-            csv_path = os.path.join(processed_dir, csv_file)
-            
-            # Encontrar schema correspondente
-            schema_path = find_matching_schema(csv_file, schemas_dir)
-            
-            if not schema_path:
-                print(f"[AVISO] Schema não encontrado para {csv_file}, pulando...")
+    results = {}
+    executor = None
+    if args.jobs > 1 and len(jobs) > 1:
+        # Arquivos maiores primeiro: o tempo total fica próximo ao do maior arquivo
+        executor = ProcessPoolExecutor(max_workers=args.jobs)
+        for job in sorted(jobs, key=lambda j: os.path.getsize(j[1]), reverse=True):
+            results[job] = executor.submit(run_file_job_captured, job)
+        print(f"[INFO] Processando {len(jobs)} arquivos com {args.jobs} processos\n")
+    
+    success = {'csv': 0, 'gtfs': 0}
+    errors = {'csv': 0, 'gtfs': 0}
+    skipped = 0
+    
+    try:
+        for kind, item in plan:
+            if kind == 'msg':
+                print(item)
                 continue
             
-            print(f"\n--- Processando: {csv_file} ---")
-            
-            # Gerar conteúdo INSERT
-            table_name, insert_content, auto_schema, num_records = generate_sql_inserts_content(csv_path, schema_path)
+            if kind == 'skip':
+                job_kind, input_name, filename = item
+                print(f"\n[OK] Sem alterações: {input_name} ({filename} mantido)")
+                success[job_kind] += 1
+                skipped += 1
+                continue
             
-            if table_name and insert_content:
-                # Ler schema do arquivo ou usar o gerado automaticamente
-                try:
-                    if schema_path:
-                        with open(schema_path, 'r', encoding='utf-8') as f:
-                            schema_content = f.read()
-                    else:
-                        schema_content = auto_schema or ""
-                    
-                    # Gerar nome do arquivo completo
-                    complete_filename = f"{table_name}_complete.sql"
-                    complete_path = os.path.join(complete_dir, complete_filename)
-                    
-                    # Combinar em arquivo completo
-                    with open(complete_path, 'w', encoding='utf-8') as f:
-                        f.write("-- ============================================\n")
-                        f.write(f"-- SQL COMPLETO: {table_name}\n")
-                        f.write("-- Este arquivo contém CREATE TABLE e INSERT statements\n")
-                        f.write("-- ============================================\n\n")
-                        
-                        f.write("-- SCHEMA (CREATE TABLE)\n")
-                        f.write("-- " + "="*50 + "\n")
-                        f.write(schema_content)
-                        f.write("\n\n")
-                        
-                        f.write("-- DADOS (INSERT statements)\n")
-                        f.write("-- " + "="*50 + "\n")
-                        f.write(insert_content)
-                    
-                    print(f"[SUCESSO] Arquivo completo gerado: {complete_filename} ({num_records} registros)")
-                    csv_success += 1
-                except Exception as e:
-                    print(f"[ERRO] Erro ao gerar arquivo completo: {e}")
-                    csv_errors += 1
+            if executor:
+                # Saída de cada arquivo impressa inteira, na ordem original
+                ok, output = results[item].result()
+                print(output, end="")
             else:
-                csv_errors += 1
-    
-    # Verificar se há arquivos GTFS processados
-    print("\n=== VERIFICANDO ARQUIVOS GTFS ===\n")
-    
-    # Verificar múltiplos locais possíveis para GTFS
-    gtfs_locations = [
-        os.path.join(processed_dir, "gtfs"),
-        os.path.join(project_root, "scripts", "database", "processed"),
-    ]
-    
-    gtfs_success = 0
-    gtfs_errors = 0
-    
-    for gtfs_dir in gtfs_locations:
-        if os.path.exists(gtfs_dir):
-            print(f"[INFO] Diretório GTFS encontrado: {gtfs_dir}")
-            gtfs_files = [f for f in os.listdir(gtfs_dir) if f.endswith('.csv') and 'clean' in f]
+                ok = run_file_job(item)
             
-            if gtfs_files:
-                print(f"[INFO] Encontrados {len(gtfs_files)} arquivos GTFS processados\n")
-                
-                for gtfs_file in sorted(gtfs_files):
-                    gtfs_path = os.path.join(gtfs_dir, gtfs_file)
-                    
-                    print(f"\n--- Processando GTFS: {gtfs_file} ---")
-                    
-                    # Gerar conteúdo INSERT e schema automaticamente para GTFS
-                    table_name, insert_content, schema_content, num_records = generate_sql_inserts_content(gtfs_path, None)
-                    
-                    if table_name and insert_content and schema_content:
-                        # Gerar nome do arquivo completo GTFS
-                        gtfs_table_name = f"gtfs_{table_name}"
-                        complete_filename = f"{gtfs_table_name}_complete.sql"
-                        complete_path = os.path.join(complete_dir, complete_filename)
-                        
-                        # Ajustar o schema para usar o nome da tabela com prefixo gtfs_
-                        schema_content_gtfs = schema_content.replace(f"CREATE TABLE IF NOT EXISTS {table_name}", f"CREATE TABLE IF NOT EXISTS {gtfs_table_name}")
-                        
-                        # Ajustar PRIMARY KEY para tabelas GTFS específicas
-                        import re
-                        if 'trips' in table_name.lower():
-                            # Remover PRIMARY KEY de route_id se existir
-                            schema_content_gtfs = re.sub(r'route_id\s+INTEGER\s+PRIMARY\s+KEY,', 'route_id INTEGER,', schema_content_gtfs)
-                            # Garantir que trip_id tem PRIMARY KEY
-                            if "trip_id" in schema_content_gtfs and "trip_id" not in schema_content_gtfs.split("PRIMARY KEY")[0]:
-                                schema_content_gtfs = re.sub(r'trip_id\s+VARCHAR\(255\),', 'trip_id VARCHAR(255) PRIMARY KEY,', schema_content_gtfs)
-                        
-                        elif 'calendar_dates' in table_name.lower():
-                            # Remover PRIMARY KEY simples de service_id
-                            schema_content_gtfs = re.sub(r'service_id\s+VARCHAR\(255\)\s+PRIMARY\s+KEY,', 'service_id VARCHAR(255),', schema_content_gtfs)
-                            # Adicionar PRIMARY KEY composta se não existir
-                            if "PRIMARY KEY (service_id, date)" not in schema_content_gtfs:
-                                schema_content_gtfs = schema_content_gtfs.replace(
-                                    "    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
-                                    "    PRIMARY KEY (service_id, date),\n    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
-                                )
-                        elif 'fare_rules' in table_name.lower():
-                            # Remover PRIMARY KEY simples de fare_id
-                            schema_content_gtfs = re.sub(r'fare_id\s+VARCHAR\(255\)\s+PRIMARY\s+KEY,', 'fare_id VARCHAR(255),', schema_content_gtfs)
-                            # Adicionar PRIMARY KEY composta se não existir
-                            if "PRIMARY KEY (fare_id, route_id)" not in schema_content_gtfs:
-                                schema_content_gtfs = schema_content_gtfs.replace(
-                                    "    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
-                                    "    PRIMARY KEY (fare_id, route_id),\n    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
-                                )
-                        elif 'shapes' in table_name.lower():
-                            # Remover PRIMARY KEY simples de shape_id
-                            schema_content_gtfs = re.sub(r'shape_id\s+VARCHAR\(255\)\s+PRIMARY\s+KEY,', 'shape_id VARCHAR(255),', schema_content_gtfs)
-                            # Adicionar PRIMARY KEY composta se não existir
-                            if "PRIMARY KEY (shape_id, shape_pt_sequence)" not in schema_content_gtfs:
-                                schema_content_gtfs = schema_content_gtfs.replace(
-                                    "    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
-                                    "    PRIMARY KEY (shape_id, shape_pt_sequence),\n    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
-                                )
-                        elif 'stop_times' in table_name.lower():
-                            # Remover PRIMARY KEY simples de trip_id
-                            schema_content_gtfs = re.sub(r'trip_id\s+VARCHAR\(255\)\s+PRIMARY\s+KEY,', 'trip_id VARCHAR(255),', schema_content_gtfs)
-                            # Adicionar PRIMARY KEY composta se não existir
-                            if "PRIMARY KEY (trip_id, stop_sequence)" not in schema_content_gtfs:
-                                schema_content_gtfs = schema_content_gtfs.replace(
-                                    "    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
-                                    "    PRIMARY KEY (trip_id, stop_sequence),\n    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
-                                )
-                        
-                        # Ajustar os INSERTs para usar o nome da tabela com prefixo gtfs_
-                        insert_content_gtfs = insert_content.replace(f"INSERT INTO {table_name}", f"INSERT INTO {gtfs_table_name}")
-                        
-                        # Gerar arquivo completo com CREATE TABLE + INSERT
-                        with open(complete_path, 'w', encoding='utf-8') as f:
-                            f.write("-- ============================================\n")
-                            f.write(f"-- SQL COMPLETO: {gtfs_table_name}\n")
-                            f.write("-- Este arquivo contém CREATE TABLE e INSERT statements\n")
-                            f.write("-- ============================================\n\n")
-                            
-                            f.write("-- SCHEMA (CREATE TABLE)\n")
-                            f.write("-- " + "="*50 + "\n")
-                            f.write(schema_content_gtfs)
-                            f.write("\n\n")
-                            
-                            f.write("-- DADOS (INSERT statements)\n")
-                            f.write("-- " + "="*50 + "\n")
-                            f.write(insert_content_gtfs)
-                        
-                        print(f"[SUCESSO] Arquivo completo GTFS gerado: {complete_filename} ({num_records} registros)")
-                        gtfs_success += 1
-                    else:
-                        gtfs_errors += 1
+            if ok:
+                success[item[0]] += 1
+                filename = complete_filename_for(item[0], item[1], item[2])
+                if filename:
+                    record_output(manifest, os.path.join(complete_dir, filename), job_inputs(item), GENERATOR_VERSION)
+                    save_manifest(manifest_path, manifest)
             else:
-                print(f"[AVISO] Nenhum arquivo GTFS processado encontrado em {gtfs_dir}")
+                errors[item[0]] += 1
+    finally:
+        if executor:
+            executor.shutdown()
     
     # Resumo final
     print("\n=== RESUMO ===")
-    total_success = csv_success + gtfs_success
-    total_errors = csv_errors + gtfs_errors
+    total_success = success['csv'] + success['gtfs']
+    total_errors = errors['csv'] + errors['gtfs']
     
     print(f"[SUCESSO] Arquivos SQL completos gerados: {total_success}")
-    print(f"  - CSVs normais: {csv_success}")
-    print(f"  - GTFS: {gtfs_success}")
+    print(f"  - CSVs normais: {success['csv']}")
+    print(f"  - GTFS: {success['gtfs']}")
     print(f"[ERRO] Erros: {total_errors}")
+    if skipped:
+        print(f"[INFO] Arquivos sem alterações (não regenerados): {skipped}")
     print(f"[INFO] Arquivos completos salvos em: {complete_dir}")
 
 
 if __name__ == "__main__":
     main()
-
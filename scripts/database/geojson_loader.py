@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Carga das camadas GeoJSON (Faixa Azul e futuras) no PostgreSQL/PostGIS via COPY.
+
+Substitui o pg_read_file do geojson_schema.sql, que exigia copiar o arquivo para o
+servidor, acesso de superusuário a arquivos e interpretava a FeatureCollection
+inteira como um único jsonb. Aqui as features são lidas do arquivo uma a uma
+(iter_features), a geometria é convertida para EWKB (hex) no Python e enviada em
+blocos por COPY para uma tabela temporária; de lá, um INSERT ... ON CONFLICT
+atualiza as features existentes (pela chave da camada) e insere as novas, sem
+apagar e recriar a tabela. O uso de memória fica limitado ao tamanho do bloco.
+
+Uso:
+    python scripts/database/geojson_loader.py
+    python scripts/database/geojson_loader.py --camadas faixaazul --features-por-bloco 5000
+"""
+
+import os
+import io
+import csv
+import json
+import struct
+import argparse
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Features enviadas por chamada de COPY
+FEATURES_PER_CHUNK = 10000
+
+# Caracteres lidos do arquivo por vez pelo leitor incremental
+READ_BLOCK_CHARS = 1024 * 1024
+
+# SRID das coordenadas GeoJSON (CRS84 ~ EPSG:4326)
+DEFAULT_SRID = 4326
+
+# Camada -> arquivo em data/processed, schema, tabela, chave natural e
+# coluna da tabela -> propriedade do GeoJSON
+LAYERS: Dict[str, Dict] = {
+    'faixaazul': {
+        'arquivo': "faixaazul_clean.geojson",
+        'schema': "geojson_schema.sql",
+        'tabela': "faixaazul",
+        'chave': ['name'],
+        'colunas': {'name': 'Name', 'tipo': 'Tipo'},
+    },
+}
+
+# Códigos de tipo WKB
+WKB_TYPES = {
+    'Point': 1,
+    'LineString': 2,
+    'Polygon': 3,
+    'MultiPoint': 4,
+    'MultiLineString': 5,
+    'MultiPolygon': 6,
+}
+
+# Flag de SRID presente no tipo EWKB
+EWKB_SRID_FLAG = 0x20000000
+
+_decoder = json.JSONDecoder()
+
+
+# ---------- Leitura incremental ----------
+
+class _Reader:
+    """Buffer sobre o arquivo texto que decodifica valores JSON um a um"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Lê mais um bloco do arquivo, descartando o que já foi consumido"""
+        if self.eof:
+            return False
+        chunk = self.f.read(READ_BLOCK_CHARS)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def next_char(self) -> str:
+        """Próximo caractere que não é espaço (sem consumir). '' no fim do arquivo"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.next_char()
+        if found != char:
+            raise ValueError(f"GeoJSON inválido: esperado '{char}', encontrado '{found or 'fim do arquivo'}'")
+        self.pos += 1
+
+    def value(self):
+        """Decodifica o próximo valor JSON completo, lendo mais blocos se ele estiver cortado"""
+        self.next_char()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Um número no fim do buffer pode continuar no próximo bloco
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_features(path: str) -> Iterator[Dict]:
+    """
+    Percorre as features de uma FeatureCollection sem carregar o arquivo inteiro:
+    só uma feature por vez fica decodificada na memória
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = _Reader(f)
+        reader.expect('{')
+        if reader.next_char() == '}':
+            return
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            if key == 'features':
+                reader.expect('[')
+                if reader.next_char() == ']':
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield reader.value()
+                        separator = reader.next_char()
+                        reader.pos += 1
+                        if separator == ']':
+                            break
+                        if separator != ',':
+                            raise ValueError("GeoJSON inválido: lista de features mal formada")
+            else:
+                reader.value()  # type, name, crs...
+            separator = reader.next_char()
+            reader.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError("GeoJSON inválido: objeto FeatureCollection mal formado")
+
+
+# ---------- WKB ----------
+
+def _pack_points(coords) -> bytes:
+    return struct.pack('<I', len(coords)) + b"".join(struct.pack('<2d', c[0], c[1]) for c in coords)
+
+
+def _wkb_body(geom_type: str, coords) -> bytes:
+    """Corpo WKB (little endian, 2D) das coordenadas de uma geometria"""
+    if geom_type == 'Point':
+        return struct.pack('<2d', coords[0], coords[1])
+    if geom_type == 'LineString':
+        return _pack_points(coords)
+    if geom_type == 'Polygon':
+        return struct.pack('<I', len(coords)) + b"".join(_pack_points(ring) for ring in coords)
+    # Multi*: cada parte é uma geometria WKB completa (sem SRID)
+    part_type = geom_type[len('Multi'):]
+    return struct.pack('<I', len(coords)) + b"".join(
+        struct.pack('<BI', 1, WKB_TYPES[part_type]) + _wkb_body(part_type, part) for part in coords)
+
+
+def geometry_to_ewkb(geometry: Dict, srid: int = DEFAULT_SRID) -> str:
+    """Converte uma geometria GeoJSON para EWKB em hexadecimal, aceito pelo PostGIS em INSERT e COPY"""
+    geom_type = geometry.get('type')
+    if geom_type not in WKB_TYPES:
+        raise ValueError(f"Geometria não suportada: {geom_type}")
+    header = struct.pack('<BII', 1, WKB_TYPES[geom_type] | EWKB_SRID_FLAG, srid)
+    return (header + _wkb_body(geom_type, geometry['coordinates'])).hex().upper()
+
+
+# ---------- Carga ----------
+
+def feature_row(feature: Dict, layer: Dict) -> Optional[List]:
+    """Valores das colunas da camada + geometria EWKB. None se faltar geometria ou chave"""
+    geometry = feature.get('geometry')
+    if not geometry:
+        return None
+    properties = feature.get('properties') or {}
+    values = [properties.get(prop) for prop in layer['colunas'].values()]
+    row = dict(zip(layer['colunas'], values))
+    if any(row.get(key) is None for key in layer['chave']):
+        return None
+    return values + [geometry_to_ewkb(geometry)]
+
+
+def upsert_sql(layer: Dict, staging: str) -> str:
+    """INSERT ... ON CONFLICT da tabela temporária para a tabela da camada"""
+    columns = list(layer['colunas']) + ['geom']
+    key = ", ".join(layer['chave'])
+    updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in columns if col not in layer['chave'])
+    # Chave repetida no arquivo: vale a última ocorrência; novas features entram na ordem do arquivo
+    return f"""INSERT INTO {layer['tabela']} ({", ".join(columns)})
+SELECT {", ".join(columns)} FROM (
+    SELECT DISTINCT ON ({key}) * FROM {staging} ORDER BY {key}, ordem DESC
+) AS ultima
+ORDER BY ordem
+ON CONFLICT ({key}) DO UPDATE SET {updates}"""
+
+
+def load_layer(conn, name: str, project_root: str,
+               features_per_chunk: int = FEATURES_PER_CHUNK) -> Tuple[int, int]:
+    """Carrega uma camada GeoJSON com COPY + upsert. Retorna (features enviadas, features ignoradas)"""
+    layer = LAYERS[name]
+    geojson_path = os.path.join(project_root, "data", "processed", layer['arquivo'])
+    schema_path = os.path.join(project_root, "database", "schemas", layer['schema'])
+    staging = f"{layer['tabela']}_carga"
+    columns = list(layer['colunas']) + ['geom']
+    copy_sql = f"COPY {staging} ({', '.join(columns)}, ordem) FROM STDIN WITH (FORMAT csv)"
+
+    with open(schema_path, 'r', encoding='utf-8') as f:
+        schema_content = f.read()
+
+    sent = 0
+    skipped = 0
+    with conn.cursor() as cursor:
+        cursor.execute(schema_content)
+        # Tabela temporária só com as colunas da carga (sem o id SERIAL) e a posição no arquivo
+        cursor.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                       f"SELECT {', '.join(columns)} FROM {layer['tabela']} WITH NO DATA")
+        cursor.execute(f"ALTER TABLE {staging} ADD COLUMN ordem BIGINT")
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        pending = 0
+        for position, feature in enumerate(iter_features(geojson_path)):
+            row = feature_row(feature, layer)
+            if row is None:
+                skipped += 1
+                continue
+            writer.writerow(row + [position])
+            pending += 1
+            if pending == features_per_chunk:
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+                sent += pending
+                print(f"  [PROGRESSO] {sent} features enviadas")
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                pending = 0
+        if pending:
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+            sent += pending
+
+        cursor.execute(upsert_sql(layer, staging))
+    conn.commit()
+    return sent, skipped
+
+
+def main():
+    """Função principal"""
+    from copy_loader import get_connection
+    from generate_sql_inserts import detect_project_root
+
+    parser = argparse.ArgumentParser(description="Carrega as camadas GeoJSON no PostGIS via COPY, com upsert")
+    parser.add_argument("--camadas", nargs="*", choices=sorted(LAYERS),
+                        help="Carrega apenas estas camadas (padrão: todas)")
+    parser.add_argument("--features-por-bloco", type=int, default=FEATURES_PER_CHUNK,
+                        help=f"Features enviadas por COPY (padrão: {FEATURES_PER_CHUNK})")
+    args = parser.parse_args()
+
+    print("=== CARGA DAS CAMADAS GEOJSON NO POSTGIS ===\n")
+
+    project_root = detect_project_root()
+    try:
+        conn = get_connection(project_root)
+    except Exception as e:
+        print(f"[ERRO] Não foi possível conectar ao PostgreSQL: {e}")
+        return
+
+    success = 0
+    errors = 0
+    try:
+        for name in args.camadas or LAYERS:
+            print(f"\n--- Carregando camada: {name} ---")
+            try:
+                sent, skipped = load_layer(conn, name, project_root, args.features_por_bloco)
+                if skipped:
+                    print(f"[AVISO] {skipped} features sem geometria ou sem chave ignoradas")
+                print(f"[SUCESSO] {LAYERS[name]['tabela']}: {sent} features inseridas ou atualizadas")
+                success += 1
+            except Exception as e:
+                conn.rollback()
+                print(f"[ERRO] Falha ao carregar {name}: {e}")
+                errors += 1
+    finally:
+        conn.close()
+
+    print("\n=== RESUMO ===")
+    print(f"[SUCESSO] Camadas carregadas: {success}")
+    print(f"[ERRO] Erros: {errors}")
+
+
+if __name__ == "__main__":
+    main()
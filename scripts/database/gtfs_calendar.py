@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Calendário de serviço do GTFS: quais serviços (e viagens) operam em cada dia.
+
+calendar (dias da semana + vigência) e calendar_dates (exceções: 1 = serviço
+adicionado, 2 = removido) são expandidos uma única vez numa matriz booleana
+dia × service_id. Depois disso, "quais viagens rodam no dia D" é uma indexação
+na matriz, sem repetir a lógica de dias da semana e exceções em cada consulta.
+
+A matriz também é exportada como a tabela gtfs_service_days (date, service_id),
+uma linha por serviço ativo em cada dia, para que as análises por dia no banco
+sejam um JOIN simples:
+
+    SELECT t.route_id, COUNT(*) FROM gtfs_trips t
+    JOIN gtfs_service_days d ON d.service_id = t.service_id
+    WHERE d.date = '2025-03-03' GROUP BY t.route_id;
+
+Uso (depois do clean_gtfs.py):
+    python scripts/database/gtfs_calendar.py
+    python scripts/database/gtfs_calendar.py --data 2025-03-03
+"""
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Optional, Union
+
+from generate_sql_inserts import detect_project_root
+from processed_io import OUTPUT_FORMATS, find_processed_file, read_processed, save_processed
+
+# Colunas de dias da semana do calendar.txt, de segunda (0) a domingo (6)
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+# exception_type do calendar_dates.txt
+SERVICE_ADDED = 1
+SERVICE_REMOVED = 2
+
+# Tabela exportada (vira gtfs_service_days no gerador de SQL e no copy_loader)
+SERVICE_DAYS_FILE = "service_days_clean.csv"
+
+DateLike = Union[str, pd.Timestamp, np.datetime64]
+
+
+def to_days(values) -> np.ndarray:
+    """Datas (texto YYYY-MM-DD, date ou Timestamp) como datetime64[D]; inválidas viram NaT"""
+    series = pd.Series(values)
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        series = pd.to_datetime(series.astype(str), format='mixed', errors='coerce')
+    return series.to_numpy(dtype='datetime64[D]')
+
+
+def to_day(value: DateLike) -> np.datetime64:
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+
+class ServiceCalendar:
+    """
+    Matriz active[dia, serviço] a partir de start (primeiro dia) e da lista de
+    service_id. Dias fora do intervalo não têm nenhum serviço ativo
+    """
+
+    def __init__(self, start: np.datetime64, service_ids: np.ndarray, active: np.ndarray):
+        self.start = start
+        self.service_ids = service_ids
+        self.active = active
+        self._services = pd.Index(service_ids)
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self.start + np.arange(self.active.shape[0])
+
+    @classmethod
+    def from_frames(cls, calendar: Optional[pd.DataFrame],
+                    calendar_dates: Optional[pd.DataFrame]) -> 'ServiceCalendar':
+        """Expande calendar e calendar_dates (limpos) na matriz dia × serviço"""
+        calendar = calendar if calendar is not None else pd.DataFrame(columns=['service_id'])
+        calendar_dates = calendar_dates if calendar_dates is not None else pd.DataFrame(columns=['service_id'])
+        calendar = calendar.dropna(subset=['service_id'])
+        calendar_dates = calendar_dates.dropna(subset=['service_id'])
+
+        cal_ids = calendar['service_id'].astype(str).to_numpy()
+        exc_ids = calendar_dates['service_id'].astype(str).to_numpy()
+        service_ids = pd.unique(np.concatenate([cal_ids, exc_ids]))
+
+        cal_start = to_days(calendar.get('start_date', pd.Series(index=calendar.index, dtype=object)))
+        cal_end = to_days(calendar.get('end_date', pd.Series(index=calendar.index, dtype=object)))
+        exc_dates = to_days(calendar_dates.get('date', pd.Series(index=calendar_dates.index, dtype=object)))
+
+        known = np.concatenate([cal_start, cal_end, exc_dates])
+        known = known[~np.isnat(known)]
+        if len(known) == 0 or len(service_ids) == 0:
+            return cls(np.datetime64('1970-01-01', 'D'), np.asarray(service_ids, dtype=object),
+                       np.zeros((0, len(service_ids)), dtype=bool))
+
+        start = known.min()
+        days = start + np.arange((known.max() - start).astype(int) + 1)
+        # 1970-01-01 foi uma quinta-feira: +3 leva segunda-feira para 0
+        weekday = (days.astype('int64') + 3) % 7
+        services = pd.Index(service_ids)
+        active = np.zeros((len(days), len(service_ids)), dtype=bool)
+
+        # Dias da semana dentro da vigência de cada serviço do calendar
+        if len(calendar):
+            flags = np.column_stack([
+                pd.to_numeric(calendar[day], errors='coerce').fillna(0).to_numpy() > 0
+                if day in calendar.columns else np.zeros(len(calendar), dtype=bool)
+                for day in WEEKDAYS
+            ])
+            # Comparações com NaT são falsas: serviço sem vigência válida não roda
+            in_range = (days[:, None] >= cal_start[None, :]) & (days[:, None] <= cal_end[None, :])
+            active[:, services.get_indexer(cal_ids)] = flags[:, weekday].T & in_range
+
+        # Exceções por cima do padrão semanal
+        if len(calendar_dates):
+            exception = pd.to_numeric(calendar_dates.get('exception_type'), errors='coerce').to_numpy()
+            valid = ~np.isnat(exc_dates) & np.isin(exception, [SERVICE_ADDED, SERVICE_REMOVED])
+            rows = (exc_dates[valid] - start).astype(int)
+            cols = services.get_indexer(exc_ids[valid])
+            active[rows, cols] = exception[valid] == SERVICE_ADDED
+
+        return cls(start, np.asarray(service_ids, dtype=object), active)
+
+    def day_index(self, dates) -> np.ndarray:
+        """Linha da matriz de cada data (-1 fora do calendário)"""
+        offsets = (to_days(np.atleast_1d(dates)) - self.start).astype('int64')
+        offsets[(offsets < 0) | (offsets >= self.active.shape[0])] = -1
+        return offsets
+
+    def service_index(self, service_ids) -> np.ndarray:
+        """Coluna da matriz de cada service_id (-1 se desconhecido)"""
+        return self._services.get_indexer(pd.Index(service_ids).astype(str))
+
+    def is_active(self, service_ids, dates) -> np.ndarray:
+        """Se cada serviço opera na data correspondente (listas de mesmo tamanho, ou uma data para todos)"""
+        cols = self.service_index(service_ids)
+        rows = np.broadcast_to(self.day_index(dates), cols.shape)
+        valid = (cols >= 0) & (rows >= 0)
+        result = np.zeros(cols.shape, dtype=bool)
+        result[valid] = self.active[rows[valid], cols[valid]]
+        return result
+
+    def active_services(self, date: DateLike) -> np.ndarray:
+        """service_id que operam na data"""
+        row = self.day_index(date)[0]
+        if row < 0:
+            return np.empty(0, dtype=object)
+        return self.service_ids[self.active[row]]
+
+    def trip_mask(self, trips: pd.DataFrame, date: DateLike) -> np.ndarray:
+        """Máscara das viagens (linhas de trips) que operam na data"""
+        return self.is_active(trips['service_id'].to_numpy(), to_day(date))
+
+    def active_trips(self, trips: pd.DataFrame, date: DateLike) -> pd.DataFrame:
+        """Viagens que operam na data"""
+        return trips[self.trip_mask(trips, date)]
+
+    def trips_per_day(self, trips: pd.DataFrame) -> pd.DataFrame:
+        """Quantidade de viagens programadas em cada dia do calendário"""
+        cols = self.service_index(trips['service_id'].to_numpy())
+        per_service = np.bincount(cols[cols >= 0], minlength=len(self.service_ids))
+        return pd.DataFrame({
+            'date': pd.to_datetime(self.dates).date,
+            'viagens': self.active.astype(np.int64) @ per_service,
+        })
+
+    def service_days(self) -> pd.DataFrame:
+        """Tabela (date, service_id) com um registro por serviço ativo em cada dia"""
+        rows, cols = np.nonzero(self.active)
+        return pd.DataFrame({
+            'date': pd.to_datetime(self.start + rows).date,
+            'service_id': self.service_ids[cols],
+        })
+
+
+def load_table(gtfs_dir: str, name: str) -> Optional[pd.DataFrame]:
+    """Tabela GTFS limpa (CSV ou Parquet); None se não existir"""
+    path = find_processed_file(gtfs_dir, f"{name}_clean.csv")
+    return read_processed(path) if path else None
+
+
+def load_calendar(gtfs_dir: str) -> Optional[ServiceCalendar]:
+    """Calendário de serviço a partir de calendar e calendar_dates limpos (None se nenhum existir)"""
+    calendar = load_table(gtfs_dir, 'calendar')
+    calendar_dates = load_table(gtfs_dir, 'calendar_dates')
+    if calendar is None and calendar_dates is None:
+        return None
+    return ServiceCalendar.from_frames(calendar, calendar_dates)
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Expande o calendário de serviço do GTFS em dias × serviços")
+    parser.add_argument("--data",
+                        help="Mostra os serviços e as viagens que operam nesta data (YYYY-MM-DD)")
+    parser.add_argument("--formato", choices=sorted(OUTPUT_FORMATS), default='csv',
+                        help="Formato da tabela service_days: csv, parquet ou ambos (padrão: csv)")
+    args = parser.parse_args()
+
+    print("=== CALENDÁRIO DE SERVIÇO GTFS ===\n")
+
+    project_root = detect_project_root()
+    gtfs_dir = os.path.join(project_root, "data", "processed", "gtfs")
+    calendar = load_calendar(gtfs_dir)
+    if calendar is None:
+        print(f"[ERRO] calendar/calendar_dates limpos não encontrados em {gtfs_dir}")
+        return
+
+    dates = calendar.dates
+    print(f"[OK] {len(calendar.service_ids)} serviços, {len(dates)} dias"
+          + (f" ({dates[0]} a {dates[-1]})" if len(dates) else ""))
+
+    service_days = calendar.service_days()
+    paths = save_processed(service_days, os.path.join(gtfs_dir, SERVICE_DAYS_FILE), args.formato)
+    print(f"[SUCESSO] {', '.join(os.path.basename(p) for p in paths)} ({len(service_days)} registros)")
+
+    trips = load_table(gtfs_dir, 'trips')
+    if args.data:
+        services = calendar.active_services(args.data)
+        print(f"\n[INFO] {args.data}: {len(services)} serviços ativos: {', '.join(map(str, services))}")
+        if trips is not None:
+            print(f"[INFO] {args.data}: {int(calendar.trip_mask(trips, args.data).sum())} viagens programadas")
+    elif trips is not None and len(dates):
+        per_day = calendar.trips_per_day(trips)
+        busiest = per_day.loc[per_day['viagens'].idxmax()]
+        print(f"[INFO] Viagens por dia: média {per_day['viagens'].mean():.0f}, "
+              f"máximo {busiest['viagens']} em {busiest['date']}")
+
+
+if __name__ == "__main__":
+    main()
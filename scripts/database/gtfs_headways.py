@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Frequência programada do transporte público: headways, viagens por hora e período
+de operação, por linha, sentido e parada, num dia de serviço.
+
+As partidas do dia vêm do índice de horários (gtfs_timetable.py), em que stop_times
+já está ligado a trips (linha e sentido de cada viagem), e as viagens que operam no
+dia vêm do calendário (gtfs_calendar.py). Tudo é calculado com groupby/diff sobre
+as partidas, sem laços por viagem:
+
+- headway: intervalo até a partida anterior do mesmo grupo (linha, sentido e, no
+  nível de parada, a parada), atribuído à hora da partida;
+- viagens por hora e período de operação (primeira e última partida).
+
+No nível de linha, as partidas são as saídas do ponto inicial de cada viagem.
+Gera, em data/processed, tabelas prontas para os painéis do Grafana:
+- frequencia_linha_hora e frequencia_parada_hora: viagens e headways por hora;
+- frequencia_linha_resumo e frequencia_parada_resumo: período de operação e headway médio.
+
+Uso (depois do clean_gtfs.py):
+    python scripts/database/gtfs_headways.py
+    python scripts/database/gtfs_headways.py --data 2025-03-03
+"""
+
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from generate_sql_inserts import detect_project_root
+from gtfs_timetable import Timetable, format_seconds, load_timetable, lookup_ids, service_trip_mask
+from processed_io import OUTPUT_FORMATS, save_processed
+
+ROUTE_KEYS = ['route_id', 'direction_id']
+STOP_KEYS = ['route_id', 'direction_id', 'stop_id']
+
+# Tabela -> arquivo processado
+OUTPUT_FILES = {
+    'frequencia_linha_hora': "frequencia_linha_hora_clean.csv",
+    'frequencia_linha_resumo': "frequencia_linha_resumo_clean.csv",
+    'frequencia_parada_hora': "frequencia_parada_hora_clean.csv",
+    'frequencia_parada_resumo': "frequencia_parada_resumo_clean.csv",
+}
+
+
+def departure_events(timetable: Timetable, trip_mask: Optional[np.ndarray] = None,
+                     first_stop_only: bool = False) -> pd.DataFrame:
+    """
+    Partidas das viagens em trip_mask (todas, sem máscara) com linha, sentido e parada
+    como códigos inteiros. Com first_stop_only, só a saída do ponto inicial de cada viagem
+    """
+    offsets = timetable.trip_offsets
+    if first_stop_only:
+        trips = np.flatnonzero(np.diff(offsets) > 0)
+        events = offsets[trips]
+    else:
+        trips = np.repeat(np.arange(timetable.num_trips), np.diff(offsets))
+        events = np.arange(timetable.num_events)
+    if trip_mask is not None:
+        active = trip_mask[trips]
+        trips, events = trips[active], events[active]
+    return pd.DataFrame({
+        'route_id': timetable.trip_route[trips],
+        'direction_id': timetable.trip_direction[trips],
+        'stop_id': timetable.event_stop[events],
+        'partida': timetable.event_departure[events].astype(np.int64),
+    })
+
+
+def departure_frequency(events: pd.DataFrame, keys: List[str]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Viagens e headways por hora, e período de operação, de cada grupo de keys"""
+    events = events.sort_values(keys + ['partida'], kind='stable')
+    events['headway'] = events.groupby(keys, sort=False)['partida'].diff() / 60
+    # Hora do dia de serviço (24, 25... para as partidas depois da meia-noite)
+    events['hora'] = events['partida'] // 3600
+
+    hourly = events.groupby(keys + ['hora'], sort=True).agg(
+        viagens=('partida', 'size'),
+        headway_medio_min=('headway', 'mean'),
+        headway_max_min=('headway', 'max'),
+    ).reset_index()
+
+    span = events.groupby(keys, sort=True).agg(
+        viagens=('partida', 'size'),
+        primeira=('partida', 'min'),
+        ultima=('partida', 'max'),
+        headway_medio_min=('headway', 'mean'),
+    ).reset_index()
+    span['primeira_partida'] = format_seconds(span['primeira'])
+    span['ultima_partida'] = format_seconds(span['ultima'])
+    span['operacao_horas'] = ((span['ultima'] - span['primeira']) / 3600).round(2)
+    span = span[keys + ['viagens', 'primeira_partida', 'ultima_partida', 'operacao_horas', 'headway_medio_min']]
+
+    for df in (hourly, span):
+        for col in [c for c in df.columns if c.startswith('headway_')]:
+            df[col] = df[col].round(1)
+    return hourly, span
+
+
+def with_ids(df: pd.DataFrame, timetable: Timetable, date: Optional[str]) -> pd.DataFrame:
+    """Troca os códigos internos pelos IDs do GTFS e acrescenta a data do dia de serviço"""
+    df = df.copy()
+    df['route_id'] = lookup_ids(timetable.route_ids, df['route_id'].to_numpy())
+    if 'stop_id' in df.columns:
+        df['stop_id'] = timetable.stop_ids[df['stop_id'].to_numpy()]
+    df['direction_id'] = df['direction_id'].astype('Int64').where(df['direction_id'] >= 0)
+    df.insert(0, 'data', date)
+    return df
+
+
+def service_frequency(timetable: Timetable, trip_mask: Optional[np.ndarray],
+                      date: Optional[str]) -> Dict[str, pd.DataFrame]:
+    """As quatro tabelas de frequência do dia de serviço"""
+    route_hourly, route_span = departure_frequency(departure_events(timetable, trip_mask, first_stop_only=True),
+                                                   ROUTE_KEYS)
+    stop_hourly, stop_span = departure_frequency(departure_events(timetable, trip_mask), STOP_KEYS)
+    return {
+        'frequencia_linha_hora': with_ids(route_hourly, timetable, date),
+        'frequencia_linha_resumo': with_ids(route_span, timetable, date),
+        'frequencia_parada_hora': with_ids(stop_hourly, timetable, date),
+        'frequencia_parada_resumo': with_ids(stop_span, timetable, date),
+    }
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Headways, viagens por hora e período de operação do GTFS")
+    parser.add_argument("--data",
+                        help="Dia de serviço (YYYY-MM-DD). Padrão: o dia com mais viagens no calendário")
+    parser.add_argument("--formato", choices=sorted(OUTPUT_FORMATS), default='csv',
+                        help="Formato das tabelas de frequência: csv, parquet ou ambos (padrão: csv)")
+    args = parser.parse_args()
+
+    print("=== FREQUÊNCIA DO TRANSPORTE PÚBLICO ===\n")
+
+    project_root = detect_project_root()
+    processed_dir = os.path.join(project_root, "data", "processed")
+    gtfs_dir = os.path.join(processed_dir, "gtfs")
+    started = time.perf_counter()
+    timetable = load_timetable(gtfs_dir)
+    if timetable is None:
+        print(f"[ERRO] stop_times limpo não encontrado em {gtfs_dir}")
+        return
+
+    trip_mask, date = service_trip_mask(gtfs_dir, timetable, args.data)
+    if date is None:
+        print("[AVISO] Calendário não encontrado: usando todas as viagens")
+    trips = timetable.num_trips if trip_mask is None else int(trip_mask.sum())
+    print(f"[INFO] Dia de serviço {date or '-'}: {trips} viagens")
+
+    tables = service_frequency(timetable, trip_mask, date)
+    for table, df in tables.items():
+        paths = save_processed(df, os.path.join(processed_dir, OUTPUT_FILES[table]), args.formato)
+        print(f"[SUCESSO] {', '.join(os.path.basename(p) for p in paths)} ({len(df)} registros)")
+
+    print("\n=== RESUMO ===")
+    routes = tables['frequencia_linha_resumo']
+    if len(routes):
+        busiest = routes.loc[routes['viagens'].idxmax()]
+        print(f"[INFO] {len(routes)} linhas/sentidos; mais viagens: {busiest['route_id']} ({busiest['viagens']})")
+        print(f"[INFO] Headway médio das linhas: {routes['headway_medio_min'].mean():.1f} min")
+    print(f"[INFO] Tempo total: {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Roteamento em transporte público (RAPTOR) e isócronas sobre o GTFS limpo.
+
+Responde "quais paradas dá para alcançar de ônibus, saindo deste ponto às 07:30,
+em até 30 minutos", para cada câmera do monitoramento CTTU (ou outro conjunto de
+pontos de spatial_join.POINT_DATASETS), com caminhadas entre paradas próximas.
+
+O algoritmo é o RAPTOR (Round-bAsed Public Transit Optimized Router): a rodada k
+calcula a chegada mais cedo em cada parada usando até k veículos. As viagens do
+dia (gtfs_calendar) são agrupadas em padrões (mesma sequência de paradas, sem
+ultrapassagens), e cada rodada percorre todos os padrões de uma vez com numpy:
+
+- horários de partida de cada (padrão, posição) ficam num único array ordenado,
+  com um deslocamento por posição, e uma só busca binária acha, para todas as
+  posições, a primeira viagem que ainda dá para pegar;
+- o mínimo acumulado dessas viagens ao longo de cada padrão dá a viagem em que se
+  está nas posições seguintes, e a chegada é lida direto da matriz de horários;
+- depois, caminhadas a partir das paradas melhoradas (pares a até --caminhada
+  metros, k-d tree) completam a rodada.
+
+Os horários vêm do índice de gtfs_timetable.py (timetable.npz). O lote de origens
+pode ser dividido entre processos (--jobs); cada processo monta a rede uma vez.
+
+Gera, em data/processed:
+- isocronas_paradas: paradas alcançadas por origem, com o tempo e os veículos usados;
+- isocronas_resumo: por origem, paradas alcançadas, maior distância e área (envoltória convexa).
+
+Uso (depois do clean_gtfs.py):
+    python scripts/database/gtfs_raptor.py --minutos 30 --partida 07:30 --jobs 4
+    python scripts/database/gtfs_raptor.py --data 2025-03-03 --conjuntos monitoramento_cttu semaforos
+"""
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from scipy.spatial import ConvexHull, cKDTree
+
+from generate_sql_inserts import detect_project_root
+from gtfs_timetable import Timetable, format_seconds, load_timetable, parse_time, service_trip_mask
+from processed_io import OUTPUT_FORMATS, find_processed_file, read_processed, save_processed
+from spatial_join import POINT_DATASETS, load_points, project_to_meters
+
+# Parâmetros padrão das isócronas
+DEFAULT_MINUTES = 30
+DEFAULT_DEPARTURE = "07:30"
+DEFAULT_WALK_M = 400.0
+# Velocidade de caminhada (m/s), cerca de 4,3 km/h
+WALK_SPEED = 1.2
+# Veículos usados no máximo (rodadas do RAPTOR)
+DEFAULT_ROUNDS = 4
+DEFAULT_DATASETS = ['monitoramento_cttu']
+
+# Horários ficam abaixo disso (em segundos): cada posição dos padrões ocupa uma faixa
+# própria de chaves no array ordenado de partidas
+TIME_SPAN = 1 << 20
+UNREACHED = TIME_SPAN - 1
+
+STOPS_PATH = os.path.join("gtfs", "stops_clean.csv")
+STOPS_FILE = "isocronas_paradas_clean.csv"
+SUMMARY_FILE = "isocronas_resumo_clean.csv"
+
+
+def split_fifo(departures: np.ndarray, arrivals: np.ndarray) -> List[np.ndarray]:
+    """
+    Separa as viagens de um padrão (já ordenadas pela primeira partida) em grupos em
+    que nenhuma ultrapassa a anterior em nenhuma parada. Retorna as linhas de cada grupo
+    """
+    if (np.diff(departures, axis=0) >= 0).all() and (np.diff(arrivals, axis=0) >= 0).all():
+        return [np.arange(len(departures))]
+    groups: List[List[int]] = []
+    for row in range(len(departures)):
+        for group in groups:
+            last = group[-1]
+            if (departures[row] >= departures[last]).all() and (arrivals[row] >= arrivals[last]).all():
+                group.append(row)
+                break
+        else:
+            groups.append([row])
+    return [np.asarray(group) for group in groups]
+
+
+class TransitNetwork:
+    """
+    Padrões de viagem de um dia de serviço achatados em "posições" (padrão, parada),
+    mais os pares de caminhada entre paradas. Veja o docstring do módulo
+    """
+
+    def __init__(self, timetable: Timetable, stop_xy: np.ndarray, trip_mask: Optional[np.ndarray] = None,
+                 walk_radius: float = DEFAULT_WALK_M, walk_speed: float = WALK_SPEED):
+        self.stop_ids = timetable.stop_ids
+        self.stop_xy = stop_xy
+        self.walk_radius = walk_radius
+        self.walk_speed = walk_speed
+        self._build_patterns(timetable, trip_mask)
+        self._build_transfers()
+
+    @property
+    def num_stops(self) -> int:
+        return len(self.stop_ids)
+
+    def _build_patterns(self, timetable: Timetable, trip_mask: Optional[np.ndarray]):
+        offsets = timetable.trip_offsets
+        trips = np.arange(timetable.num_trips) if trip_mask is None else np.flatnonzero(trip_mask)
+        trips = trips[offsets[trips + 1] - offsets[trips] >= 2]
+
+        # Padrão = sequência de paradas idêntica
+        patterns: Dict[bytes, List[int]] = {}
+        for trip in trips:
+            key = timetable.event_stop[offsets[trip]:offsets[trip + 1]].tobytes()
+            patterns.setdefault(key, []).append(trip)
+
+        slot_stop, slot_pattern, slot_base, slot_trips, departures, arrivals = [], [], [], [], [], []
+        base = 0
+        pattern_id = 0
+        for pattern_trips in patterns.values():
+            pattern_trips = np.asarray(pattern_trips)
+            length = offsets[pattern_trips[0] + 1] - offsets[pattern_trips[0]]
+            events = offsets[pattern_trips][:, None] + np.arange(length)
+            dep = timetable.event_departure[events]
+            arr = timetable.event_arrival[events]
+            order = np.lexsort((dep[:, -1], dep[:, 0]))
+            dep, arr, events = dep[order], arr[order], events[order]
+            stops = timetable.event_stop[events[0]]
+            for rows in split_fifo(dep, arr):
+                n = len(rows)
+                slot_stop.append(stops)
+                slot_pattern.append(np.full(length, pattern_id))
+                slot_base.append(base + np.arange(length) * n)
+                slot_trips.append(np.full(length, n))
+                # Coluna a coluna: as viagens de cada posição ficam contíguas
+                departures.append(dep[rows].T.ravel())
+                arrivals.append(arr[rows].T.ravel())
+                base += length * n
+                pattern_id += 1
+
+        def concat(parts, dtype):
+            return np.concatenate(parts).astype(dtype) if parts else np.empty(0, dtype=dtype)
+
+        self.num_patterns = pattern_id
+        self.slot_stop = concat(slot_stop, np.int64)
+        self.slot_pattern = concat(slot_pattern, np.int64)
+        self.slot_base = concat(slot_base, np.int64)
+        self.slot_trips = concat(slot_trips, np.int64)
+        self.arrivals = concat(arrivals, np.int64)
+        # Chave de busca: partida + faixa da posição, crescente no array inteiro
+        slot_of_entry = np.repeat(np.arange(len(self.slot_stop)), self.slot_trips)
+        self.slot_offset = np.arange(len(self.slot_stop), dtype=np.int64) * TIME_SPAN
+        self.departure_keys = concat(departures, np.int64) + self.slot_offset[slot_of_entry]
+        self.pattern_start = np.r_[True, self.slot_pattern[1:] != self.slot_pattern[:-1]] \
+            if len(self.slot_pattern) else np.empty(0, dtype=bool)
+        # Separa os padrões no mínimo acumulado (veja _scan_patterns)
+        self.max_trips = int(self.slot_trips.max()) + 1 if len(self.slot_trips) else 1
+
+    def _build_transfers(self):
+        """Pares de caminhada (nos dois sentidos) entre paradas a até walk_radius metros"""
+        located = np.flatnonzero(~np.isnan(self.stop_xy).any(axis=1))
+        pairs = (cKDTree(self.stop_xy[located]).query_pairs(self.walk_radius, output_type='ndarray')
+                 if len(located) > 1 else np.empty((0, 2), dtype=np.int64))
+        source = np.concatenate([located[pairs[:, 0]], located[pairs[:, 1]]])
+        target = np.concatenate([located[pairs[:, 1]], located[pairs[:, 0]]])
+        order = np.argsort(source, kind='stable')
+        self.transfer_source = source[order]
+        self.transfer_target = target[order]
+        distance = np.hypot(*(self.stop_xy[self.transfer_source] - self.stop_xy[self.transfer_target]).T)
+        self.transfer_seconds = np.ceil(distance / self.walk_speed).astype(np.int64)
+        self.transfer_offsets = np.searchsorted(self.transfer_source, np.arange(self.num_stops + 1))
+        self._located = located
+        self._tree = cKDTree(self.stop_xy[located]) if len(located) else None
+
+    def access(self, xy: np.ndarray, departure: int) -> np.ndarray:
+        """Chegada a pé às paradas a até walk_radius metros de um ponto (UNREACHED nas demais)"""
+        arrival = np.full(self.num_stops, UNREACHED, dtype=np.int64)
+        if self._tree is None:
+            return arrival
+        nearby = np.asarray(self._tree.query_ball_point(xy, self.walk_radius), dtype=np.int64)
+        stops = self._located[nearby]
+        distance = np.hypot(*(self.stop_xy[stops] - xy).T)
+        arrival[stops] = departure + np.ceil(distance / self.walk_speed).astype(np.int64)
+        return arrival
+
+    def _scan_patterns(self, ready: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Chegadas por veículo a partir das paradas prontas em ready. Retorna (paradas, chegadas)"""
+        slot_ready = np.minimum(ready[self.slot_stop], UNREACHED)
+        # Primeira viagem de cada posição que parte depois de ready (slot_trips = nenhuma)
+        board = np.searchsorted(self.departure_keys, slot_ready + self.slot_offset) - self.slot_base
+        # Mínimo acumulado por padrão: deslocamentos decrescentes isolam cada padrão
+        shift = self.slot_pattern * self.max_trips
+        riding = np.minimum.accumulate(board - shift) + shift
+        # Na posição i, a viagem é a embarcada em alguma posição anterior
+        riding = np.r_[0, riding[:-1]]
+        riding[self.pattern_start] = self.slot_trips[self.pattern_start]
+        valid = riding < self.slot_trips
+        return self.slot_stop[valid], self.arrivals[self.slot_base[valid] + riding[valid]]
+
+    def _walk(self, arrival: np.ndarray, sources: np.ndarray) -> np.ndarray:
+        """Chegadas a pé a partir de arrival nas paradas sources (UNREACHED nas demais paradas)"""
+        walked = np.full(self.num_stops, UNREACHED, dtype=np.int64)
+        starts, ends = self.transfer_offsets[sources], self.transfer_offsets[sources + 1]
+        counts = ends - starts
+        if counts.sum() == 0:
+            return walked
+        edges = np.repeat(starts - np.cumsum(np.r_[0, counts[:-1]]), counts) + np.arange(counts.sum())
+        np.minimum.at(walked, self.transfer_target[edges], arrival[self.transfer_source[edges]]
+                      + self.transfer_seconds[edges])
+        return walked
+
+    def earliest_arrival(self, initial: np.ndarray, max_rounds: int = DEFAULT_ROUNDS,
+                         limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Chegada mais cedo em cada parada a partir das chegadas iniciais (a pé), com até
+        max_rounds veículos. Retorna (chegadas, veículos usados); UNREACHED e -1 nas não
+        alcançadas. Com limit, chegadas depois dele são descartadas
+        """
+        limit = UNREACHED if limit is None else min(limit, UNREACHED)
+        best = np.where(initial <= limit, initial, UNREACHED)
+        rounds = np.where(best < UNREACHED, 0, -1)
+        # Chegada mais cedo descendo de um veículo: as caminhadas partem dela, mesmo
+        # quando a parada já foi alcançada antes a pé
+        ride = np.full(self.num_stops, UNREACHED, dtype=np.int64)
+        ready = best
+        for k in range(1, max_rounds + 1):
+            stops, arrivals = self._scan_patterns(ready)
+            arrivals = np.where(arrivals <= limit, arrivals, UNREACHED)
+            riding = ride.copy()
+            np.minimum.at(riding, stops, arrivals)
+            improved = np.flatnonzero(riding < ride)
+            if len(improved) == 0:
+                break
+            ride = riding
+            arrival = np.minimum(best, ride)
+            walked = self._walk(ride, improved)
+            arrival = np.minimum(arrival, np.where(walked <= limit, walked, UNREACHED))
+            changed = arrival < best
+            rounds[changed] = k
+            best = arrival
+            # Só as paradas melhoradas nesta rodada podem gerar embarques melhores na próxima
+            ready = np.where(changed, best, UNREACHED)
+        return best, rounds
+
+
+def stop_coordinates(processed_dir: str, timetable: Timetable, lat0: Optional[float] = None
+                     ) -> Tuple[np.ndarray, float]:
+    """Coordenadas em metros das paradas do índice (NaN sem coordenadas) e a latitude de referência"""
+    xy = np.full((timetable.num_stops, 2), np.nan)
+    path = find_processed_file(processed_dir, STOPS_PATH)
+    if not path:
+        return xy, lat0 if lat0 is not None else 0.0
+    stops = read_processed(path, ['stop_id', 'stop_lat', 'stop_lon'])
+    lat = pd.to_numeric(stops['stop_lat'], errors='coerce').to_numpy()
+    lon = pd.to_numeric(stops['stop_lon'], errors='coerce').to_numpy()
+    if lat0 is None:
+        lat0 = float(np.nanmean(lat)) if np.isfinite(lat).any() else 0.0
+    rows = timetable.stop_indexer(stops['stop_id'])
+    found = rows >= 0
+    xy[rows[found]] = project_to_meters(lat[found], lon[found], lat0)
+    return xy, lat0
+
+
+def build_network(project_root: str, date: Optional[str], walk_radius: float,
+                  verbose: bool = True) -> Tuple[Optional[TransitNetwork], Optional[str], float]:
+    """Rede do dia de serviço a partir do índice de horários. Retorna (rede, data usada, lat0)"""
+    processed_dir = os.path.join(project_root, "data", "processed")
+    gtfs_dir = os.path.join(processed_dir, "gtfs")
+    timetable = load_timetable(gtfs_dir, verbose=verbose)
+    if timetable is None:
+        return None, None, 0.0
+    trip_mask, date = service_trip_mask(gtfs_dir, timetable, date)
+    stop_xy, lat0 = stop_coordinates(processed_dir, timetable)
+    return TransitNetwork(timetable, stop_xy, trip_mask, walk_radius), date, lat0
+
+
+def isochrones(network: TransitNetwork, origins: pd.DataFrame, departure: int, minutes: float,
+               max_rounds: int = DEFAULT_ROUNDS) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Isócronas de cada origem (colunas conjunto, ponto_id, x, y). Retorna (paradas, resumo)"""
+    limit = departure + int(minutes * 60)
+    reached_frames, summary = [], []
+    for origin in origins.itertuples(index=False):
+        xy = np.array([origin.x, origin.y])
+        initial = network.access(xy, departure)
+        arrival, rounds = network.earliest_arrival(initial, max_rounds, limit)
+        reached = np.flatnonzero(arrival < UNREACHED)
+        reached_frames.append(pd.DataFrame({
+            'conjunto': origin.conjunto,
+            'ponto_id': origin.ponto_id,
+            'stop_id': network.stop_ids[reached],
+            'minutos': ((arrival[reached] - departure) / 60).round(1),
+            'veiculos': rounds[reached],
+        }))
+
+        points = network.stop_xy[reached]
+        distance = np.hypot(*(points - xy).T) if len(reached) else np.empty(0)
+        try:
+            area = ConvexHull(np.vstack([points, xy])).volume / 1e6 if len(reached) >= 2 else 0.0
+        except Exception:
+            # pontos colineares
+            area = 0.0
+        summary.append({
+            'conjunto': origin.conjunto,
+            'ponto_id': origin.ponto_id,
+            'paradas_acesso': int((rounds == 0).sum()),
+            'paradas_alcancadas': len(reached),
+            'distancia_max_m': round(float(distance.max()), 2) if len(distance) else 0.0,
+            'area_km2': round(area, 3),
+        })
+
+    columns = ['conjunto', 'ponto_id', 'stop_id', 'minutos', 'veiculos']
+    reached = pd.concat(reached_frames, ignore_index=True) if reached_frames else pd.DataFrame(columns=columns)
+    return reached, pd.DataFrame(summary)
+
+
+# Rede de cada processo do pool, montada uma vez no initializer
+_worker_network: Optional[TransitNetwork] = None
+
+
+def _init_worker(project_root: str, date: Optional[str], walk_radius: float):
+    global _worker_network
+    _worker_network, _, _ = build_network(project_root, date, walk_radius, verbose=False)
+
+
+def _isochrones_job(job: Tuple[pd.DataFrame, int, float, int]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    origins, departure, minutes, max_rounds = job
+    return isochrones(_worker_network, origins, departure, minutes, max_rounds)
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Isócronas de transporte público (RAPTOR) a partir de câmeras e sensores")
+    parser.add_argument("--minutos", type=float, default=DEFAULT_MINUTES,
+                        help=f"Tempo máximo de viagem, com caminhadas (padrão: {DEFAULT_MINUTES})")
+    parser.add_argument("--partida", default=DEFAULT_DEPARTURE,
+                        help=f"Horário de saída, HH:MM ou HH:MM:SS (padrão: {DEFAULT_DEPARTURE})")
+    parser.add_argument("--data",
+                        help="Dia de serviço (YYYY-MM-DD). Padrão: o dia com mais viagens no calendário")
+    parser.add_argument("--conjuntos", nargs="+", default=DEFAULT_DATASETS, choices=sorted(POINT_DATASETS),
+                        help=f"Conjuntos de pontos usados como origem (padrão: {' '.join(DEFAULT_DATASETS)})")
+    parser.add_argument("--caminhada", type=float, default=DEFAULT_WALK_M,
+                        help=f"Distância máxima a pé (metros) até uma parada e entre paradas (padrão: {DEFAULT_WALK_M:g})")
+    parser.add_argument("--veiculos", type=int, default=DEFAULT_ROUNDS,
+                        help=f"Número máximo de veículos por trajeto (padrão: {DEFAULT_ROUNDS})")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Processos usados para calcular as isócronas (padrão: 1)")
+    parser.add_argument("--formato", choices=sorted(OUTPUT_FORMATS), default='csv',
+                        help="Formato das tabelas de isócronas: csv, parquet ou ambos (padrão: csv)")
+    args = parser.parse_args()
+
+    print("=== ISÓCRONAS DE TRANSPORTE PÚBLICO ===\n")
+
+    try:
+        departure = parse_time(args.partida)
+    except ValueError as e:
+        print(f"[ERRO] {e}")
+        return
+
+    project_root = detect_project_root()
+    processed_dir = os.path.join(project_root, "data", "processed")
+    # Também garante o timetable.npz atualizado antes de os processos o lerem
+    network, date, lat0 = build_network(project_root, args.data, args.caminhada)
+    if network is None:
+        print(f"[ERRO] stop_times limpo não encontrado em {os.path.join(processed_dir, 'gtfs')}")
+        return
+    print(f"[OK] Rede{' de ' + date if date else ''}: {network.num_stops} paradas, {network.num_patterns} padrões, "
+          f"{len(network.transfer_source)} caminhadas entre paradas")
+
+    points = load_points(processed_dir, args.conjuntos)
+    if points.empty:
+        print("[AVISO] Nenhuma origem com coordenadas")
+        return
+    xy = project_to_meters(points['lat'].to_numpy(), points['lon'].to_numpy(), lat0)
+    origins = points.assign(x=xy[:, 0], y=xy[:, 1])[['conjunto', 'ponto_id', 'x', 'y']]
+
+    jobs = max(1, min(args.jobs, len(origins)))
+    print(f"[INFO] {len(origins)} origens, saída às {format_seconds([departure])[0]}, "
+          f"até {args.minutos:g} min{f', {jobs} processos' if jobs > 1 else ''}")
+    if jobs > 1:
+        chunks = [(origins.iloc[rows], departure, args.minutos, args.veiculos)
+                  for rows in np.array_split(np.arange(len(origins)), jobs * 4) if len(rows)]
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(project_root, date, args.caminhada)) as pool:
+            results = list(pool.map(_isochrones_job, chunks))
+        reached = pd.concat([r for r, _ in results], ignore_index=True)
+        summary = pd.concat([s for _, s in results], ignore_index=True)
+    else:
+        reached, summary = isochrones(network, origins, departure, args.minutos, args.veiculos)
+
+    # Parâmetros da consulta nas duas tabelas: fazem parte da chave natural, então
+    # outro dia, horário ou limite não sobrescreve a carga anterior
+    for df in (reached, summary):
+        df.insert(2, 'data', date)
+        df.insert(3, 'partida', format_seconds([departure])[0])
+        df.insert(4, 'minutos_limite', args.minutos)
+
+    for filename, df in [(STOPS_FILE, reached), (SUMMARY_FILE, summary)]:
+        paths = save_processed(df, os.path.join(processed_dir, filename), args.formato)
+        print(f"[SUCESSO] {', '.join(os.path.basename(p) for p in paths)} ({len(df)} registros)")
+
+    print("\n=== RESUMO ===")
+    print(f"[INFO] Paradas alcançadas por origem: média {summary['paradas_alcancadas'].mean():.1f}, "
+          f"máximo {summary['paradas_alcancadas'].max()}")
+    print(f"[INFO] Área média (envoltória convexa): {summary['area_km2'].mean():.2f} km²")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Geometrias dos traçados do GTFS (shapes): distância percorrida e simplificação.
+
+shapes limpo tem um ponto por linha. Aqui os pontos, ordenados por
+(shape_id, shape_pt_sequence), viram arrays contíguos com offsets por traçado
+(shape_offsets), e tudo é calculado de uma vez para o feed inteiro com numpy:
+
+- cumulative_distance: distância acumulada (haversine, em metros) ao longo de cada
+  traçado, usada pelo clean_gtfs.py para preencher shape_dist_traveled quando o
+  feed não a traz;
+- simplify_mask: simplificação de Douglas–Peucker, processando em cada iteração os
+  trechos pendentes de todos os traçados juntos.
+
+Gera data/processed/gtfs/shape_geometries_clean.csv (tabela gtfs_shape_geometries),
+com uma LineString (WKT) por traçado e tolerância: a completa (tolerancia_m = 0) e as
+simplificadas. Os mapas do Grafana podem ler a tolerância adequada ao zoom e
+carregar só uma fração dos vértices. No banco, a coluna geom (PostGIS) é gerada a
+partir do WKT.
+
+Uso (depois do clean_gtfs.py):
+    python scripts/database/gtfs_shapes.py
+    python scripts/database/gtfs_shapes.py --tolerancias 5 20 50
+"""
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+
+from generate_sql_inserts import detect_project_root
+from processed_io import OUTPUT_FORMATS, find_processed_file, read_processed, save_processed
+from spatial_join import EARTH_RADIUS_M, point_segment_distance, project_to_meters
+
+# Tolerâncias padrão (metros) das geometrias simplificadas; 0 = geometria completa
+DEFAULT_TOLERANCES = [5.0, 20.0, 50.0]
+
+# Casas decimais das coordenadas no WKT (~10 cm)
+COORD_DECIMALS = 6
+
+SHAPES_FILE = "shapes_clean.csv"
+GEOMETRIES_FILE = "shape_geometries_clean.csv"
+
+
+def haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Distância em metros entre pares de pontos (graus), vetorizada"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def sort_shapes(shapes: pd.DataFrame) -> pd.DataFrame:
+    """Pontos com coordenadas, ordenados por (shape_id, shape_pt_sequence)"""
+    shapes = shapes.dropna(subset=['shape_id', 'shape_pt_lat', 'shape_pt_lon'])
+    return shapes.sort_values(['shape_id', 'shape_pt_sequence'], kind='stable')
+
+
+def shape_offsets(shape_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Traçados distintos (na ordem) e offsets dos seus pontos, com shape_ids já agrupado"""
+    if len(shape_ids) == 0:
+        return np.empty(0, dtype=object), np.zeros(1, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, shape_ids[1:] != shape_ids[:-1]])
+    return shape_ids[starts], np.r_[starts, len(shape_ids)].astype(np.int64)
+
+
+def cumulative_distance(offsets: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Distância acumulada (metros) desde o primeiro ponto de cada traçado"""
+    step = np.r_[0.0, haversine_m(lat[:-1], lon[:-1], lat[1:], lon[1:])] if len(lat) else np.empty(0)
+    # O primeiro ponto de cada traçado não soma a distância desde o traçado anterior
+    step[offsets[:-1]] = 0.0
+    total = np.cumsum(step)
+    return total - np.repeat(total[offsets[:-1]], np.diff(offsets))
+
+
+def simplify_mask(xy: np.ndarray, offsets: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Pontos mantidos pela simplificação de Douglas–Peucker (xy em metros). Cada iteração
+    divide, em todos os traçados ao mesmo tempo, os trechos cujo ponto mais distante
+    da corda passa da tolerância
+    """
+    keep = np.zeros(len(xy), dtype=bool)
+    lengths = np.diff(offsets)
+    keep[offsets[:-1][lengths > 0]] = True
+    keep[offsets[1:][lengths > 0] - 1] = True
+
+    starts, ends = offsets[:-1][lengths > 2], offsets[1:][lengths > 2] - 1
+    while len(starts):
+        # Pontos internos de cada trecho, trecho a trecho
+        counts = ends - starts - 1
+        first = np.cumsum(np.r_[0, counts[:-1]])
+        inner = np.repeat(starts + 1 - first, counts) + np.arange(counts.sum())
+        piece = np.repeat(np.arange(len(starts)), counts)
+        dist = point_segment_distance(xy[inner], xy[starts[piece]], xy[ends[piece]])
+
+        # Ponto mais distante de cada trecho (o primeiro, em caso de empate)
+        peak = np.maximum.reduceat(dist, first)
+        at_peak = np.flatnonzero(dist == peak[piece])
+        farthest = at_peak[np.r_[True, piece[at_peak[1:]] != piece[at_peak[:-1]]]]
+        split = peak > tolerance
+        middle = inner[farthest[split]]
+        keep[middle] = True
+
+        starts = np.r_[starts[split], middle]
+        ends = np.r_[middle, ends[split]]
+        pending = ends - starts > 1
+        starts, ends = starts[pending], ends[pending]
+    return keep
+
+
+def linestrings(shape_ids: np.ndarray, offsets: np.ndarray, lat: np.ndarray, lon: np.ndarray,
+                keep: np.ndarray) -> pd.DataFrame:
+    """WKT LINESTRING(lon lat, ...) de cada traçado com os pontos mantidos"""
+    owner = np.repeat(np.arange(len(shape_ids)), np.diff(offsets))[keep]
+    coords = (pd.Series(lon[keep]).round(COORD_DECIMALS).astype(str) + ' '
+              + pd.Series(lat[keep]).round(COORD_DECIMALS).astype(str))
+    wkt = coords.groupby(owner, sort=True).agg(','.join)
+    counts = np.bincount(owner, minlength=len(shape_ids))
+    return pd.DataFrame({
+        'shape_id': shape_ids[wkt.index.to_numpy()],
+        'pontos': counts[wkt.index.to_numpy()],
+        'geometria': 'LINESTRING(' + wkt.to_numpy() + ')',
+    })
+
+
+def shape_geometries(shapes: pd.DataFrame, tolerances: List[float]) -> pd.DataFrame:
+    """Tabela shape_geometries: geometria completa e simplificadas de cada traçado"""
+    shapes = sort_shapes(shapes)
+    ids = shapes['shape_id'].astype(str).to_numpy()
+    lat = shapes['shape_pt_lat'].to_numpy(dtype=float)
+    lon = shapes['shape_pt_lon'].to_numpy(dtype=float)
+    shape_ids, offsets = shape_offsets(ids)
+
+    length = cumulative_distance(offsets, lat, lon)[offsets[1:] - 1] if len(ids) else np.empty(0)
+    xy = project_to_meters(lat, lon, float(lat.mean())) if len(ids) else np.empty((0, 2))
+    # Traçados com um único ponto não formam LineString
+    valid = np.diff(offsets) >= 2
+
+    frames = []
+    for tolerance in [0.0] + sorted(t for t in tolerances if t > 0):
+        keep = np.ones(len(ids), dtype=bool) if tolerance == 0 else simplify_mask(xy, offsets, tolerance)
+        keep &= np.repeat(valid, np.diff(offsets))
+        geometries = linestrings(shape_ids, offsets, lat, lon, keep)
+        geometries.insert(1, 'tolerancia_m', tolerance)
+        frames.append(geometries)
+
+    result = pd.concat(frames, ignore_index=True)
+    lengths = pd.Series(length, index=shape_ids).round(2)
+    result['comprimento_m'] = lengths.loc[result['shape_id']].to_numpy()
+    return result[['shape_id', 'tolerancia_m', 'pontos', 'comprimento_m', 'geometria']]
+
+
+def fill_shape_distances(shapes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Preenche shape_dist_traveled (metros) dos traçados que não trazem nenhum valor.
+    Traçados com alguma distância informada pelo feed ficam como estão (a unidade é do feed)
+    """
+    if 'shape_dist_traveled' in shapes.columns:
+        informed = shapes['shape_dist_traveled'].notna().groupby(shapes['shape_id']).transform('any')
+        target = ~informed
+    else:
+        shapes['shape_dist_traveled'] = np.nan
+        target = pd.Series(True, index=shapes.index)
+    if not target.any():
+        return shapes
+
+    ordered = sort_shapes(shapes[target])
+    _, offsets = shape_offsets(ordered['shape_id'].astype(str).to_numpy())
+    distance = cumulative_distance(offsets, ordered['shape_pt_lat'].to_numpy(dtype=float),
+                                   ordered['shape_pt_lon'].to_numpy(dtype=float))
+    shapes.loc[ordered.index, 'shape_dist_traveled'] = distance.round(2)
+    return shapes
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Gera as geometrias completas e simplificadas dos traçados GTFS")
+    parser.add_argument("--tolerancias", type=float, nargs="+", default=DEFAULT_TOLERANCES,
+                        help=f"Tolerâncias (metros) da simplificação (padrão: {' '.join(f'{t:g}' for t in DEFAULT_TOLERANCES)})")
+    parser.add_argument("--formato", choices=sorted(OUTPUT_FORMATS), default='csv',
+                        help="Formato da tabela shape_geometries: csv, parquet ou ambos (padrão: csv)")
+    args = parser.parse_args()
+
+    print("=== GEOMETRIAS DOS TRAÇADOS GTFS ===\n")
+
+    project_root = detect_project_root()
+    gtfs_dir = os.path.join(project_root, "data", "processed", "gtfs")
+    path = find_processed_file(gtfs_dir, SHAPES_FILE)
+    if not path:
+        print(f"[ERRO] {SHAPES_FILE} não encontrado em {gtfs_dir}")
+        return
+
+    shapes = read_processed(path, ['shape_id', 'shape_pt_lat', 'shape_pt_lon', 'shape_pt_sequence'])
+    print(f"[OK] {os.path.basename(path)}: {len(shapes)} pontos")
+    geometries = shape_geometries(shapes, args.tolerancias)
+
+    paths = save_processed(geometries, os.path.join(gtfs_dir, GEOMETRIES_FILE), args.formato)
+    print(f"[SUCESSO] {', '.join(os.path.basename(p) for p in paths)} ({len(geometries)} registros)")
+
+    print("\n=== RESUMO ===")
+    full = geometries.loc[geometries['tolerancia_m'] == 0, 'pontos'].sum()
+    for tolerance, group in geometries.groupby('tolerancia_m'):
+        share = group['pontos'].sum() / full * 100 if full else 0.0
+        print(f"[INFO] Tolerância {tolerance:g} m: {group['pontos'].sum()} vértices ({share:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Quadro de horários do GTFS indexado em memória.
+
+stop_times limpo é uma lista plana: "próximas partidas na parada X depois das
+17:30" ou "sequência de paradas da viagem T" exigem varrer ou ordenar milhões
+de linhas. Aqui os horários viram arrays numpy em formato CSR (offsets + valores):
+
+- IDs de parada, viagem, linha e serviço são internados como inteiros;
+- eventos (uma passagem de uma viagem por uma parada) ordenados por
+  (viagem, stop_sequence), com trip_offsets[t]:trip_offsets[t+1] delimitando a viagem t;
+- índice por parada com os eventos ordenados por (parada, partida), com
+  stop_offsets[s]:stop_offsets[s+1] delimitando a parada s.
+
+Consultas são fatias e buscas binárias (np.searchsorted) nesses arrays. O índice
+é gravado em data/processed/gtfs/timetable.npz e só é reconstruído quando
+stop_times ou trips mudam (hashes das entradas guardados junto dos arrays).
+
+Uso (depois do clean_gtfs.py):
+    python scripts/database/gtfs_timetable.py
+    python scripts/database/gtfs_timetable.py --parada 1234 --apos 17:30 --data 2025-03-03
+    python scripts/database/gtfs_timetable.py --viagem T1
+"""
+
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple
+
+from clean_gtfs import normalize_time_column
+from generate_sql_inserts import detect_project_root
+from gtfs_calendar import ServiceCalendar, load_calendar
+from manifest import describe_inputs
+from processed_io import find_processed_file, read_processed
+
+# Índice gravado ao lado das tabelas GTFS limpas
+TIMETABLE_FILE = "timetable.npz"
+
+# Versão do formato: incrementar quando os arrays mudarem, para forçar a reconstrução
+TIMETABLE_VERSION = "1"
+
+STOP_TIMES_COLUMNS = ['trip_id', 'stop_id', 'stop_sequence', 'arrival_time', 'departure_time',
+                      'arrival_time_seconds', 'departure_time_seconds']
+TRIPS_COLUMNS = ['trip_id', 'route_id', 'service_id', 'direction_id']
+
+# Arrays persistidos (além da versão e das entradas)
+ARRAYS = ['stop_ids', 'trip_ids', 'route_ids', 'service_ids',
+          'trip_route', 'trip_service', 'trip_direction', 'trip_offsets',
+          'event_stop', 'event_sequence', 'event_arrival', 'event_departure',
+          'stop_offsets', 'stop_events', 'stop_departures']
+
+
+def time_seconds(stop_times: pd.DataFrame, col: str) -> np.ndarray:
+    """Segundos desde o início do dia de serviço (float, NaN sem horário)"""
+    seconds_col = f'{col}_seconds'
+    if seconds_col in stop_times.columns:
+        seconds = stop_times[seconds_col]
+    elif col in stop_times.columns:
+        # arquivos limpos antes das colunas *_seconds
+        seconds = normalize_time_column(stop_times[col])[1]
+    else:
+        return np.full(len(stop_times), np.nan)
+    return pd.to_numeric(seconds, errors='coerce').to_numpy(dtype=float)
+
+
+def parse_time(value: str) -> int:
+    """HH:MM ou HH:MM:SS (horas >= 24 aceitas) em segundos"""
+    seconds = normalize_time_column(pd.Series([value]))[1].iloc[0]
+    if pd.isna(seconds):
+        raise ValueError(f"horário inválido: {value}")
+    return int(seconds)
+
+
+def format_seconds(seconds) -> np.ndarray:
+    """Segundos em HH:MM:SS (horas >= 24 preservadas)"""
+    # Os horários se repetem muito: formata cada valor distinto uma vez
+    values, inverse = np.unique(np.asarray(seconds, dtype=np.int64), return_inverse=True)
+    hh = pd.Series(values // 3600).astype(str).str.zfill(2)
+    mm = pd.Series(values // 60 % 60).astype(str).str.zfill(2)
+    ss = pd.Series(values % 60).astype(str).str.zfill(2)
+    return (hh + ':' + mm + ':' + ss).to_numpy()[inverse.reshape(-1)]
+
+
+def lookup_ids(ids: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """IDs originais dos códigos internados (texto vazio para -1)"""
+    result = np.full(len(codes), '', dtype=object)
+    valid = codes >= 0
+    result[valid] = ids[codes[valid]]
+    return result
+
+
+def interpolate_within_groups(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """
+    Preenche NaN por interpolação linear entre os vizinhos conhecidos do mesmo grupo
+    (linhas já ordenadas por grupo). Pontas sem vizinho dos dois lados continuam NaN
+    """
+    known = ~np.isnan(values)
+    if known.all() or not known.any():
+        return values
+    position = np.arange(len(values))
+    previous = np.maximum.accumulate(np.where(known, position, -1))
+    following = np.minimum.accumulate(np.where(known, position, len(values))[::-1])[::-1]
+    fill = ~known & (previous >= 0) & (following < len(values))
+    prev_i, next_i = previous[fill], following[fill]
+    fill[fill] = (groups[prev_i] == groups[position[fill]]) & (groups[next_i] == groups[position[fill]])
+    prev_i, next_i = previous[fill], following[fill]
+    result = values.copy()
+    weight = (position[fill] - prev_i) / (next_i - prev_i)
+    result[fill] = values[prev_i] + (values[next_i] - values[prev_i]) * weight
+    return result
+
+
+class Timetable:
+    """Horários do feed em arrays CSR (veja o docstring do módulo)"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], inputs: Optional[Dict] = None):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.inputs = inputs or {}
+        self._stops = pd.Index(self.stop_ids)
+        self._trips = pd.Index(self.trip_ids)
+
+    @property
+    def num_stops(self) -> int:
+        return len(self.stop_ids)
+
+    @property
+    def num_trips(self) -> int:
+        return len(self.trip_ids)
+
+    @property
+    def num_events(self) -> int:
+        return len(self.event_stop)
+
+    @classmethod
+    def from_frames(cls, stop_times: pd.DataFrame, trips: Optional[pd.DataFrame] = None) -> 'Timetable':
+        """Constrói o índice a partir de stop_times e trips limpos"""
+        stop_times = stop_times.dropna(subset=['trip_id', 'stop_id'])
+        arrival = time_seconds(stop_times, 'arrival_time')
+        departure = time_seconds(stop_times, 'departure_time')
+        # Sem um dos horários, vale o outro (paradas sem tempo de espera)
+        arrival = np.where(np.isnan(arrival), departure, arrival)
+        departure = np.where(np.isnan(departure), arrival, departure)
+
+        trip_codes, trip_ids = pd.factorize(stop_times['trip_id'].astype(str), sort=True)
+        stop_codes, stop_ids = pd.factorize(stop_times['stop_id'].astype(str), sort=True)
+        sequence = pd.to_numeric(stop_times['stop_sequence'], errors='coerce').fillna(-1).to_numpy(np.int64)
+
+        # Eventos por (viagem, stop_sequence)
+        order = np.lexsort((sequence, trip_codes))
+        trip_codes, stop_codes, sequence = trip_codes[order], stop_codes[order], sequence[order]
+        # Paradas sem horário (fora dos pontos de controle) são interpoladas dentro da viagem
+        arrival = interpolate_within_groups(arrival[order], trip_codes)
+        departure = interpolate_within_groups(departure[order], trip_codes)
+        timed = ~(np.isnan(arrival) | np.isnan(departure))
+        trip_codes, stop_codes, sequence = trip_codes[timed], stop_codes[timed], sequence[timed]
+        arrival, departure = arrival[timed].astype(np.int32), departure[timed].astype(np.int32)
+
+        num_trips, num_stops = len(trip_ids), len(stop_ids)
+        trip_offsets = np.zeros(num_trips + 1, dtype=np.int64)
+        np.cumsum(np.bincount(trip_codes, minlength=num_trips), out=trip_offsets[1:])
+
+        # Índice por (parada, partida): posições dentro dos arrays de eventos
+        stop_events = np.lexsort((departure, stop_codes))
+        stop_offsets = np.zeros(num_stops + 1, dtype=np.int64)
+        np.cumsum(np.bincount(stop_codes, minlength=num_stops), out=stop_offsets[1:])
+
+        # Atributos das viagens (linha, serviço, sentido), -1 quando ausentes em trips
+        trip_route = np.full(num_trips, -1, dtype=np.int32)
+        trip_service = np.full(num_trips, -1, dtype=np.int32)
+        trip_direction = np.full(num_trips, -1, dtype=np.int8)
+        route_ids = service_ids = np.empty(0, dtype=str)
+        if trips is not None and len(trips):
+            trips = trips.dropna(subset=['trip_id'])
+            rows = pd.Index(trips['trip_id'].astype(str)).get_indexer(trip_ids)
+            found = rows >= 0
+            for col, target in (('route_id', trip_route), ('service_id', trip_service)):
+                if col not in trips.columns:
+                    continue
+                values = trips[col].astype(str).where(trips[col].notna())
+                codes, uniques = pd.factorize(values, sort=True)
+                target[found] = codes[rows[found]]
+                if col == 'route_id':
+                    route_ids = np.asarray(uniques, dtype=str)
+                else:
+                    service_ids = np.asarray(uniques, dtype=str)
+            if 'direction_id' in trips.columns:
+                direction = pd.to_numeric(trips['direction_id'], errors='coerce').fillna(-1).to_numpy()
+                trip_direction[found] = direction[rows[found]]
+
+        arrays = {
+            'stop_ids': np.asarray(stop_ids, dtype=str),
+            'trip_ids': np.asarray(trip_ids, dtype=str),
+            'route_ids': route_ids,
+            'service_ids': service_ids,
+            'trip_route': trip_route,
+            'trip_service': trip_service,
+            'trip_direction': trip_direction,
+            'trip_offsets': trip_offsets,
+            'event_stop': stop_codes.astype(np.int32),
+            'event_sequence': sequence.astype(np.int32),
+            'event_arrival': arrival,
+            'event_departure': departure,
+            'stop_offsets': stop_offsets,
+            'stop_events': stop_events.astype(np.int64),
+            'stop_departures': departure[stop_events],
+        }
+        return cls(arrays)
+
+    def save(self, path: str):
+        """Grava os arrays (sem compressão, para a leitura ser rápida) de forma atômica"""
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez(f, versao=np.array(TIMETABLE_VERSION),
+                     entradas=np.array(json.dumps(self.inputs, sort_keys=True)),
+                     **{name: getattr(self, name) for name in ARRAYS})
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['Timetable']:
+        """Lê um índice gravado (None se for de outra versão do formato)"""
+        with np.load(path, allow_pickle=False) as data:
+            if str(data['versao']) != TIMETABLE_VERSION:
+                return None
+            return cls({name: data[name] for name in ARRAYS}, json.loads(str(data['entradas'])))
+
+    def stop_index(self, stop_id) -> int:
+        """Índice interno da parada (-1 se não tiver horários)"""
+        return int(self._stops.get_indexer([str(stop_id)])[0])
+
+    def trip_index(self, trip_id) -> int:
+        """Índice interno da viagem (-1 se não tiver horários)"""
+        return int(self._trips.get_indexer([str(trip_id)])[0])
+
+    def stop_indexer(self, stop_ids) -> np.ndarray:
+        """Índices internos de várias paradas (-1 para as desconhecidas)"""
+        return self._stops.get_indexer(pd.Index(stop_ids).astype(str))
+
+    def trip_mask(self, calendar: ServiceCalendar, date) -> np.ndarray:
+        """Viagens (por índice interno) cujo serviço opera na data"""
+        return calendar.is_active(lookup_ids(self.service_ids, self.trip_service), date)
+
+    def departure_events(self, stop: int, after: int, until: Optional[int] = None,
+                         trip_mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Eventos com partida da parada (índice interno) em [after, until], em ordem de partida"""
+        lo, hi = self.stop_offsets[stop], self.stop_offsets[stop + 1]
+        times = self.stop_departures[lo:hi]
+        start = np.searchsorted(times, after, side='left')
+        end = np.searchsorted(times, until, side='right') if until is not None else len(times)
+        events = self.stop_events[lo + start:lo + end]
+        if trip_mask is not None:
+            events = events[trip_mask[self.event_trip(events)]]
+        return events
+
+    def event_trip(self, events: np.ndarray) -> np.ndarray:
+        """Viagem (índice interno) de cada evento"""
+        return np.searchsorted(self.trip_offsets, events, side='right') - 1
+
+    def next_departures(self, stop_id, after: int, limit: Optional[int] = 10, until: Optional[int] = None,
+                        trip_mask: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Próximas partidas da parada a partir de after (segundos), opcionalmente só das viagens em trip_mask"""
+        stop = self.stop_index(stop_id)
+        events = (self.departure_events(stop, after, until, trip_mask) if stop >= 0
+                  else np.empty(0, dtype=np.int64))
+        if limit is not None:
+            events = events[:limit]
+        return self._events_frame(events)
+
+    def trip_stops(self, trip_id) -> pd.DataFrame:
+        """Sequência de paradas da viagem, com chegada e partida"""
+        trip = self.trip_index(trip_id)
+        if trip < 0:
+            return self._events_frame(np.empty(0, dtype=np.int64))
+        return self._events_frame(np.arange(self.trip_offsets[trip], self.trip_offsets[trip + 1]))
+
+    def _events_frame(self, events: np.ndarray) -> pd.DataFrame:
+        trips = self.event_trip(events)
+        return pd.DataFrame({
+            'trip_id': self.trip_ids[trips],
+            'route_id': lookup_ids(self.route_ids, self.trip_route[trips]),
+            'stop_sequence': self.event_sequence[events],
+            'stop_id': self.stop_ids[self.event_stop[events]],
+            'arrival_time': format_seconds(self.event_arrival[events]),
+            'departure_time': format_seconds(self.event_departure[events]),
+        })
+
+
+def build_timetable(stop_times_path: str, trips_path: Optional[str]) -> Timetable:
+    """Constrói o índice a partir das tabelas limpas"""
+    stop_times = read_processed(stop_times_path, STOP_TIMES_COLUMNS)
+    trips = read_processed(trips_path, TRIPS_COLUMNS) if trips_path else None
+    return Timetable.from_frames(stop_times, trips)
+
+
+def _hashes(inputs: Dict) -> Dict[str, str]:
+    return {path: info['sha256'] for path, info in inputs.items()}
+
+
+def load_timetable(gtfs_dir: str, force: bool = False, verbose: bool = True) -> Optional[Timetable]:
+    """
+    Índice gravado em gtfs_dir, reconstruído (e gravado de novo) se não existir,
+    se for de outra versão ou se stop_times/trips mudaram desde a gravação
+    """
+    path = os.path.join(gtfs_dir, TIMETABLE_FILE)
+    stop_times_path = find_processed_file(gtfs_dir, "stop_times_clean.csv")
+    if not stop_times_path:
+        return None
+    trips_path = find_processed_file(gtfs_dir, "trips_clean.csv")
+    input_paths = [p for p in (stop_times_path, trips_path) if p]
+
+    if not force and os.path.exists(path):
+        try:
+            timetable = Timetable.load(path)
+        except Exception as e:
+            print(f"[AVISO] Índice de horários ignorado ({path}): {e}")
+            timetable = None
+        if timetable is not None:
+            current = describe_inputs(input_paths, timetable.inputs)
+            if _hashes(current) == _hashes(timetable.inputs):
+                if verbose:
+                    print(f"[OK] Índice de horários carregado: {TIMETABLE_FILE}")
+                return timetable
+
+    if verbose:
+        print("[INFO] Construindo índice de horários a partir de stop_times/trips...")
+    timetable = build_timetable(stop_times_path, trips_path)
+    timetable.inputs = describe_inputs(input_paths)
+    timetable.save(path)
+    if verbose:
+        print(f"[OK] Índice gravado: {TIMETABLE_FILE}")
+    return timetable
+
+
+def service_trip_mask(gtfs_dir: str, timetable: Timetable, date: Optional[str]) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """
+    Viagens do dia de serviço. Sem data, usa o dia com mais viagens do calendário.
+    Sem calendário, todas as viagens
+    """
+    calendar = load_calendar(gtfs_dir)
+    if calendar is None or len(calendar.dates) == 0:
+        return None, None
+    if date is None:
+        services = pd.DataFrame({'service_id': timetable.service_ids[timetable.trip_service[timetable.trip_service >= 0]]})
+        per_day = calendar.trips_per_day(services)
+        date = str(per_day.loc[per_day['viagens'].idxmax(), 'date'])
+    return timetable.trip_mask(calendar, date), date
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Índice de horários do GTFS (partidas por parada, paradas por viagem)")
+    parser.add_argument("--parada", help="Mostra as próximas partidas desta parada (stop_id)")
+    parser.add_argument("--apos", default="00:00:00",
+                        help="Horário inicial das partidas, HH:MM ou HH:MM:SS (padrão: 00:00:00)")
+    parser.add_argument("--limite", type=int, default=10,
+                        help="Quantidade de partidas mostradas (padrão: 10)")
+    parser.add_argument("--data",
+                        help="Considera só as viagens que operam nesta data (YYYY-MM-DD)")
+    parser.add_argument("--viagem", help="Mostra a sequência de paradas desta viagem (trip_id)")
+    parser.add_argument("--forcar", action="store_true",
+                        help="Reconstrói o índice mesmo que stop_times/trips não tenham mudado")
+    args = parser.parse_args()
+
+    print("=== ÍNDICE DE HORÁRIOS GTFS ===\n")
+
+    project_root = detect_project_root()
+    gtfs_dir = os.path.join(project_root, "data", "processed", "gtfs")
+    timetable = load_timetable(gtfs_dir, force=args.forcar)
+    if timetable is None:
+        print(f"[ERRO] stop_times limpo não encontrado em {gtfs_dir}")
+        return
+    print(f"[INFO] {timetable.num_stops} paradas, {timetable.num_trips} viagens, {timetable.num_events} horários")
+
+    if args.parada:
+        trip_mask = None
+        if args.data:
+            calendar = load_calendar(gtfs_dir)
+            if calendar is None:
+                print("[AVISO] Calendário não encontrado: --data ignorado")
+            else:
+                trip_mask = timetable.trip_mask(calendar, args.data)
+        try:
+            after = parse_time(args.apos)
+        except ValueError as e:
+            print(f"[ERRO] {e}")
+            return
+        departures = timetable.next_departures(args.parada, after, args.limite, trip_mask=trip_mask)
+        print(f"\n--- Partidas da parada {args.parada} a partir de {format_seconds([after])[0]} ---")
+        print(departures[['departure_time', 'trip_id', 'route_id']].to_string(index=False)
+              if len(departures) else "[AVISO] Nenhuma partida encontrada")
+
+    if args.viagem:
+        stops = timetable.trip_stops(args.viagem)
+        print(f"\n--- Paradas da viagem {args.viagem} ---")
+        print(stops[['stop_sequence', 'stop_id', 'arrival_time', 'departure_time']].to_string(index=False)
+              if len(stops) else "[AVISO] Viagem não encontrada")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Carga incremental (upsert) pelas chaves naturais das tabelas.
+
+Recarregar um arquivo processado duplicava as linhas das tabelas sem chave
+(fluxo_veiculos_hora, monitoramento_cttu...) ou falhava por conflito de PRIMARY KEY
+no GTFS. No modo incremental do copy_loader.py (--incremental):
+
+1. cada linha do arquivo recebe um hash do seu conteúdo; as linhas cujo hash já
+   estava na última carga do mesmo arquivo não são enviadas;
+2. as linhas novas ou alteradas vão por COPY para uma tabela temporária;
+3. um INSERT ... ON CONFLICT (chave natural) insere as novas e atualiza as alteradas.
+
+O estado (hashes da última carga de cada tabela ou partição) fica no próprio banco,
+na tabela carga_incremental, e é atualizado na mesma transação do upsert: um banco
+novo, restaurado ou trocado no .env não herda o estado de outro, e uma carga que
+falha não deixa o estado adiantado. Se a tabela de destino não existe, o estado
+registrado é descartado. Assim uma carga diária custa proporcionalmente ao que
+mudou, não ao histórico inteiro.
+"""
+
+import io
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+# Tabela (e schema em database/schemas) com os hashes da última carga de cada alvo
+STATE_TABLE = "carga_incremental"
+
+# Tabela -> colunas da chave natural usada no ON CONFLICT
+NATURAL_KEYS: Dict[str, List[str]] = {
+    'relatorio_fluxo': ['equipamento', 'faixa', 'data', 'hora', 'minutos_intervalo'],
+    'fluxo_velocidade_15min': ['equipamento', 'faixa', 'data', 'hora', 'minutos_intervalo'],
+    'fluxo_veiculos_hora': ['equipamento', 'horainicio', 'horafinal'],
+    'semaforos': ['_id'],
+    'equipamentos_medicao_velocidade': ['_id'],
+    'monitoramento_cttu': ['nome'],
+    'faixaazul_proximidade': ['faixa_nome', 'conjunto', 'ponto_id'],
+    'faixaazul_mais_proxima': ['conjunto', 'ponto_id'],
+    'isocronas_paradas': ['conjunto', 'ponto_id', 'data', 'partida', 'minutos_limite', 'stop_id'],
+    'isocronas_resumo': ['conjunto', 'ponto_id', 'data', 'partida', 'minutos_limite'],
+    'frequencia_linha_hora': ['data', 'route_id', 'direction_id', 'hora'],
+    'frequencia_linha_resumo': ['data', 'route_id', 'direction_id'],
+    'frequencia_parada_hora': ['data', 'route_id', 'direction_id', 'stop_id', 'hora'],
+    'frequencia_parada_resumo': ['data', 'route_id', 'direction_id', 'stop_id'],
+    'gtfs_agency': ['agency_id'],
+    'gtfs_calendar': ['service_id'],
+    'gtfs_calendar_dates': ['service_id', 'date'],
+    'gtfs_fare_attributes': ['fare_id'],
+    'gtfs_fare_rules': ['fare_id', 'route_id'],
+    'gtfs_feed_info': ['feed_publisher_name'],
+    'gtfs_routes': ['route_id'],
+    'gtfs_service_days': ['date', 'service_id'],
+    'gtfs_shape_geometries': ['shape_id', 'tolerancia_m'],
+    'gtfs_shapes': ['shape_id', 'shape_pt_sequence'],
+    'gtfs_stop_times': ['trip_id', 'stop_sequence'],
+    'gtfs_stops': ['stop_id'],
+    'gtfs_trips': ['trip_id'],
+}
+
+
+def state_schema_path(project_root: str) -> str:
+    return os.path.join(project_root, "database", "schemas", f"{STATE_TABLE}_schema.sql")
+
+
+def load_state(cursor, target: str) -> np.ndarray:
+    """
+    Hashes (ordenados) da última carga do alvo registrados neste banco. Vazio se o
+    alvo nunca foi carregado aqui; se a sua tabela não existe mais, o estado antigo
+    é apagado (na transação da carga)
+    """
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (target,))
+    if not cursor.fetchone()[0]:
+        cursor.execute(f"DELETE FROM {STATE_TABLE} WHERE alvo = %s", (target,))
+        return np.empty(0, dtype=np.uint64)
+    buffer = io.StringIO()
+    cursor.copy_expert(f"COPY (SELECT hash FROM {STATE_TABLE} WHERE alvo = '{target}') TO STDOUT", buffer)
+    # BIGINT com sinal no banco, uint64 no pandas
+    return np.sort(np.array(buffer.getvalue().split(), dtype=np.int64).view(np.uint64))
+
+
+def save_state(cursor, target: str, stored: np.ndarray, hashes: np.ndarray):
+    """
+    Troca, na transação da carga, os hashes registrados do alvo (stored) pelos da
+    carga atual: só os que saíram são apagados e só os novos são enviados
+    """
+    current = np.unique(hashes)
+    removed = np.setdiff1d(stored, current, assume_unique=True)
+    added = np.setdiff1d(current, stored, assume_unique=True)
+    if len(removed):
+        cursor.execute(f"DELETE FROM {STATE_TABLE} WHERE alvo = %s AND hash = ANY(%s)",
+                       (target, removed.view(np.int64).tolist()))
+    if len(added):
+        buffer = io.StringIO()
+        pd.DataFrame({'alvo': target, 'hash': added.view(np.int64)}).to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {STATE_TABLE} (alvo, hash) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """Hash de 64 bits do conteúdo de cada linha"""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def changed_rows(df: pd.DataFrame, hashes: np.ndarray, previous: np.ndarray,
+                 keys: List[str]) -> pd.DataFrame:
+    """
+    Linhas novas ou alteradas desde a última carga, prontas para o upsert. Ficam de
+    fora, com aviso, as linhas com a chave natural nula (nunca casariam no ON CONFLICT:
+    cada alteração seria inserida de novo) e, numa chave repetida no arquivo, todas
+    menos a última ocorrência (o ON CONFLICT não atualiza a mesma linha duas vezes).
+    As repetições são decididas sobre o arquivo inteiro, não só sobre as linhas alteradas
+    """
+    null_key = df[keys].isna().any(axis=1).to_numpy()
+    if null_key.any():
+        print(f"[AVISO] {int(null_key.sum())} linhas com chave natural nula ({', '.join(keys)}) "
+              f"ignoradas no upsert")
+    repeated = np.zeros(len(df), dtype=bool)
+    repeated[~null_key] = df[~null_key].duplicated(keys, keep='last').to_numpy()
+    if repeated.any():
+        print(f"[AVISO] {int(repeated.sum())} linhas com chave natural repetida no arquivo descartadas "
+              f"(fica a última ocorrência; a carga sem --incremental carregaria todas)")
+    return df[~null_key & ~repeated & ~np.isin(hashes, previous)]
+
+
+# Índices únicos válidos, sem predicado nem expressões, com exatamente as colunas da
+# chave (em qualquer ordem), como o ON CONFLICT exige: a PRIMARY KEY entra aqui
+COVERING_INDEXES_SQL = """
+SELECT c.relname
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indexrelid
+WHERE i.indrelid = to_regclass(%s)
+  AND i.indisunique AND i.indisvalid
+  AND i.indpred IS NULL AND i.indexprs IS NULL
+  AND i.indnatts = %s
+  AND (SELECT array_agg(a.attname::text) FROM pg_attribute a
+       WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)) @> %s::text[]
+"""
+
+
+def ensure_key_index(cursor, table_name: str, keys: List[str]):
+    """
+    Garante o índice único exigido pelo ON CONFLICT (nas tabelas particionadas, a chave
+    inclui data). Só cria {tabela}_chave_natural se nenhuma PRIMARY KEY ou índice único
+    já cobre as colunas da chave, e o remove se ficou redundante com um deles
+    """
+    index_name = f"{table_name}_chave_natural"
+    cursor.execute(COVERING_INDEXES_SQL, (table_name, len(keys), list(keys)))
+    covering = [row[0] for row in cursor.fetchall()]
+    if not covering:
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table_name} ({', '.join(keys)})")
+        print(f"[OK] Índice único da chave natural criado: {index_name}")
+    elif index_name in covering and len(covering) > 1:
+        cursor.execute(f"DROP INDEX {index_name}")
+        print(f"[OK] Índice redundante com a chave primária (ou outro índice único) removido: {index_name}")
+
+
+def staging_sql(table_name: str, staging: str, columns: List[str]) -> str:
+    """Tabela temporária com as colunas carregadas, descartada no fim da transação"""
+    columns_str = ", ".join([f'"{col}"' for col in columns])
+    return f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {columns_str} FROM {table_name} WITH NO DATA"
+
+
+def upsert_sql(table_name: str, staging: str, columns: List[str], keys: List[str]) -> str:
+    """INSERT ... ON CONFLICT da tabela temporária; linhas iguais às do banco não são reescritas"""
+    columns_str = ", ".join([f'"{col}"' for col in columns])
+    key_str = ", ".join([f'"{col}"' for col in keys])
+    values = [col for col in columns if col not in keys]
+    if not values:
+        action = "DO NOTHING"
+    else:
+        updates = ", ".join(f'"{col}" = EXCLUDED."{col}"' for col in values)
+        current = ", ".join(f'{table_name}."{col}"' for col in values)
+        excluded = ", ".join(f'EXCLUDED."{col}"' for col in values)
+        action = f"DO UPDATE SET {updates}\nWHERE ({current}) IS DISTINCT FROM ({excluded})"
+    return (f"INSERT INTO {table_name} ({columns_str})\n"
+            f"SELECT {columns_str} FROM {staging}\n"
+            f"ON CONFLICT ({key_str}) {action}")
+
+
+def natural_key(table_name: str, columns: List[str]) -> Optional[List[str]]:
+    """Chave natural declarada da tabela, se todas as colunas estiverem no arquivo"""
+    keys = NATURAL_KEYS.get(table_name)
+    if keys and all(key in columns for key in keys):
+        return keys
+    return None
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Instrumentação das etapas do ETL (clean_gtfs.py e generate_sql_inserts.py).
+
+Com --metricas, cada etapa de cada tabela (leitura, limpeza, renderização,
+escrita...) grava uma linha JSON com o tempo de relógio, as linhas processadas,
+linhas/s, os bytes gravados e o pico de memória (RSS) da etapa:
+
+    {"execucao": "20241017T120000-4242", "script": "clean_gtfs", "tabela": "stop_times",
+     "etapa": "limpeza", "inicio": "2024-10-17T12:00:01.123456+00:00", "segundos": 2.315,
+     "linhas": 1200000, "linhas_por_segundo": 518358.5, "bytes_escritos": null,
+     "pico_rss_mb": 812.4, "ok": true}
+
+As linhas vão para data/analysis/metricas/etl_metricas.jsonl (acrescentadas a cada
+execução) e podem ser exportadas para a tabela etl_metricas do PostgreSQL, para que
+o Grafana acompanhe o desempenho do pipeline ao longo do tempo:
+
+    python scripts/database/instrumentation.py --exportar
+
+A configuração fica em variáveis de ambiente, herdadas pelos processos dos pools
+(--jobs), que gravam suas próprias etapas no mesmo arquivo.
+"""
+
+import os
+import io
+import csv
+import sys
+import json
+import time
+import argparse
+import contextlib
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Arquivo padrão das métricas, relativo à raiz do projeto
+METRICS_FILE = os.path.join("data", "analysis", "metricas", "etl_metricas.jsonl")
+
+# Tabela do PostgreSQL que recebe as métricas exportadas
+METRICS_TABLE = "etl_metricas"
+
+# Variáveis de ambiente com o arquivo de saída e o identificador da execução
+ENV_FILE = "ETL_METRICAS_ARQUIVO"
+ENV_RUN = "ETL_METRICAS_EXECUCAO"
+ENV_SCRIPT = "ETL_METRICAS_SCRIPT"
+
+# Campos de cada linha, na ordem das colunas da tabela etl_metricas
+FIELDS = ['execucao', 'script', 'tabela', 'etapa', 'inicio', 'segundos', 'linhas',
+          'linhas_por_segundo', 'bytes_escritos', 'pico_rss_mb', 'ok']
+
+# Linux: escrever "5" em clear_refs zera o pico de RSS (VmHWM) do processo
+CLEAR_REFS = "/proc/self/clear_refs"
+PROC_STATUS = "/proc/self/status"
+
+
+def configure(path: str, script: str):
+    """Ativa a gravação das métricas em path para esta execução (e seus processos filhos)"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    os.environ[ENV_FILE] = os.path.abspath(path)
+    os.environ[ENV_RUN] = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    os.environ[ENV_SCRIPT] = script
+
+
+def enabled() -> bool:
+    return bool(os.environ.get(ENV_FILE))
+
+
+def reset_peak_rss() -> bool:
+    """Zera o pico de RSS do processo. False se o sistema não permitir (pico desde o início)"""
+    try:
+        with open(CLEAR_REFS, 'w') as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de memória residente do processo em MB (desde o último reset, no Linux)"""
+    try:
+        with open(PROC_STATUS, 'r') as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB no Linux, bytes no macOS
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+
+def file_bytes(*paths: str) -> int:
+    """Soma dos tamanhos dos arquivos existentes"""
+    return sum(os.path.getsize(path) for path in paths if path and os.path.exists(path))
+
+
+def write_record(record: Dict):
+    """Acrescenta uma linha ao arquivo de métricas (uma única escrita, segura entre processos)"""
+    line = json.dumps({field: record.get(field) for field in FIELDS}, ensure_ascii=False) + "\n"
+    with open(os.environ[ENV_FILE], 'a', encoding='utf-8') as f:
+        f.write(line)
+
+
+@contextlib.contextmanager
+def stage(table: str, name: str) -> Iterator[Dict]:
+    """
+    Mede uma etapa de uma tabela. O dicionário devolvido recebe, dentro do bloco,
+    'linhas' e 'bytes_escritos' (e 'tabela', se só for conhecida depois da leitura).
+    Numa etapa executada por processos filhos, 'pico_rss_mb' recebe o pico de memória
+    deles: fica registrado o maior entre esse e o do próprio processo.
+    Sem configure(), não grava nada
+    """
+    record = {'tabela': table, 'etapa': name, 'linhas': None, 'bytes_escritos': None, 'pico_rss_mb': None}
+    if not enabled():
+        yield record
+        return
+
+    reset_peak_rss()
+    record['inicio'] = datetime.now(timezone.utc).isoformat()
+    started = time.perf_counter()
+    record['ok'] = False
+    try:
+        yield record
+        record['ok'] = True
+    finally:
+        seconds = time.perf_counter() - started
+        rows = record['linhas']
+        peak = max((p for p in (peak_rss_mb(), record.get('pico_rss_mb')) if p is not None), default=None)
+        record.update({
+            'execucao': os.environ.get(ENV_RUN),
+            'script': os.environ.get(ENV_SCRIPT),
+            'segundos': round(seconds, 6),
+            'linhas': int(rows) if rows is not None else None,
+            'linhas_por_segundo': round(rows / seconds, 1) if rows is not None and seconds > 0 else None,
+            'pico_rss_mb': round(peak, 1) if peak is not None else None,
+        })
+        write_record(record)
+
+
+def read_records(path: str) -> List[Dict]:
+    """Linhas do arquivo de métricas (linhas inválidas, de uma gravação interrompida, são ignoradas)"""
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def export_records(conn, records: List[Dict], schema_path: str) -> int:
+    """
+    Envia as métricas para etl_metricas via COPY. Linhas já exportadas (mesma execução,
+    etapa, tabela e início) são ignoradas. Retorna quantas linhas eram novas
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for record in records:
+        writer.writerow(['' if record.get(field) is None else record.get(field) for field in FIELDS])
+    buffer.seek(0)
+
+    columns = ", ".join(FIELDS)
+    with open(schema_path, 'r', encoding='utf-8') as f:
+        schema_sql = f.read()
+    with conn.cursor() as cursor:
+        cursor.execute(schema_sql)
+        cursor.execute(f"CREATE TEMP TABLE {METRICS_TABLE}_carga ON COMMIT DROP AS "
+                       f"SELECT {columns} FROM {METRICS_TABLE} WITH NO DATA")
+        cursor.copy_expert(f"COPY {METRICS_TABLE}_carga ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(f"INSERT INTO {METRICS_TABLE} ({columns}) SELECT {columns} FROM {METRICS_TABLE}_carga "
+                       f"ON CONFLICT (execucao, script, tabela, etapa, inicio) DO NOTHING")
+        inserted = cursor.rowcount
+    conn.commit()
+    return inserted
+
+
+def main():
+    """Função principal"""
+    from copy_loader import get_connection
+    from generate_sql_inserts import detect_project_root
+
+    parser = argparse.ArgumentParser(description="Exporta as métricas do ETL (JSON lines) para o PostgreSQL")
+    parser.add_argument("--exportar", action="store_true",
+                        help="Envia as métricas para a tabela etl_metricas")
+    parser.add_argument("--arquivo",
+                        help=f"Arquivo de métricas (padrão: {METRICS_FILE})")
+    args = parser.parse_args()
+
+    project_root = detect_project_root()
+    path = args.arquivo or os.path.join(project_root, METRICS_FILE)
+    if not os.path.exists(path):
+        print(f"[ERRO] Arquivo de métricas não encontrado: {path}")
+        print("[INFO] Rode clean_gtfs.py ou generate_sql_inserts.py com --metricas")
+        return
+
+    records = read_records(path)
+    runs = {record.get('execucao') for record in records}
+    print(f"[INFO] {len(records)} etapas medidas em {len(runs)} execuções ({os.path.basename(path)})")
+    if not args.exportar:
+        return
+
+    schema_path = os.path.join(project_root, "database", "schemas", f"{METRICS_TABLE}_schema.sql")
+    try:
+        conn = get_connection(project_root)
+    except Exception as e:
+        print(f"[ERRO] Não foi possível conectar ao PostgreSQL: {e}")
+        return
+    try:
+        inserted = export_records(conn, records, schema_path)
+        print(f"[SUCESSO] {inserted} etapas novas exportadas para {METRICS_TABLE}")
+    except Exception as e:
+        conn.rollback()
+        print(f"[ERRO] Falha ao exportar as métricas: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
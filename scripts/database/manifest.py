@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Manifesto de regeneração incremental.
+
+Guarda, para cada saída gerada, o hash das entradas (CSV, schema, arquivo GTFS
+bruto) e a versão do gerador. Se nada mudou e a saída ainda existe, a saída
+pode ser reaproveitada sem reprocessar.
+
+Usado por generate_sql_inserts.py (database/sql_complete/manifest.json) e
+clean_gtfs.py (data/processed/gtfs/manifest.json). Os caminhos são registrados
+relativos à raiz do projeto, para que o manifesto valha em qualquer cópia do
+repositório (os manifestos não são versionados: ver .gitignore).
+"""
+
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional
+
+MANIFEST_FILENAME = "manifest.json"
+
+# Raiz do projeto (scripts/database -> scripts -> projeto)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def path_key(path: str) -> str:
+    """Chave do caminho no manifesto: relativa à raiz do projeto, com '/'"""
+    return os.path.relpath(os.path.abspath(path), PROJECT_ROOT).replace(os.sep, '/')
+
+
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    """Calcula o SHA-256 de um arquivo lendo em blocos"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path: str) -> Dict:
+    """Lê o manifesto (ou retorna um manifesto vazio se não existir ou estiver corrompido)"""
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if isinstance(manifest.get('saidas'), dict):
+                return manifest
+        except Exception as e:
+            print(f"[AVISO] Manifesto ignorado ({manifest_path}): {e}")
+    return {'saidas': {}}
+
+
+def save_manifest(manifest_path: str, manifest: Dict):
+    """Grava o manifesto de forma atômica"""
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+
+def describe_inputs(paths: List[str], previous: Optional[Dict] = None) -> Dict[str, Dict]:
+    """
+    Descreve as entradas (tamanho, mtime e SHA-256). Se tamanho e mtime não mudaram
+    desde o registro anterior, reaproveita o hash sem reler o arquivo
+    """
+    previous = previous or {}
+    inputs = {}
+    for path in paths:
+        stat = os.stat(path)
+        key = path_key(path)
+        old = previous.get(key)
+        if old and old.get('tamanho') == stat.st_size and old.get('mtime') == stat.st_mtime:
+            sha = old['sha256']
+        else:
+            sha = file_sha256(path)
+        inputs[key] = {'tamanho': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha}
+    return inputs
+
+
+def _hashes(inputs: Dict[str, Dict]) -> Dict[str, str]:
+    return {path: info['sha256'] for path, info in inputs.items()}
+
+
+def is_up_to_date(manifest: Dict, output_path: str, input_paths: List[str], version: str) -> bool:
+    """Verifica se a saída existe e foi gerada a partir das mesmas entradas e versão do gerador"""
+    entry = manifest['saidas'].get(path_key(output_path))
+    if not entry or entry.get('versao') != version or not os.path.exists(output_path):
+        return False
+    if sorted(entry.get('entradas', {})) != sorted(path_key(p) for p in input_paths):
+        return False
+    try:
+        current = describe_inputs(input_paths, entry['entradas'])
+    except OSError:
+        return False
+    return _hashes(current) == _hashes(entry['entradas'])
+
+
+def record_output(manifest: Dict, output_path: str, input_paths: List[str], version: str, **extra):
+    """Registra no manifesto as entradas que geraram uma saída"""
+    key = path_key(output_path)
+    previous = manifest['saidas'].get(key, {}).get('entradas')
+    entry = {'versao': version, 'entradas': describe_inputs(input_paths, previous)}
+    entry.update(extra)
+    manifest['saidas'][key] = entry
+
+
+def get_output_info(manifest: Dict, output_path: str) -> Dict:
+    """Retorna os dados registrados para uma saída (ou dict vazio)"""
+    return manifest['saidas'].get(path_key(output_path), {})
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Leitura e escrita da camada processada (data/processed e data/processed/gtfs).
+
+Além do CSV, os arquivos processados podem ser gravados em Parquet, que guarda os
+tipos explicitamente (Int64, datas, booleanos) e codifica em dicionário as colunas
+texto com muitos valores repetidos (equipamento, logradouro, route_id...), lidas de
+volta como category. Reler um Parquet não exige inferir tipos de novo e é bem mais
+rápido que interpretar o CSV.
+
+Quando existem as duas versões de um mesmo arquivo, a mais recente é usada.
+
+IDs e versão do feed do GTFS são texto na especificação, e o Parquet os guarda como
+texto. Nos CSVs de data/processed/gtfs essas colunas também são lidas como texto:
+inferidas como número, um route_id '101' viraria INTEGER no schema gerado, e o tipo
+da tabela dependeria do formato lido.
+
+Uso direto (converte os CSVs processados existentes para Parquet):
+    python scripts/database/processed_io.py
+"""
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CSV_SUFFIX = ".csv"
+PARQUET_SUFFIX = ".parquet"
+
+# Formatos aceitos por --formato nos scripts que gravam a camada processada
+OUTPUT_FORMATS = {
+    'csv': [CSV_SUFFIX],
+    'parquet': [PARQUET_SUFFIX],
+    'ambos': [CSV_SUFFIX, PARQUET_SUFFIX],
+}
+
+# Colunas texto codificadas em dicionário quando a fração de valores distintos
+# não passa deste limite
+DICTIONARY_MAX_RATIO = 0.5
+
+# Colunas do GTFS processado lidas sempre como texto: os IDs (*_id), menos as
+# enumerações numéricas, e as colunas abaixo
+GTFS_TEXT_COLUMNS = {'feed_version', 'parent_station', 'route_short_name'}
+GTFS_ENUM_COLUMNS = {'direction_id'}
+
+# Tipos pandas explícitos para os tipos SQL dos schemas
+SQL_TO_PANDAS = {
+    'INTEGER': 'Int64',
+    'BIGINT': 'Int64',
+    'SMALLINT': 'Int64',
+    'DECIMAL': 'float64',
+    'NUMERIC': 'float64',
+    'REAL': 'float64',
+    'DOUBLE': 'float64',
+    'BOOLEAN': 'boolean',
+}
+
+
+def is_parquet(path: str) -> bool:
+    return path.endswith(PARQUET_SUFFIX)
+
+
+def csv_filename(filename: str) -> str:
+    """Nome equivalente em CSV (schemas e nomes de tabela são mapeados pelo nome do CSV)"""
+    if filename.endswith(PARQUET_SUFFIX):
+        return filename[:-len(PARQUET_SUFFIX)] + CSV_SUFFIX
+    return filename
+
+
+def with_suffix(csv_path: str, suffix: str) -> str:
+    """Caminho do arquivo processado no formato indicado pelo sufixo"""
+    return csv_path[:-len(CSV_SUFFIX)] + suffix if csv_path.endswith(CSV_SUFFIX) else csv_path + suffix
+
+
+def is_gtfs_text_column(col: str) -> bool:
+    return col in GTFS_TEXT_COLUMNS or (col.endswith('_id') and col not in GTFS_ENUM_COLUMNS)
+
+
+def csv_text_dtypes(path: str) -> Optional[Dict[str, type]]:
+    """dtypes fixos na leitura de um CSV processado do GTFS (IDs e versão como texto)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    if os.path.basename(directory) != "gtfs" or os.path.basename(os.path.dirname(directory)) != "processed":
+        return None
+    columns = pd.read_csv(path, encoding='utf-8', nrows=0).columns
+    return {col: str for col in columns if is_gtfs_text_column(col)} or None
+
+
+def list_processed_files(directory: str) -> List[str]:
+    """
+    Lista (ordenados) os arquivos processados *clean* de um diretório. Se um arquivo
+    existe em CSV e Parquet, fica só a versão modificada por último
+    """
+    if not os.path.exists(directory):
+        return []
+
+    chosen: Dict[str, str] = {}
+    for filename in os.listdir(directory):
+        if 'clean' not in filename or not filename.endswith((CSV_SUFFIX, PARQUET_SUFFIX)):
+            continue
+        key = csv_filename(filename)
+        current = chosen.get(key)
+        if current is None or (os.path.getmtime(os.path.join(directory, filename))
+                               > os.path.getmtime(os.path.join(directory, current))):
+            chosen[key] = filename
+    return [chosen[key] for key in sorted(chosen)]
+
+
+def find_processed_file(processed_dir: str, relative_csv: str) -> Optional[str]:
+    """Caminho do arquivo processado (CSV ou Parquet, o mais recente) equivalente ao CSV informado"""
+    directory = os.path.join(processed_dir, os.path.dirname(relative_csv))
+    target = os.path.basename(relative_csv)
+    for filename in list_processed_files(directory):
+        if csv_filename(filename) == target:
+            return os.path.join(directory, filename)
+    return None
+
+
+def read_processed(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Lê um arquivo processado (CSV ou Parquet). Colunas em dicionário do Parquet
+    chegam como category, sem materializar um texto por linha. Com columns, lê só
+    as colunas listadas que existirem no arquivo
+    """
+    if is_parquet(path):
+        if columns is not None:
+            import pyarrow.parquet as pq
+            available = set(pq.read_schema(path).names)
+            columns = [col for col in columns if col in available]
+        return pd.read_parquet(path, columns=columns)
+    usecols = (lambda col: col in columns) if columns is not None else None
+    return pd.read_csv(path, encoding='utf-8', usecols=usecols, dtype=csv_text_dtypes(path))
+
+
+def _merge_dtypes(current, new):
+    """Combina o dtype de uma coluna entre blocos como um pd.read_csv completo faria"""
+    if current is None or current == new:
+        return new
+    numeric = [isinstance(d, np.dtype) and d.kind in 'iuf' for d in (current, new)]
+    if all(numeric):
+        return np.result_type(current, new)
+    # Número + texto: a coluna inteira vira texto
+    for dtype in (current, new):
+        if not (isinstance(dtype, np.dtype) and dtype.kind in 'iufb'):
+            return dtype
+    return np.dtype(object)
+
+
+def resolve_csv_dtypes(csv_path: str, chunk_rows: int) -> Tuple[int, Dict[str, object]]:
+    """Percorre o CSV em blocos e resolve número de registros e dtype final de cada coluna"""
+    num_rows = 0
+    dtypes = {}
+    for chunk in pd.read_csv(csv_path, encoding='utf-8', chunksize=chunk_rows, dtype=csv_text_dtypes(csv_path)):
+        num_rows += len(chunk)
+        for col, dtype in chunk.dtypes.items():
+            dtypes[col] = _merge_dtypes(dtypes.get(col), dtype)
+    return num_rows, dtypes
+
+
+def parquet_dtypes(path: str) -> Tuple[int, Dict[str, object]]:
+    """Número de registros e dtype de cada coluna de um Parquet, sem ler os dados"""
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    empty = parquet_file.schema_arrow.empty_table().to_pandas()
+    return parquet_file.metadata.num_rows, dict(empty.dtypes.items())
+
+
+def iter_processed_chunks(path: str, chunk_rows: int,
+                          dtypes: Optional[Dict[str, object]] = None) -> Iterator[pd.DataFrame]:
+    """Percorre um arquivo processado em blocos de até chunk_rows linhas"""
+    if not is_parquet(path):
+        yield from pd.read_csv(path, encoding='utf-8', chunksize=chunk_rows, dtype=dtypes)
+        return
+
+    import pyarrow.parquet as pq
+
+    start = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+        chunk = batch.to_pandas()
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+
+def to_parquet_frame(df: pd.DataFrame, column_types: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Prepara o DataFrame para Parquet: tipos explícitos a partir do schema (se houver),
+    colunas texto de tipos mistos como texto e colunas repetitivas em dicionário
+    """
+    df = df.copy()
+    column_types = column_types or {}
+    for col in df.columns:
+        sql_type = column_types.get(col, '').upper().split('(')[0].strip()
+        target = SQL_TO_PANDAS.get(sql_type)
+        if target == 'Int64' and pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].round().astype('Int64')
+        elif target and not pd.api.types.is_object_dtype(df[col]) and not pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype(target)
+
+        if pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col]):
+            values = df[col].dropna()
+            # Parquet não aceita tipos misturados numa coluna (ex.: 123 e 'A1')
+            kinds = set(map(type, values))
+            if len(kinds) > 1 and not all(issubclass(k, str) for k in kinds):
+                df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+                kinds = {str}
+            if kinds <= {str} and len(values) and values.nunique() <= DICTIONARY_MAX_RATIO * len(values):
+                df[col] = df[col].astype('category')
+    return df
+
+
+def csv_to_parquet(csv_path: str, parquet_path: str, chunk_rows: int,
+                   dtypes: Optional[Dict[str, object]] = None):
+    """
+    Converte um CSV grande para Parquet em blocos, com os dtypes informados ou
+    resolvidos sobre o arquivo inteiro. Sem colunas categóricas (o dicionário mudaria
+    a cada bloco): a codificação em dicionário fica por conta das páginas do Parquet
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if dtypes is None:
+        _, dtypes = resolve_csv_dtypes(csv_path, chunk_rows)
+    # category lida em blocos teria um dicionário diferente por bloco
+    dtypes = {col: dtype.categories.dtype if isinstance(dtype, pd.CategoricalDtype) else dtype
+              for col, dtype in dtypes.items()}
+    writer = None
+    try:
+        for chunk in pd.read_csv(csv_path, encoding='utf-8', chunksize=chunk_rows, dtype=dtypes):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(parquet_path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def save_processed(df: pd.DataFrame, csv_path: str, formato: str = 'csv',
+                   column_types: Optional[Dict[str, str]] = None) -> List[str]:
+    """Grava o DataFrame nos formatos pedidos ('csv', 'parquet' ou 'ambos'). Retorna os caminhos"""
+    paths = []
+    for suffix in OUTPUT_FORMATS[formato]:
+        path = with_suffix(csv_path, suffix)
+        if suffix == PARQUET_SUFFIX:
+            to_parquet_frame(df, column_types).to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False, encoding='utf-8')
+        paths.append(path)
+    return paths
+
+
+def main():
+    """Converte os CSVs processados existentes para Parquet"""
+    from generate_sql_inserts import detect_project_root, find_matching_schema, parse_schema_file
+
+    parser = argparse.ArgumentParser(description="Converte a camada processada de CSV para Parquet")
+    parser.add_argument("--tabelas", nargs="*",
+                        help="Converte apenas os arquivos cujo nome contém algum destes termos")
+    args = parser.parse_args()
+
+    print("=== CONVERSÃO DA CAMADA PROCESSADA PARA PARQUET ===\n")
+
+    project_root = detect_project_root()
+    processed_dir = os.path.join(project_root, "data", "processed")
+    schemas_dir = os.path.join(project_root, "database", "schemas")
+
+    success = 0
+    errors = 0
+    for base_dir, gtfs in [(processed_dir, False), (os.path.join(processed_dir, "gtfs"), True)]:
+        if not os.path.exists(base_dir):
+            continue
+        for filename in sorted(f for f in os.listdir(base_dir) if f.endswith(CSV_SUFFIX) and 'clean' in f):
+            if args.tabelas and not any(t in filename for t in args.tabelas):
+                continue
+            csv_path = os.path.join(base_dir, filename)
+            column_types = {}
+            schema_path = None if gtfs else find_matching_schema(filename, schemas_dir)
+            if schema_path:
+                _, column_types = parse_schema_file(schema_path)
+            try:
+                df = read_processed(csv_path)
+                df.columns = [col.replace('-', '_') for col in df.columns]
+                parquet_path = save_processed(df, csv_path, 'parquet', column_types)[0]
+                csv_size = os.path.getsize(csv_path)
+                parquet_size = os.path.getsize(parquet_path)
+                print(f"[OK] {filename} -> {os.path.basename(parquet_path)} "
+                      f"({df.shape[0]} linhas, {csv_size / 1024:.0f} KB -> {parquet_size / 1024:.0f} KB)")
+                success += 1
+            except Exception as e:
+                print(f"[ERRO] Falha ao converter {filename}: {e}")
+                errors += 1
+
+    print("\n=== RESUMO ===")
+    print(f"[SUCESSO] Arquivos convertidos: {success}")
+    print(f"[ERRO] Erros: {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Tabelas de agregados (rollups) usadas pelos painéis do Grafana.
+
+Os painéis de fluxo por hora e de semáforos por bairro consultavam as tabelas
+brutas a cada atualização. Os agregados são tabelas comuns (não materialized
+views), para que a carga de um mês atualize só aquele intervalo de datas:
+
+- relatorio_fluxo_hora: totais por data, hora e equipamento de cada faixa de velocidade;
+- relatorio_fluxo_dia: os mesmos totais por data e equipamento;
+- semaforos_bairro_funcionamento: quantidade de semáforos por bairro e funcionamento.
+
+O SQL de atualização é anexado aos arquivos *_complete.sql (generate_sql_inserts.py)
+e executado após cada carga via COPY (copy_loader.py). Uso direto (reconstrói todos
+os agregados a partir das tabelas já carregadas):
+    python scripts/database/rollups.py
+"""
+
+import argparse
+from typing import Dict, Optional, Tuple
+
+# Faixas de velocidade do relatorio_fluxo
+SPEED_BANDS = ['qtd_0a10km', 'qtd_11a20km', 'qtd_21a30km', 'qtd_31a40km', 'qtd_41a50km', 'qtd_51a60km',
+               'qtd_61a70km', 'qtd_71a80km', 'qtd_81a90km', 'qtd_91a100km', 'qtd_acimade100km']
+
+# Faixas somadas no painel "Fluxo de veículos 31–70 km/h"
+BANDS_31_70 = ['qtd_31a40km', 'qtd_41a50km', 'qtd_51a60km', 'qtd_61a70km']
+
+_BAND_COLUMNS = ",\n".join(f"    {band} BIGINT" for band in SPEED_BANDS)
+
+RELATORIO_FLUXO_HORA_SCHEMA = f"""CREATE TABLE IF NOT EXISTS relatorio_fluxo_hora (
+    data DATE NOT NULL,
+    hora INTEGER,
+    equipamento VARCHAR(255),
+{_BAND_COLUMNS},
+    qtd_31a70km BIGINT,
+    qtd_total BIGINT,
+    registros INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_relatorio_fluxo_hora_data_hora ON relatorio_fluxo_hora (data, hora);"""
+
+RELATORIO_FLUXO_DIA_SCHEMA = f"""CREATE TABLE IF NOT EXISTS relatorio_fluxo_dia (
+    data DATE NOT NULL,
+    equipamento VARCHAR(255),
+{_BAND_COLUMNS},
+    qtd_31a70km BIGINT,
+    qtd_total BIGINT,
+    registros INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_relatorio_fluxo_dia_data ON relatorio_fluxo_dia (data);"""
+
+SEMAFOROS_BAIRRO_SCHEMA = """CREATE TABLE IF NOT EXISTS semaforos_bairro_funcionamento (
+    bairro VARCHAR(255),
+    funcionamento VARCHAR(255),
+    total BIGINT
+);"""
+
+
+def _period_filter(bounds: Optional[Tuple[str, str]]) -> str:
+    """Condição WHERE do intervalo [início, fim) de datas (ou de todas as datas)"""
+    if bounds:
+        return f"data >= '{bounds[0]}' AND data < '{bounds[1]}'"
+    return "data IS NOT NULL"
+
+
+def relatorio_fluxo_rollup_sql(bounds: Optional[Tuple[str, str]] = None) -> str:
+    """
+    Recalcula os agregados de relatorio_fluxo no intervalo de datas (o mês carregado)
+    ou, sem intervalo, por completo. Linhas sem data ficam de fora
+    """
+    period = _period_filter(bounds)
+    # Soma por linha antes de agregar: com uma faixa nula a linha não conta, como no painel original
+    sum_31_70 = " + ".join(BANDS_31_70)
+    sum_total = " + ".join(SPEED_BANDS)
+    band_sums = ",\n".join(f"    SUM({band})" for band in SPEED_BANDS)
+    band_list = ", ".join(SPEED_BANDS)
+
+    return f"""{RELATORIO_FLUXO_HORA_SCHEMA}
+
+{RELATORIO_FLUXO_DIA_SCHEMA}
+
+DELETE FROM relatorio_fluxo_hora WHERE {period};
+INSERT INTO relatorio_fluxo_hora (data, hora, equipamento, {band_list}, qtd_31a70km, qtd_total, registros)
+SELECT
+    data,
+    hora,
+    equipamento,
+{band_sums},
+    SUM({sum_31_70}),
+    SUM({sum_total}),
+    COUNT(*)
+FROM relatorio_fluxo
+WHERE {period}
+GROUP BY data, hora, equipamento;
+
+DELETE FROM relatorio_fluxo_dia WHERE {period};
+INSERT INTO relatorio_fluxo_dia (data, equipamento, {band_list}, qtd_31a70km, qtd_total, registros)
+SELECT
+    data,
+    equipamento,
+{band_sums},
+    SUM(qtd_31a70km),
+    SUM(qtd_total),
+    SUM(registros)
+FROM relatorio_fluxo_hora
+WHERE {period}
+GROUP BY data, equipamento;"""
+
+
+def semaforos_rollup_sql() -> str:
+    """Recalcula a contagem de semáforos por bairro e funcionamento (tabela pequena: sempre completa)"""
+    return f"""{SEMAFOROS_BAIRRO_SCHEMA}
+
+DELETE FROM semaforos_bairro_funcionamento;
+INSERT INTO semaforos_bairro_funcionamento (bairro, funcionamento, total)
+SELECT bairro, funcionamento, COUNT(*)
+FROM semaforos
+GROUP BY bairro, funcionamento;"""
+
+
+def rollup_refresh_sql(table_name: str, bounds: Optional[Tuple[str, str]] = None) -> Optional[str]:
+    """
+    SQL que atualiza os agregados que dependem da tabela carregada, limitado ao
+    intervalo de datas quando informado. None se nenhum agregado depende da tabela
+    """
+    if table_name == 'relatorio_fluxo':
+        return relatorio_fluxo_rollup_sql(bounds)
+    if table_name == 'semaforos':
+        return semaforos_rollup_sql()
+    return None
+
+
+# Tabela de origem -> agregados calculados a partir dela
+ROLLUP_SOURCES: Dict[str, str] = {
+    'relatorio_fluxo': 'relatorio_fluxo_hora, relatorio_fluxo_dia',
+    'semaforos': 'semaforos_bairro_funcionamento',
+}
+
+
+def main():
+    """Reconstrói todos os agregados a partir das tabelas carregadas no banco"""
+    from copy_loader import get_connection
+    from generate_sql_inserts import detect_project_root
+
+    parser = argparse.ArgumentParser(description="Reconstrói as tabelas de agregados usadas pelo dashboard")
+    parser.add_argument("--tabelas", nargs="*", choices=sorted(ROLLUP_SOURCES),
+                        help="Reconstrói apenas os agregados destas tabelas de origem")
+    args = parser.parse_args()
+
+    print("=== RECONSTRUÇÃO DOS AGREGADOS DO DASHBOARD ===\n")
+
+    project_root = detect_project_root()
+    try:
+        conn = get_connection(project_root)
+    except Exception as e:
+        print(f"[ERRO] Não foi possível conectar ao PostgreSQL: {e}")
+        return
+
+    success = 0
+    errors = 0
+    try:
+        for source, rollups in ROLLUP_SOURCES.items():
+            if args.tabelas and source not in args.tabelas:
+                continue
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(rollup_refresh_sql(source))
+                conn.commit()
+                print(f"[OK] {rollups} (a partir de {source})")
+                success += 1
+            except Exception as e:
+                conn.rollback()
+                print(f"[ERRO] Falha ao reconstruir {rollups}: {e}")
+                errors += 1
+    finally:
+        conn.close()
+
+    print("\n=== RESUMO ===")
+    print(f"[SUCESSO] Agregados reconstruídos: {success}")
+    print(f"[ERRO] Erros: {errors}")
+
+
+if __name__ == "__main__":
+    main()
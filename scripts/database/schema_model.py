@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Modelo em memória do schema de uma tabela: colunas, tipos, chaves e a regra de
+literal SQL de cada coluna.
+
+O schema é interpretado uma única vez por tabela (de um arquivo em database/schemas
+ou inferido do DataFrame, no GTFS) e o mesmo objeto conduz:
+- a renderização dos valores (generate_sql_inserts.render_sql_rows), que consulta
+  a regra já decidida de cada coluna em vez de reexaminar nomes e tipos a cada célula;
+- a emissão do CREATE TABLE dos schemas inferidos, com as PRIMARY KEYs do GTFS
+  declaradas em GTFS_PRIMARY_KEYS em vez de corrigidas no texto por regex;
+- os tipos usados pelo COPY (copy_loader.py) e pela conversão para Parquet.
+"""
+
+import re
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Limite do INTEGER usado para IDs numéricos em colunas texto
+SQL_INTEGER_LIMIT = 2147483647
+
+# Regras de literal SQL por coluna (decididas uma única vez por tabela)
+RULE_QUOTED = 'quoted'          # telefone/email/URL: sempre string
+RULE_TEXT_ID = 'text_id'        # VARCHAR/TEXT com 'id' no nome: números pequenos sem aspas
+RULE_TEXT = 'text'              # VARCHAR/TEXT: sempre string
+RULE_PLAIN = 'plain'            # demais: números sem aspas, textos com aspas
+
+# Chaves primárias das tabelas GTFS cuja chave não é a primeira coluna (trecho do nome -> colunas)
+GTFS_PRIMARY_KEYS = {
+    'trips': ['trip_id'],
+    # mesmo service_id pode ter múltiplas datas
+    'calendar_dates': ['service_id', 'date'],
+    # mesmo fare_id pode ter múltiplos route_id
+    'fare_rules': ['fare_id', 'route_id'],
+    # mesmo shape_id tem múltiplos pontos
+    'shapes': ['shape_id', 'shape_pt_sequence'],
+    # mesmo trip_id tem múltiplas paradas
+    'stop_times': ['trip_id', 'stop_sequence'],
+    # um registro por serviço ativo em cada dia (gtfs_calendar.py)
+    'service_days': ['date', 'service_id'],
+    # geometria completa e simplificadas de cada traçado (gtfs_shapes.py)
+    'shape_geometries': ['shape_id', 'tolerancia_m'],
+}
+
+# Coluna preenchida pelo banco, nunca pelos arquivos
+CREATED_AT_SQL = "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+
+# Linhas de restrição da tabela dentro do CREATE TABLE (não são colunas)
+CONSTRAINT_WORDS = ('PRIMARY', 'UNIQUE', 'CONSTRAINT', 'CHECK', 'FOREIGN', 'EXCLUDE')
+TABLE_NAME = re.compile(r'CREATE TABLE (?:IF NOT EXISTS )?(\w+)', re.IGNORECASE)
+TABLE_PRIMARY_KEY = re.compile(r'PRIMARY\s+KEY\s*\(([^)]*)\)', re.IGNORECASE)
+
+
+def normalize_type(sql_type: Optional[str]) -> Optional[str]:
+    """
+    Tipo simplificado usado nas regras de literal e no COPY, a partir da primeira
+    palavra do tipo declarado. A ordem dos testes é a original (TIMESTAMP cai em TIME)
+    """
+    if not sql_type:
+        return None
+    col_type = sql_type.split()[0].upper()
+    if 'VARCHAR' in col_type or 'TEXT' in col_type:
+        return 'TEXT'
+    if 'INTEGER' in col_type or 'INT' in col_type:
+        return 'INTEGER'
+    if 'DECIMAL' in col_type or 'NUMERIC' in col_type or 'FLOAT' in col_type or 'REAL' in col_type:
+        return 'DECIMAL'
+    if 'DATE' in col_type:
+        return 'DATE'
+    if 'TIME' in col_type:
+        return 'TIME'
+    if 'BOOLEAN' in col_type or 'BOOL' in col_type:
+        return 'BOOLEAN'
+    return col_type
+
+
+def compile_column_rule(col_name: Optional[str], col_type: Optional[str]) -> str:
+    """Decide a regra de literal SQL de uma coluna (mesma lógica de escape_sql_value)"""
+    name = col_name.lower() if col_name else ""
+    if 'phone' in name or 'email' in name or 'url' in name:
+        return RULE_QUOTED
+    if col_type and ('VARCHAR' in col_type.upper() or 'TEXT' in col_type.upper()):
+        if col_name and 'id' in name:
+            return RULE_TEXT_ID
+        return RULE_TEXT
+    return RULE_PLAIN
+
+
+def _quote(value) -> str:
+    value_str = str(value).replace("'", "''")
+    return f"'{value_str}'"
+
+
+def encode_literal(value, rule: str, col_type: Optional[str]) -> str:
+    """
+    Literal SQL de um valor com a regra e o tipo já decididos para a coluna.
+    Equivalente a escape_sql_value, sem reexaminar o nome e o tipo a cada célula
+    """
+    if pd.isna(value) or value is None:
+        return "NULL"
+    if isinstance(value, (np.integer, np.floating)):
+        value = value.item()
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if rule == RULE_QUOTED:
+        return _quote(value)
+    if rule in (RULE_TEXT, RULE_TEXT_ID):
+        if rule == RULE_TEXT_ID and isinstance(value, (int, float)) and value < SQL_INTEGER_LIMIT:
+            return str(value)
+        return _quote(value)
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, pd.Timestamp):
+        if col_type == "DATE":
+            return f"'{value.strftime('%Y-%m-%d')}'"
+        if col_type == "TIME":
+            return f"'{value.strftime('%H:%M:%S')}'"
+        return f"'{value.strftime('%Y-%m-%d %H:%M:%S')}'"
+    return _quote(value)
+
+
+@dataclass
+class Column:
+    """Coluna de uma tabela: nome, tipo declarado (ex.: VARCHAR(255)) e se é a chave primária"""
+    name: str
+    sql_type: str
+    primary_key: bool = False
+    type: Optional[str] = field(init=False)
+
+    def __post_init__(self):
+        self.type = normalize_type(self.sql_type)
+
+    def definition(self) -> str:
+        """Linha da coluna no CREATE TABLE"""
+        return f"    {self.name} {self.sql_type}{' PRIMARY KEY' if self.primary_key else ''},"
+
+
+@dataclass
+class TableSchema:
+    """
+    Schema de uma tabela. typed_literals=False nos schemas inferidos do próprio
+    DataFrame (GTFS): os valores já têm o tipo da coluna, e só o nome decide o literal
+    """
+    name: str
+    columns: List[Column] = field(default_factory=list)
+    primary_key: List[str] = field(default_factory=list)
+    typed_literals: bool = True
+    rules: Dict[str, str] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.rules = {col.name: compile_column_rule(col.name, col.type if self.typed_literals else None)
+                      for col in self.columns}
+
+    @property
+    def column_types(self) -> Dict[str, str]:
+        """Coluna -> tipo simplificado (TEXT, INTEGER, DECIMAL, DATE, TIME, BOOLEAN...)"""
+        return {col.name: col.type for col in self.columns}
+
+    @property
+    def literal_types(self) -> Dict[str, str]:
+        """Tipos considerados na renderização dos literais (vazio nos schemas inferidos)"""
+        return self.column_types if self.typed_literals else {}
+
+    def rule(self, col_name: str) -> str:
+        """Regra de literal da coluna (colunas fora do schema: decidida só pelo nome)"""
+        rule = self.rules.get(col_name)
+        return rule if rule is not None else compile_column_rule(col_name, None)
+
+    def literal_type(self, col_name: str) -> Optional[str]:
+        return self.literal_types.get(col_name)
+
+    def renamed(self, name: str) -> 'TableSchema':
+        """Cópia do schema com outro nome de tabela (ex.: prefixo gtfs_)"""
+        return replace(self, name=name)
+
+    def to_sql(self) -> str:
+        """CREATE TABLE da tabela, com created_at preenchido pelo banco"""
+        lines = [f"CREATE TABLE IF NOT EXISTS {self.name} ("]
+        lines += [col.definition() for col in self.columns]
+        if self.primary_key:
+            lines.append(f"    PRIMARY KEY ({', '.join(self.primary_key)}),")
+        lines.append(f"    {CREATED_AT_SQL}")
+        lines.append(");")
+        return "\n".join(lines)
+
+    @classmethod
+    def from_column_types(cls, name: str, column_types: Dict[str, str]) -> 'TableSchema':
+        """Schema a partir de um mapeamento coluna -> tipo"""
+        return cls(name, [Column(col, col_type) for col, col_type in column_types.items()])
+
+    @classmethod
+    def from_sql(cls, content: str) -> 'TableSchema':
+        """
+        Interpreta um CREATE TABLE. Só as colunas entre os parênteses do CREATE TABLE
+        entram no modelo: depois dele podem vir índices, partições e colunas geradas,
+        que não recebem valores dos arquivos. created_at fica de fora (gerado pelo banco)
+        """
+        match = TABLE_NAME.search(content) if "CREATE TABLE" in content else None
+        name = match.group(1) if match else None
+
+        columns = []
+        primary_key = []
+        in_table = False
+        for line in content.split('\n'):
+            line = line.strip()
+            if not in_table:
+                in_table = line.upper().startswith('CREATE TABLE')
+                continue
+            if line.startswith(')'):
+                break
+            if line.startswith('--') or not line:
+                continue
+            if line.endswith(','):
+                line = line[:-1]
+
+            parts = line.split()
+            if len(parts) < 2:
+                continue
+            if parts[0].upper() in CONSTRAINT_WORDS:
+                key = TABLE_PRIMARY_KEY.search(line)
+                if key:
+                    primary_key = [col.strip() for col in key.group(1).split(',')]
+                continue
+            if parts[0] == 'created_at':
+                continue
+            declaration = line.split(None, 1)[1]
+            is_key = re.search(r'\s+PRIMARY\s+KEY\b', declaration, re.IGNORECASE)
+            if is_key:
+                declaration = declaration[:is_key.start()] + declaration[is_key.end():]
+            columns.append(Column(parts[0], declaration.strip(), bool(is_key)))
+        return cls(name, columns, primary_key)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, name: str) -> Optional['TableSchema']:
+        """
+        Infere o schema de um DataFrame (tabelas GTFS, que não têm schema em arquivo).
+        Retorna None para um DataFrame vazio
+        """
+        if df is None or df.empty:
+            return None
+
+        composite = gtfs_primary_key(name)
+        columns = []
+        for i, (col, dtype) in enumerate(df.dtypes.items()):
+            sql_type = infer_sql_type(df, col, dtype)
+            if composite:
+                # trips tem chave simples (trip_id); as demais, chave composta da tabela
+                is_key = len(composite) == 1 and col == composite[0]
+            else:
+                # Nas outras tabelas GTFS, a primeira coluna geralmente é o ID
+                is_key = i == 0 and 'id' in col.lower()
+            columns.append(Column(col.replace('-', '_'), sql_type, is_key))
+
+        table_key = composite if composite and len(composite) > 1 else []
+        return cls(name, columns, table_key, typed_literals=False)
+
+
+def gtfs_primary_key(table_name: str) -> Optional[List[str]]:
+    """Chave primária declarada em GTFS_PRIMARY_KEYS para a tabela, se houver"""
+    for key, columns in GTFS_PRIMARY_KEYS.items():
+        if key in table_name.lower():
+            return columns
+    return None
+
+
+def infer_sql_type(df: pd.DataFrame, col: str, dtype) -> str:
+    """Tipo SQL de uma coluna do DataFrame, com as correções dos tipos de dados GTFS"""
+    if dtype == 'int64' or str(dtype) == 'Int64':
+        sql_type = "INTEGER"
+    elif dtype == 'float64':
+        sql_type = "DECIMAL(10, 2)"
+    elif dtype == 'object':
+        # Para strings, verificar tamanho máximo
+        try:
+            max_len = df[col].astype(str).str.len().max()
+            if pd.isna(max_len) or max_len > 255:
+                sql_type = "TEXT"
+            else:
+                sql_type = f"VARCHAR({max(255, int(max_len))})"
+        except Exception:
+            sql_type = "TEXT"
+    elif 'datetime' in str(dtype):
+        sql_type = "TIMESTAMP"
+    else:
+        sql_type = "TEXT"
+
+    # Coordenadas com precisão correta
+    if col in ['stop_lat', 'stop_lon', 'shape_pt_lat', 'shape_pt_lon']:
+        sql_type = "DECIMAL(10, 8)"
+    # Horários GTFS: VARCHAR porque o GTFS permite horas >= 24 (dia seguinte, ex.: 24:00:05)
+    if col in ['arrival_time', 'departure_time']:
+        sql_type = "VARCHAR(10)"
+    # Horários em segundos desde o início do dia de serviço (arrival_time_seconds etc.)
+    if col.endswith('_seconds'):
+        sql_type = "INTEGER"
+    # Datas como DATE em vez de TIMESTAMP
+    if col in ['start_date', 'end_date', 'date', 'feed_start_date', 'feed_end_date']:
+        sql_type = "DATE"
+    # Telefones, emails e URLs sempre como VARCHAR (mesmo que sejam numéricos)
+    if 'phone' in col.lower() or 'email' in col.lower() or 'url' in col.lower():
+        sql_type = "VARCHAR(255)"
+    return sql_type
+
+
+@lru_cache(maxsize=None)
+def load_schema(schema_path: str) -> Optional[TableSchema]:
+    """Schema de um arquivo, interpretado uma única vez por processo. None se não puder ser lido"""
+    try:
+        with open(schema_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except Exception as e:
+        print(f"[ERRO] Erro ao ler schema {schema_path}: {e}")
+        return None
+    return TableSchema.from_sql(content)
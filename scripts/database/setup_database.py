@@ -1,7 +1,273 @@
 #!/usr/bin/env python3
 """
-Script básico para configuração do banco de dados
+Configuração completa do banco de dados em um comando.
+
+Etapas:
+1. testa a conexão (variáveis do .env) e a extensão PostGIS;
+2. aplica todos os schemas de database/schemas (e das tabelas de agregados) em paralelo,
+   sem os índices e sem as chaves primárias;
+3. carrega todos os arquivos processados (CSV/Parquet, GTFS e camadas GeoJSON) via COPY,
+   usando um pool de conexões: tabelas independentes são carregadas ao mesmo tempo e os
+   arquivos de uma mesma tabela (partições mensais do relatorio_fluxo) em sequência;
+4. valida os dados e cria, também em paralelo, as chaves primárias, os índices e as
+   chaves estrangeiras do GTFS (deferred_ddl.py), com um relatório de validação;
+5. reconstrói os agregados do dashboard e atualiza as estatísticas (ANALYZE).
+
+Uso:
+    python scripts/database/setup_database.py --jobs 4
+    python scripts/database/setup_database.py --truncar          # recarga completa
 """
 
-print("Script de configuração do banco de dados")
-print("Este script será desenvolvido conforme necessário")
\ No newline at end of file
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from psycopg2.pool import ThreadedConnectionPool
+
+from copy_loader import connection_params, get_connection, list_load_jobs, load_csv_with_copy
+from deferred_ddl import (
+    deferred_task,
+    drop_foreign_keys_sql,
+    gtfs_deferred_ddl,
+    ordered_ddl,
+    print_validation_report,
+    split_deferred_ddl,
+)
+from generate_sql_inserts import detect_project_root, monthly_report_period
+from geojson_loader import LAYERS, load_layer
+from processed_io import csv_filename
+from rollups import (
+    RELATORIO_FLUXO_DIA_SCHEMA,
+    RELATORIO_FLUXO_HORA_SCHEMA,
+    ROLLUP_SOURCES,
+    SEMAFOROS_BAIRRO_SCHEMA,
+    rollup_refresh_sql,
+)
+
+# Conexões simultâneas usadas por padrão
+DEFAULT_JOBS = 4
+
+# Schemas das tabelas de agregados (não ficam em database/schemas)
+ROLLUP_SCHEMAS = {
+    'relatorio_fluxo_hora': RELATORIO_FLUXO_HORA_SCHEMA,
+    'relatorio_fluxo_dia': RELATORIO_FLUXO_DIA_SCHEMA,
+    'semaforos_bairro_funcionamento': SEMAFOROS_BAIRRO_SCHEMA,
+}
+
+
+def check_connection(conn) -> bool:
+    """Mostra as versões do PostgreSQL e do PostGIS. False se o PostGIS não puder ser habilitado"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT version()")
+        print(f"[OK] Conectado: {cursor.fetchone()[0]}")
+        try:
+            # Criada uma única vez antes dos schemas paralelos (CREATE EXTENSION concorrente falha)
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+            cursor.execute("SELECT postgis_version()")
+            print(f"[OK] PostGIS: {cursor.fetchone()[0]}")
+        except Exception as e:
+            conn.rollback()
+            print(f"[ERRO] PostGIS indisponível: {e}")
+            return False
+    conn.commit()
+    return True
+
+
+def run_parallel(pool: ThreadedConnectionPool, tasks: List[Tuple[str, Callable]], jobs: int) -> Dict[str, object]:
+    """
+    Executa as tarefas (nome, função(conn)) em paralelo, cada uma com uma conexão do
+    pool. Retorna nome -> resultado (ou a exceção, se a tarefa falhou)
+    """
+    def run(task):
+        name, func = task
+        conn = pool.getconn()
+        try:
+            return name, func(conn)
+        except Exception as e:
+            conn.rollback()
+            return name, e
+        finally:
+            pool.putconn(conn)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return dict(executor.map(run, tasks))
+
+
+def execute_sql(sql: str) -> Callable:
+    """Tarefa que executa um SQL e faz commit"""
+    def task(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(sql)
+        conn.commit()
+        return True
+    return task
+
+
+def schema_tasks(schemas_dir: str, deferred_ddl: List[Dict]) -> List[Tuple[str, Callable]]:
+    """Uma tarefa por schema (arquivos de database/schemas e agregados), sem índices e chaves"""
+    sources = {}
+    for schema_file in sorted(os.listdir(schemas_dir)):
+        if schema_file.endswith(".sql"):
+            with open(os.path.join(schemas_dir, schema_file), 'r', encoding='utf-8') as f:
+                sources[schema_file] = f.read()
+    sources.update(ROLLUP_SCHEMAS)
+
+    tasks = []
+    for name, content in sources.items():
+        create_sql, deferred = split_deferred_ddl(content)
+        deferred_ddl.extend(deferred)
+        tasks.append((name, execute_sql(create_sql)))
+    return tasks
+
+
+def table_key(csv_path: str, gtfs: bool) -> str:
+    """Tabela de destino de um arquivo processado (os relatórios mensais vão todos para relatorio_fluxo)"""
+    filename = csv_filename(os.path.basename(csv_path))
+    if monthly_report_period(filename):
+        return 'relatorio_fluxo'
+    base = filename.replace("_clean.csv", "").replace(".csv", "")
+    return f"gtfs_{base}" if gtfs else base
+
+
+def load_tasks(project_root: str, truncate: bool, deferred_ddl: List[Dict],
+               terms: Optional[List[str]] = None) -> List[Tuple[str, Callable]]:
+    """
+    Uma tarefa por tabela: os arquivos da mesma tabela são carregados em sequência na
+    mesma conexão. As tabelas com mais dados vêm primeiro, para equilibrar o paralelismo
+    """
+    groups: Dict[str, List[Tuple[str, Optional[str], bool]]] = {}
+    for csv_path, schema_path, gtfs in list_load_jobs(project_root):
+        if terms and not any(t in os.path.basename(csv_path) for t in terms):
+            continue
+        groups.setdefault(table_key(csv_path, gtfs), []).append((csv_path, schema_path, gtfs))
+
+    def load_group(files):
+        def task(conn):
+            loaded = 0
+            for csv_path, schema_path, gtfs in files:
+                table_name, num_records = load_csv_with_copy(conn, csv_path, schema_path, gtfs, truncate,
+                                                             project_root=project_root, refresh_rollups=False,
+                                                             deferred_ddl=deferred_ddl)
+                if not table_name:
+                    raise RuntimeError(f"falha ao carregar {os.path.basename(csv_path)}")
+                loaded += num_records
+            return loaded
+        return task
+
+    def group_size(files):
+        return sum(os.path.getsize(path) for path, _, _ in files)
+
+    tasks = [(table, load_group(files))
+             for table, files in sorted(groups.items(), key=lambda item: -group_size(item[1]))]
+
+    for layer, config in LAYERS.items():
+        if terms and not any(t in config['arquivo'] for t in terms):
+            continue
+        if os.path.exists(os.path.join(project_root, "data", "processed", config['arquivo'])):
+            tasks.append((config['tabela'], lambda conn, layer=layer: load_layer(conn, layer, project_root)[0]))
+    return tasks
+
+
+def report(results: Dict[str, object], ok_message: Callable[[str, object], str]) -> int:
+    """Imprime o resultado de cada tarefa. Retorna o número de erros"""
+    errors = 0
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            print(f"[ERRO] {name}: {result}")
+            errors += 1
+        else:
+            print(ok_message(name, result))
+    return errors
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Cria os schemas e carrega todos os dados processados no PostgreSQL")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"Conexões simultâneas usadas nos schemas, na carga e nos índices (padrão: {DEFAULT_JOBS})")
+    parser.add_argument("--truncar", action="store_true",
+                        help="Esvazia cada tabela antes de carregar (recarga completa)")
+    parser.add_argument("--tabelas", nargs="*",
+                        help="Carrega apenas os arquivos cujo nome contém algum destes termos")
+    args = parser.parse_args()
+
+    print("=== CONFIGURAÇÃO DO BANCO DE DADOS ===\n")
+
+    project_root = detect_project_root()
+    schemas_dir = os.path.join(project_root, "database", "schemas")
+    print(f"[INFO] Diretório do projeto: {project_root}")
+    jobs = max(1, args.jobs)
+    started = time.perf_counter()
+
+    # 1) Conexão
+    print("\n--- Testando conexão ---")
+    try:
+        conn = get_connection(project_root)
+    except Exception as e:
+        print(f"[ERRO] Não foi possível conectar ao PostgreSQL: {e}")
+        print("[INFO] Verifique o .env (DATABASE_URL ou DB_HOST/DB_PORT/POSTGRES_*) e se o container está rodando")
+        return
+    try:
+        if not check_connection(conn):
+            return
+    finally:
+        conn.close()
+
+    pool = ThreadedConnectionPool(1, jobs, **connection_params(project_root))
+    deferred_ddl: List[Dict] = []
+    errors = 0
+    try:
+        # 2) Schemas
+        step = time.perf_counter()
+        print(f"\n--- Aplicando schemas ({jobs} conexões) ---")
+        results = run_parallel(pool, schema_tasks(schemas_dir, deferred_ddl), jobs)
+        errors += report(results, lambda name, _: f"[OK] {name}")
+        print(f"[INFO] Schemas aplicados em {time.perf_counter() - step:.1f}s")
+
+        # 3) Dados
+        step = time.perf_counter()
+        print(f"\n--- Carregando dados ({jobs} conexões) ---")
+        # Chaves estrangeiras de uma execução anterior: recriadas no passo 4
+        errors += report(run_parallel(pool, [("Chaves estrangeiras removidas", execute_sql(drop_foreign_keys_sql()))], 1),
+                         lambda name, _: f"[OK] {name}")
+        results = run_parallel(pool, load_tasks(project_root, args.truncar, deferred_ddl, args.tabelas), jobs)
+        print()
+        errors += report(results, lambda name, rows: f"[OK] {name}: {rows} registros")
+        print(f"[INFO] Dados carregados em {time.perf_counter() - step:.1f}s")
+
+        # 4) Chaves e índices, depois dos dados: primárias, índices e estrangeiras, nesta ordem
+        step = time.perf_counter()
+        loaded = [name for name, result in results.items() if not isinstance(result, Exception)]
+        stages = ordered_ddl(deferred_ddl + gtfs_deferred_ddl(loaded))
+        print(f"\n--- Criando {sum(len(stage) for stage in stages)} chaves e índices ---")
+        validation = []
+        for stage in stages:
+            stage_results = run_parallel(pool, [(item['sql'], deferred_task(item)) for item in stage], jobs)
+            validation += [(item, stage_results[item['sql']]) for item in stage]
+        errors += print_validation_report(validation)
+        print(f"[INFO] Chaves e índices criados em {time.perf_counter() - step:.1f}s")
+
+        # 5) Agregados e estatísticas
+        step = time.perf_counter()
+        print("\n--- Agregados do dashboard e estatísticas ---")
+        tasks = [(rollups, execute_sql(rollup_refresh_sql(source))) for source, rollups in ROLLUP_SOURCES.items()]
+        tasks.append(("ANALYZE", execute_sql("ANALYZE")))
+        # Em sequência: o ANALYZE deve ver os agregados prontos
+        results = run_parallel(pool, tasks, 1)
+        errors += report(results, lambda name, _: f"[OK] {name}")
+        print(f"[INFO] Agregados e estatísticas em {time.perf_counter() - step:.1f}s")
+    finally:
+        pool.closeall()
+
+    print("\n=== RESUMO ===")
+    print(f"[INFO] Tempo total: {time.perf_counter() - started:.1f}s")
+    if errors:
+        print(f"[ERRO] Erros: {errors}")
+    else:
+        print("[SUCESSO] Banco configurado e carregado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Junção espacial entre a Faixa Azul e os pontos da cidade (etapa do ETL).
+
+Liga cada trecho da Faixa Azul (faixaazul_clean.geojson) aos semáforos, aos
+equipamentos de medição de velocidade, às câmeras do monitoramento CTTU e às
+paradas GTFS próximas, sem depender do PostGIS. Gera duas tabelas de ligação na
+camada processada:
+
+- faixaazul_proximidade: pares (trecho, ponto) a até --raio metros;
+- faixaazul_mais_proxima: para cada ponto, o trecho mais próximo e a distância.
+
+As coordenadas são projetadas em metros (equiretangular local, suficiente na
+escala de uma cidade) e os trechos são quebrados em segmentos curtos indexados
+numa k-d tree (scipy.spatial.cKDTree). Cada ponto só calcula a distância exata
+até os segmentos candidatos devolvidos pelo índice, em vez de todos contra todos.
+
+Uso (depois da limpeza, antes de gerar o SQL ou da carga via COPY):
+    python scripts/database/spatial_join.py --raio 100
+"""
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from scipy.spatial import cKDTree
+
+from generate_sql_inserts import detect_project_root
+from geojson_loader import LAYERS, iter_features
+from processed_io import OUTPUT_FORMATS, find_processed_file, read_processed, save_processed
+
+# Raio médio da Terra em metros
+EARTH_RADIUS_M = 6371008.8
+
+# Raio padrão (metros) para considerar um ponto "na" Faixa Azul
+DEFAULT_RADIUS_M = 100.0
+
+# Segmentos maiores que isso são subdivididos: o índice usa o ponto médio de cada
+# segmento, e a busca precisa ampliar o raio em meio segmento
+MAX_SEGMENT_M = 50.0
+
+FAIXAAZUL_FILE = "faixaazul_clean.geojson"
+
+# Conjunto -> (arquivo processado relativo a data/processed, coluna id, latitude, longitude)
+POINT_DATASETS: Dict[str, Tuple[str, str, str, str]] = {
+    'semaforos': ("semaforos_clean.csv", '_id', 'latitude', 'longitude'),
+    'equipamentos_medicao_velocidade': ("equipamentos_medicao_velocidade_clean.csv", '_id', 'latitude', 'longitude'),
+    'monitoramento_cttu': ("monitoramento_cttu_clean.csv", 'nome', 'latitude', 'longitude'),
+    'gtfs_stops': (os.path.join("gtfs", "stops_clean.csv"), 'stop_id', 'stop_lat', 'stop_lon'),
+}
+
+PROXIMITY_FILE = "faixaazul_proximidade_clean.csv"
+NEAREST_FILE = "faixaazul_mais_proxima_clean.csv"
+
+
+def project_to_meters(lat: np.ndarray, lon: np.ndarray, lat0: float) -> np.ndarray:
+    """Projeção equiretangular em torno da latitude lat0. Retorna array (n, 2) em metros"""
+    x = np.radians(lon) * EARTH_RADIUS_M * np.cos(np.radians(lat0))
+    y = np.radians(lat) * EARTH_RADIUS_M
+    return np.column_stack([x, y])
+
+
+def point_segment_distance(points: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Distância de cada ponto ao segmento [start, end] da mesma linha (vetorizado)"""
+    seg = ends - starts
+    rel = points - starts
+    length2 = np.einsum('ij,ij->i', seg, seg)
+    t = np.divide(np.einsum('ij,ij->i', rel, seg), length2, out=np.zeros(len(points)), where=length2 > 0)
+    closest = starts + np.clip(t, 0.0, 1.0)[:, None] * seg
+    return np.hypot(*(points - closest).T)
+
+
+class SegmentIndex:
+    """Índice espacial de polilinhas: k-d tree sobre os pontos médios dos segmentos"""
+
+    def __init__(self, lines: List[np.ndarray], max_segment: float = MAX_SEGMENT_M):
+        starts, ends, owners = [], [], []
+        for line_idx, coords in enumerate(lines):
+            if len(coords) < 2:
+                continue
+            a, b = coords[:-1], coords[1:]
+            # Subdivide os segmentos longos em partes de até max_segment metros
+            pieces = np.maximum(np.ceil(np.hypot(*(b - a).T) / max_segment), 1).astype(int)
+            step = np.repeat(np.arange(len(a)), pieces)
+            frac = np.concatenate([np.arange(n) / n for n in pieces])
+            frac_next = np.concatenate([np.arange(1, n + 1) / n for n in pieces])
+            delta = (b - a)[step]
+            starts.append(a[step] + frac[:, None] * delta)
+            ends.append(a[step] + frac_next[:, None] * delta)
+            owners.append(np.full(len(step), line_idx))
+
+        self.starts = np.concatenate(starts) if starts else np.empty((0, 2))
+        self.ends = np.concatenate(ends) if ends else np.empty((0, 2))
+        self.owners = np.concatenate(owners) if owners else np.empty(0, dtype=int)
+        half = np.hypot(*(self.ends - self.starts).T) / 2
+        # Um segmento a distância d de um ponto tem o ponto médio a no máximo d + meio segmento
+        self.max_half = float(half.max()) if len(half) else 0.0
+        self.tree = cKDTree((self.starts + self.ends) / 2)
+
+    def _candidates(self, points: np.ndarray, radius) -> Tuple[np.ndarray, np.ndarray]:
+        """Pares (ponto, segmento) cujo ponto médio está dentro do raio (escalar ou por ponto)"""
+        found = self.tree.query_ball_point(points, np.asarray(radius) + self.max_half)
+        counts = np.fromiter((len(c) for c in found), dtype=int, count=len(found))
+        point_idx = np.repeat(np.arange(len(points)), counts)
+        seg_idx = np.concatenate([np.asarray(c, dtype=int) for c in found]) if counts.sum() else np.empty(0, dtype=int)
+        return point_idx, seg_idx
+
+    def _line_distances(self, points: np.ndarray, point_idx: np.ndarray, seg_idx: np.ndarray) -> pd.DataFrame:
+        """Menor distância exata de cada par (ponto, linha) entre os segmentos candidatos"""
+        dist = point_segment_distance(points[point_idx], self.starts[seg_idx], self.ends[seg_idx])
+        pairs = pd.DataFrame({'ponto': point_idx, 'linha': self.owners[seg_idx], 'distancia': dist})
+        return pairs.groupby(['ponto', 'linha'], as_index=False, sort=True)['distancia'].min()
+
+    def within(self, points: np.ndarray, radius: float) -> pd.DataFrame:
+        """Pares (ponto, linha, distancia) com a linha a até radius metros do ponto"""
+        if not len(points) or not len(self.owners):
+            return pd.DataFrame({'ponto': [], 'linha': [], 'distancia': []})
+        pairs = self._line_distances(points, *self._candidates(points, radius))
+        return pairs[pairs['distancia'] <= radius].reset_index(drop=True)
+
+    def nearest(self, points: np.ndarray) -> pd.DataFrame:
+        """Linha mais próxima de cada ponto (ponto, linha, distancia)"""
+        if not len(points) or not len(self.owners):
+            return pd.DataFrame({'ponto': [], 'linha': [], 'distancia': []})
+        # O ponto médio mais próximo limita a distância ao segmento mais próximo:
+        # basta examinar os segmentos com ponto médio até esse limite + meio segmento
+        bound, _ = self.tree.query(points)
+        pairs = self._line_distances(points, *self._candidates(points, bound))
+        best = pairs.sort_values(['ponto', 'distancia'], kind='stable').drop_duplicates('ponto')
+        return best.reset_index(drop=True)
+
+
+def load_faixaazul(geojson_path: str) -> pd.DataFrame:
+    """
+    Trechos da Faixa Azul: faixa_nome (a chave natural name da tabela faixaazul) e
+    coordenadas. Mesmas features que a carga do geojson_loader.py mantém: sem geometria
+    ou sem nome ficam de fora e, com nome repetido, vale a última do arquivo
+    """
+    name_property = LAYERS['faixaazul']['colunas']['name']
+    geometries = {}
+    for feature in iter_features(geojson_path):
+        geometry = feature.get('geometry')
+        name = (feature.get('properties') or {}).get(name_property)
+        if geometry and name is not None:
+            geometries[name] = geometry
+
+    rows = []
+    for name, geometry in geometries.items():
+        if geometry.get('type') == 'LineString':
+            parts = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiLineString':
+            parts = geometry['coordinates']
+        else:
+            continue
+        for part in parts:
+            coords = np.asarray(part, dtype=float)[:, :2]
+            rows.append({'faixa_nome': name, 'lon': coords[:, 0], 'lat': coords[:, 1]})
+    return pd.DataFrame(rows, columns=['faixa_nome', 'lon', 'lat'])
+
+
+def load_points(processed_dir: str, datasets: Optional[List[str]] = None) -> pd.DataFrame:
+    """Pontos dos conjuntos disponíveis (todos, ou só os de datasets): conjunto, ponto_id, lat, lon"""
+    frames = []
+    for dataset, (relative_csv, id_col, lat_col, lon_col) in POINT_DATASETS.items():
+        if datasets is not None and dataset not in datasets:
+            continue
+        path = find_processed_file(processed_dir, relative_csv)
+        if not path:
+            print(f"[AVISO] {relative_csv} não encontrado, pulando {dataset}")
+            continue
+        df = read_processed(path)
+        points = pd.DataFrame({
+            'conjunto': dataset,
+            'ponto_id': df[id_col].astype(str),
+            'lat': pd.to_numeric(df[lat_col], errors='coerce'),
+            'lon': pd.to_numeric(df[lon_col], errors='coerce'),
+        }).dropna(subset=['lat', 'lon'])
+        print(f"[OK] {dataset}: {len(points)} pontos com coordenadas")
+        frames.append(points)
+    if not frames:
+        return pd.DataFrame(columns=['conjunto', 'ponto_id', 'lat', 'lon'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def spatial_join(lines: pd.DataFrame, points: pd.DataFrame,
+                 radius: float) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Calcula as tabelas faixaazul_proximidade e faixaazul_mais_proxima"""
+    all_lat = np.concatenate([np.concatenate(lines['lat'].tolist()), points['lat'].to_numpy()])
+    lat0 = float(all_lat.mean())
+
+    index = SegmentIndex([project_to_meters(lat, lon, lat0) for lat, lon in zip(lines['lat'], lines['lon'])])
+    xy = project_to_meters(points['lat'].to_numpy(), points['lon'].to_numpy(), lat0)
+
+    def attach(pairs: pd.DataFrame) -> pd.DataFrame:
+        """Troca os índices internos pelos identificadores dos trechos e dos pontos"""
+        ponto = pairs['ponto'].to_numpy(dtype=int)
+        linha = pairs['linha'].to_numpy(dtype=int)
+        return pd.DataFrame({
+            'faixa_nome': lines['faixa_nome'].to_numpy()[linha],
+            'conjunto': points['conjunto'].to_numpy()[ponto],
+            'ponto_id': points['ponto_id'].to_numpy()[ponto],
+            'distancia_m': pairs['distancia'].to_numpy().round(2),
+        })
+
+    # Uma Faixa Azul em MultiLineString vira várias linhas: fica a menor distância
+    proximity = (attach(index.within(xy, radius))
+                 .sort_values(['faixa_nome', 'conjunto', 'distancia_m', 'ponto_id'], kind='stable')
+                 .drop_duplicates(['faixa_nome', 'conjunto', 'ponto_id'])
+                 .reset_index(drop=True))
+    nearest = attach(index.nearest(xy))[['conjunto', 'ponto_id', 'faixa_nome', 'distancia_m']]
+    return proximity, nearest
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Liga a Faixa Azul aos semáforos, equipamentos, câmeras e paradas próximos")
+    parser.add_argument("--raio", type=float, default=DEFAULT_RADIUS_M,
+                        help=f"Distância máxima (metros) da tabela faixaazul_proximidade (padrão: {DEFAULT_RADIUS_M:g})")
+    parser.add_argument("--formato", choices=sorted(OUTPUT_FORMATS), default='csv',
+                        help="Formato das tabelas de ligação: csv, parquet ou ambos (padrão: csv)")
+    args = parser.parse_args()
+
+    print("=== JUNÇÃO ESPACIAL DA FAIXA AZUL ===\n")
+
+    project_root = detect_project_root()
+    processed_dir = os.path.join(project_root, "data", "processed")
+    geojson_path = os.path.join(processed_dir, FAIXAAZUL_FILE)
+
+    if not os.path.exists(geojson_path):
+        print(f"[ERRO] {FAIXAAZUL_FILE} não encontrado em {processed_dir}")
+        return
+
+    lines = load_faixaazul(geojson_path)
+    print(f"[OK] Faixa Azul: {lines['faixa_nome'].nunique()} trechos")
+    points = load_points(processed_dir)
+    if lines.empty or points.empty:
+        print("[AVISO] Nada para ligar")
+        return
+
+    proximity, nearest = spatial_join(lines, points, args.raio)
+
+    for filename, df in [(PROXIMITY_FILE, proximity), (NEAREST_FILE, nearest)]:
+        paths = save_processed(df, os.path.join(processed_dir, filename), args.formato)
+        print(f"[SUCESSO] {', '.join(os.path.basename(p) for p in paths)} ({len(df)} registros)")
+
+    print("\n=== RESUMO ===")
+    counts = proximity.groupby('conjunto').size()
+    for dataset in POINT_DATASETS:
+        if dataset in counts:
+            print(f"[OK] {dataset}: {counts[dataset]} ligações a até {args.raio:g} m")
+
+
+if __name__ == "__main__":
+    main()
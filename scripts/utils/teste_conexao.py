@@ -1,7 +1,67 @@
 #!/usr/bin/env python3
 """
-Script básico para teste de conexão
+Teste de conexão com o PostgreSQL configurado no .env.
+
+Mostra a versão do servidor e do PostGIS e as tabelas do schema public com a
+quantidade de registros. Sai com código 1 se não conseguir conectar.
 """
 
-print("Script de teste de conexão")
-print("Este script será desenvolvido conforme necessário")
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database"))
+
+from copy_loader import connection_params, get_connection  # noqa: E402
+from generate_sql_inserts import detect_project_root  # noqa: E402
+
+
+def main():
+    """Função principal"""
+    print("=== TESTE DE CONEXÃO COM O POSTGRESQL ===\n")
+
+    project_root = detect_project_root()
+    params = connection_params(project_root)
+    target = params.get('dsn') or f"{params['host']}:{params['port']}/{params['dbname']}"
+    # Não mostrar a senha da DATABASE_URL
+    if '@' in target:
+        target = target.split('@', 1)[1]
+    print(f"[INFO] Banco: {target}")
+
+    try:
+        conn = get_connection(project_root)
+    except Exception as e:
+        print(f"[ERRO] Não foi possível conectar: {e}")
+        sys.exit(1)
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT version()")
+            print(f"[OK] {cursor.fetchone()[0]}")
+
+            cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'postgis'")
+            row = cursor.fetchone()
+            if row:
+                print(f"[OK] PostGIS {row[0]}")
+            else:
+                print("[AVISO] Extensão PostGIS não instalada neste banco")
+
+            cursor.execute("""
+                SELECT c.relname
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+                ORDER BY c.relname
+            """)
+            tables = [name for (name,) in cursor.fetchall()]
+            print(f"\n[INFO] Tabelas: {len(tables)}")
+            for name in tables:
+                cursor.execute(f'SELECT COUNT(*) FROM "{name}"')
+                print(f"  - {name}: {cursor.fetchone()[0]} registros")
+    finally:
+        conn.close()
+
+    print("\n[SUCESSO] Conexão funcionando")
+
+
+if __name__ == "__main__":
+    main()
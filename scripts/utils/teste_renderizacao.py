@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Teste de regressão da renderização de valores SQL.
+
+Compara, byte a byte, a renderização coluna a coluna (render_sql_rows) com o
+caminho original célula a célula (escape_sql_value via iterrows) para:
+- casos sintéticos que cobrem as regras de escape_sql_value;
+- todos os arquivos processados (CSV ou Parquet) em data/processed (normais e GTFS).
+
+Sai com código 1 se alguma divergência for encontrada.
+"""
+
+import os
+import sys
+import datetime
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database"))
+
+from generate_sql_inserts import (  # noqa: E402
+    detect_project_root,
+    find_matching_schema,
+    load_table_dataframe,
+    render_sql_rows,
+    render_sql_rows_per_cell,
+)
+from processed_io import csv_filename, list_processed_files  # noqa: E402
+from schema_model import TableSchema  # noqa: E402
+
+
+def synthetic_cases():
+    """Casos que exercitam cada regra de escape_sql_value"""
+    texto = {'nome': 'TEXT', 'route_id': 'TEXT', 'faixa': 'TEXT', 'data': 'DATE',
+             'agency_phone': 'TEXT', 'qtd': 'INTEGER', 'velocidade': 'DECIMAL'}
+    yield "strings, aspas e nulos", pd.DataFrame({
+        'nome': ["Rua D'Ajuda", None, "", "O''Neil", "normal"],
+        'faixa': ['1', '2', None, "3'", '4'],
+        'data': ['2025-01-01', None, '2025-01-03', '2025-01-04', '2025-01-05'],
+    }), texto
+    yield "números em colunas texto", pd.DataFrame({
+        'route_id': [1, 2, 3000000000, 4, 5],
+        'faixa': [1.0, np.nan, 2.5, 3.0, np.inf],
+        'agency_phone': [8132321234, 1, 2, 3, 4],
+        'nome': ['a', 'b', 'c', 'd', 'e'],
+    }), texto
+    yield "apenas numéricos (iterrows converte para float)", pd.DataFrame({
+        'qtd': [1, 2, 3],
+        'velocidade': [1.5, np.nan, 1e-05],
+    }), texto
+    yield "apenas inteiros", pd.DataFrame({
+        'qtd': [1, 2, 3],
+        'route_id': [10, 20, 30],
+    }), texto
+    yield "booleanos", pd.DataFrame({
+        'ativo': [True, False, True],
+        'nome': ['x', 'y', 'z'],
+    }), texto
+    yield "apenas booleanos", pd.DataFrame({
+        'ativo': [True, False],
+    }), {}
+    yield "tipos mistos e datas", pd.DataFrame({
+        'nome': ['a', 1, 2.5, None],
+        'data': pd.to_datetime(['2025-01-01 00:00', None, '2025-02-03 10:00', '2025-03-04 00:00']),
+        'email': ['x@y.com', None, 'a', 'b'],
+    }), texto
+    yield "tipos explícitos (Parquet)", pd.DataFrame({
+        'qtd': pd.array([1, None, 3, 4], dtype='Int64'),
+        'ativo': pd.array([True, None, False, True], dtype='boolean'),
+        'nome': pd.Categorical(['a', "D'Ajuda", None, 'a']),
+        'data': [datetime.date(2025, 1, 1), None, datetime.date(2025, 1, 3), datetime.date(2025, 1, 4)],
+        'route_id': pd.array(['10', '20', None, '10'], dtype='str'),
+    }), texto
+    yield "apenas Int64/Float64", pd.DataFrame({
+        'qtd': pd.array([1, None, 3], dtype='Int64'),
+        'velocidade': pd.array([1.5, 2.0, None], dtype='Float64'),
+        'route_id': pd.array([7, 8, None], dtype='Int64'),
+    }), texto
+    yield "sem schema (GTFS)", pd.DataFrame({
+        'stop_id': ['S1', 'S2', None],
+        'stop_lat': [-8.05, -8.06, np.nan],
+        'location_type': [0, 1, 0],
+    }), {}
+
+
+def processed_cases(project_root: str):
+    """CSVs processados do projeto, como o gerador os carrega"""
+    processed_dir = os.path.join(project_root, "data", "processed")
+    schemas_dir = os.path.join(project_root, "database", "schemas")
+    for base_dir, gtfs in [(processed_dir, False), (os.path.join(processed_dir, "gtfs"), True)]:
+        if not os.path.exists(base_dir):
+            continue
+        for csv_file in list_processed_files(base_dir):
+            schema_path = None if gtfs else find_matching_schema(csv_filename(csv_file), schemas_dir)
+            if not gtfs and not schema_path:
+                continue
+            _, df, schema, _ = load_table_dataframe(os.path.join(base_dir, csv_file), schema_path)
+            if df is not None:
+                yield csv_file, df, schema
+
+
+def main():
+    """Função principal"""
+    print("=== TESTE DE REGRESSÃO: RENDERIZAÇÃO DE VALORES SQL ===\n")
+
+    cases = list(synthetic_cases()) + list(processed_cases(detect_project_root()))
+    failures = 0
+
+    for name, df, schema in cases:
+        # Casos sintéticos: modelo do schema a partir do mapeamento coluna -> tipo
+        if isinstance(schema, dict):
+            schema = TableSchema.from_column_types("teste", schema)
+        expected = render_sql_rows_per_cell(df, schema)
+        actual = render_sql_rows(df, schema)
+        if expected == actual:
+            print(f"[OK] {name}: {len(actual)} linhas idênticas")
+            continue
+
+        failures += 1
+        print(f"[ERRO] {name}: saída divergente")
+        for idx, (exp, act) in enumerate(zip(expected, actual)):
+            if exp != act:
+                print(f"  linha {idx}:\n    esperado: {exp}\n    obtido:   {act}")
+                break
+        if len(expected) != len(actual):
+            print(f"  quantidade de linhas: esperado {len(expected)}, obtido {len(actual)}")
+
+    print("\n=== RESUMO ===")
+    print(f"[INFO] Casos verificados: {len(cases)}")
+    if failures:
+        print(f"[ERRO] Casos divergentes: {failures}")
+        sys.exit(1)
+    print("[SUCESSO] Renderização coluna a coluna idêntica ao caminho original")
+
+
+if __name__ == "__main__":
+    main()